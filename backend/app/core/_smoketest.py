@@ -1,4 +1,5 @@
-from .settings import settings
+from .settings import get_settings
+settings = get_settings()
 print("APP:", settings.app_name, "| ENV:", settings.app_env)
 print("DB:", settings.db_dsn_async)
 print("JWT ALG:", settings.jwt_alg)
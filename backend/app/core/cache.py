@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from app.core.settings import get_settings
+
+log = logging.getLogger(__name__)
+
+# stored by invalidate(): reads see a miss, and fills (add) can't replace it until it expires
+_TOMBSTONE = b"\x00invalidated"
+
+
+class CacheBackend(ABC):
+    """
+    Minimal async key/value store the read-through cache sits on.
+    Values are opaque bytes; TTLs are in seconds.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """The value, or None if missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        """Store unconditionally."""
+
+    @abstractmethod
+    async def add(self, key: str, value: bytes, ttl: int) -> None:
+        """Store only if the key holds nothing (atomically, where the backend is shared)."""
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        """Remove the keys; missing ones are ignored."""
+
+    async def set_many(self, keys: Iterable[str], value: bytes, ttl: int) -> None:
+        """Store the same value under every key."""
+        for key in keys:
+            await self.set(key, value, ttl)
+
+    async def close(self) -> None:
+        pass
+
+
+class NullCache(CacheBackend):
+    """Cache switched off: every read goes to the loader."""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        pass
+
+    async def add(self, key: str, value: bytes, ttl: int) -> None:
+        pass
+
+    async def delete(self, *keys: str) -> None:
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process LRU with per-entry expiry. Used for tests and single-worker setups;
+    each worker has its own copy, so invalidation does not cross processes.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def add(self, key: str, value: bytes, ttl: int) -> None:
+        if await self.get(key) is None:
+            await self.set(key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+
+class RedisCache(CacheBackend):
+    """Shared cache in Redis (settings.redis_url)."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # only needed when this backend is selected
+
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self._client.set(key, value, ex=ttl)
+
+    async def add(self, key: str, value: bytes, ttl: int) -> None:
+        await self._client.set(key, value, ex=ttl, nx=True)
+
+    async def set_many(self, keys: Iterable[str], value: bytes, ttl: int) -> None:
+        async with self._client.pipeline(transaction=False) as pipe:  # one round trip
+            for key in keys:
+                pipe.set(key, value, ex=ttl)
+            await pipe.execute()
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._client.delete(*keys)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class ReadThroughCache:
+    """
+    JSON read-through cache on top of a CacheBackend.
+
+    Stampede protection: concurrent misses for the same key in one worker share
+    a single load, and TTLs get a little jitter so keys written together don't
+    all expire together. The load runs as its own task, so a caller that goes
+    away (client disconnect) doesn't cancel it for the others.
+
+    No stale fills: `invalidate` leaves a short-lived tombstone instead of
+    deleting, and loaded values are only stored if the key is empty (`add`).
+    A read that started before a write (or hit a lagging replica) and finishes
+    after its invalidation therefore can't put the old value back; the value
+    is cached again by the first miss after the tombstone expires.
+
+    Backend errors are logged and treated as misses, so a Redis outage degrades
+    to plain DB reads instead of failing requests.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int, tombstone_ttl: int, jitter: float = 0.1):
+        self.backend = backend
+        self.ttl = ttl
+        self.tombstone_ttl = tombstone_ttl
+        self.jitter = jitter
+        self._inflight: Dict[str, "asyncio.Task[Optional[dict]]"] = {}
+
+    def _ttl(self) -> int:
+        return max(1, int(self.ttl * (1 + random.uniform(0, self.jitter))))
+
+    async def get_or_load(
+        self, key: str, loader: Callable[[], Awaitable[Optional[dict]]]
+    ) -> Optional[dict]:
+        """
+        Return the cached value for `key`, or run `loader` once and cache its result.
+        A None result (e.g. not found) is returned but not cached. `loader` runs
+        in a task of its own that may outlive the caller, so it must not use the
+        caller's request-scoped resources (open its own DB session).
+        """
+        try:
+            raw = await self.backend.get(key)
+        except Exception:
+            log.warning("cache get failed for %s", key, exc_info=True)
+            raw = None
+        if raw is not None and raw != _TOMBSTONE:
+            return json.loads(raw)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._loaded(key, t))
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        value = await loader()
+        if value is not None:
+            try:
+                await self.backend.add(key, json.dumps(value).encode("utf-8"), self._ttl())
+            except Exception:
+                log.warning("cache set failed for %s", key, exc_info=True)
+        return value
+
+    def _loaded(self, key: str, task: "asyncio.Task[Optional[dict]]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved: every caller may have gone away
+
+    async def invalidate(self, *keys: str) -> None:
+        for key in keys:
+            # loads already running may have read the old value; later callers start a fresh one
+            self._inflight.pop(key, None)
+        try:
+            await self.backend.set_many(keys, _TOMBSTONE, self.tombstone_ttl)
+        except Exception:
+            log.warning("cache invalidate failed for %s", keys, exc_info=True)
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+def note_key(user_id: int, note_id: int) -> str:
+    return f"note:{user_id}:{note_id}"
+
+
+def prefs_key(user_id: int) -> str:
+    return f"prefs:{user_id}"
+
+
+def _make_backend() -> CacheBackend:
+    settings = get_settings()
+    if settings.cache_backend == "redis":
+        return RedisCache(settings.redis_url)
+    if settings.cache_backend == "memory":
+        return MemoryCache(settings.cache_memory_max_entries)
+    if settings.cache_backend == "off":
+        return NullCache()
+    raise ValueError(f"Unknown cache_backend: {settings.cache_backend!r}")
+
+
+# the app's single cache, created on first use and closed on shutdown
+_cache: Optional[ReadThroughCache] = None
+
+
+def get_cache() -> ReadThroughCache:
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        _cache = ReadThroughCache(
+            _make_backend(), ttl=settings.cache_ttl_seconds, tombstone_ttl=settings.cache_tombstone_seconds
+        )
+    return _cache
+
+
+async def close_cache() -> None:
+    global _cache
+    if _cache is not None:
+        await _cache.close()
+        _cache = None
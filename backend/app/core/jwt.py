@@ -1,12 +1,17 @@
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 from jwt import InvalidTokenError
 import jwt
-from app.core.settings import settings
+from app.core.settings import get_settings
+from app.core.metrics import JWT_DECODE_LATENCY
 
 
-def _base_payload(user_id: int, email: str | None = None) -> Dict[str, Any]:
-    now = datetime.now(tz=timezone.utc)
+def _base_payload(user_id: int, email: str | None = None, now: datetime | None = None) -> Dict[str, Any]:
+    now = now or datetime.now(tz=timezone.utc)
     payload: Dict[str, Any] = {
         "sub": str(user_id),         # subject = user id
         "iat": int(now.timestamp()), # issued at
@@ -19,30 +24,138 @@ def _base_payload(user_id: int, email: str | None = None) -> Dict[str, Any]:
 
 def create_access_token(user_id: int, email: str | None = None) -> str:
     """Short-lived token for API calls."""
+    settings = get_settings()
     exp = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_minutes)
     payload = _base_payload(user_id, email)
     payload.update({"type": "access", "exp": exp})
     return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_alg)
 
 
-def create_refresh_token(user_id: int) -> str:
-    """Longer-lived token to mint new access tokens."""
-    exp = datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_days)
-    payload = _base_payload(user_id)
-    payload.update({"type": "refresh", "exp": exp})
+def create_refresh_token(user_id: int, family: str | None = None) -> str:
+    """
+    Longer-lived, single-use token to mint new access tokens.
+    `jti` identifies this token; `fam` is shared by every token rotated from the
+    same login (a new family when not given), so a whole chain can be revoked at once.
+    `iat_ms` is the issue time in milliseconds: `iat` has whole seconds, too coarse
+    to tell a token minted right after a logout-all from one minted before it.
+    """
+    settings = get_settings()
+    now = datetime.now(timezone.utc)
+    exp = now + timedelta(days=settings.refresh_token_days)
+    payload = _base_payload(user_id, now=now)
+    payload.update({
+        "type": "refresh",
+        "exp": exp,
+        "iat_ms": int(now.timestamp() * 1000),
+        "jti": uuid.uuid4().hex,
+        "fam": family or uuid.uuid4().hex,
+    })
     return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_alg)
 
 
+def create_verify_token(user_id: int, email: str) -> str:
+    """Token for the email-verification link; only valid for the address it was sent to."""
+    settings = get_settings()
+    exp = datetime.now(timezone.utc) + timedelta(hours=settings.verify_token_hours)
+    payload = _base_payload(user_id, email)
+    payload.update({"type": "verify", "exp": exp})
+    return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_alg)
+
+
+class _VerifiedTokenCache:
+    """
+    Bounded LRU of already-verified claim sets, keyed by a SHA-256 digest of the raw token
+    (so the cache never holds usable tokens). An entry is only valid until the token's exp.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        exp, payload = entry
+        if time.time() >= exp:
+            # expired: drop it and make the caller run full verification (which will reject it)
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def put(self, key: bytes, payload: Dict[str, Any]) -> None:
+        exp = payload.get("exp")
+        if self.maxsize <= 0 or not isinstance(exp, (int, float)):
+            return  # never cache a token without an expiry
+        self._entries[key] = (float(exp), payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_token_cache: Optional[_VerifiedTokenCache] = None
+
+
+def _get_token_cache() -> _VerifiedTokenCache:
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = _VerifiedTokenCache(get_settings().jwt_cache_size)
+    return _token_cache
+
+
 def decode_token(token: str, expected_type: str | None = None) -> dict:
     """
     Decode & verify a JWT. Optionally enforce token 'type' (e.g., 'access' or 'refresh').
     Raises jwt.InvalidTokenError if verification fails.
+    Tokens verified before are served from an in-process cache until their exp.
     """
-    # Verify signature & standard claims (exp, iat, nbf)
-    payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_alg])
+    settings = get_settings()
+    t0 = time.perf_counter()
+    key = _VerifiedTokenCache.key(token)
+    token_cache = _get_token_cache()
+    payload = token_cache.get(key)
+    if payload is None:
+        # Verify signature & standard claims (exp, iat, nbf)
+        payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_alg])
+        token_cache.put(key, payload)
+        JWT_DECODE_LATENCY.labels("miss").observe(time.perf_counter() - t0)
+    else:
+        JWT_DECODE_LATENCY.labels("hit").observe(time.perf_counter() - t0)
 
-    # Optionally enforce expected type
+    # Optionally enforce expected type (checked on hits too)
     if expected_type is not None and payload.get("type") != expected_type:
         raise InvalidTokenError(f"Unexpected token type: {payload.get('type')!r}")
 
-    return payload
+    return dict(payload)  # callers get their own copy, never the cached dict
+
+
+def token_cache_stats() -> Dict[str, int]:
+    """Size and hit/miss counters of the verified-token cache."""
+    return _get_token_cache().stats()
+
+
+def clear_token_cache() -> None:
+    _get_token_cache().clear()
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from typing import Optional
+
+from app.core.settings import get_settings
+
+log = logging.getLogger(__name__)
+
+
+class EmailSender(ABC):
+    """Interface: deliver one plain-text message."""
+
+    @abstractmethod
+    async def send(self, to: str, subject: str, body: str) -> None:
+        """Send it; raising means the job is retried later."""
+
+
+class LogEmailSender(EmailSender):
+    """Writes messages to the log instead of sending them (dev default)."""
+
+    async def send(self, to: str, subject: str, body: str) -> None:
+        log.info("email to=%s subject=%r\n%s", to, subject, body)
+
+
+class FileEmailSender(EmailSender):
+    """One .eml file per message in `directory`, for tests and local inspection."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    async def send(self, to: str, subject: str, body: str) -> None:
+        msg = EmailMessage()
+        msg["From"] = get_settings().aws_ses_sender or "noreply@localhost"
+        msg["To"] = to
+        msg["Subject"] = subject
+        msg.set_content(body)
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{time.time_ns()}-{uuid.uuid4().hex[:8]}.eml")
+        with open(path, "wb") as f:
+            f.write(msg.as_bytes())
+
+
+class SesEmailSender(EmailSender):
+    """Amazon SES. boto3 is blocking, so each call runs in a thread."""
+
+    def __init__(self, region: Optional[str], sender: Optional[str]):
+        import boto3  # only needed when this backend is selected
+
+        if not sender:
+            raise ValueError("email_backend 'ses' needs aws_ses_sender")
+        self.sender = sender
+        self._client = boto3.client("ses", region_name=region)
+
+    async def send(self, to: str, subject: str, body: str) -> None:
+        await asyncio.to_thread(
+            self._client.send_email,
+            Source=self.sender,
+            Destination={"ToAddresses": [to]},
+            Message={
+                "Subject": {"Data": subject, "Charset": "UTF-8"},
+                "Body": {"Text": {"Data": body, "Charset": "UTF-8"}},
+            },
+        )
+
+
+def make_email_sender() -> EmailSender:
+    settings = get_settings()
+    if settings.email_backend == "ses":
+        return SesEmailSender(settings.aws_region, settings.aws_ses_sender)
+    if settings.email_backend == "file":
+        return FileEmailSender(settings.email_file_dir)
+    if settings.email_backend == "log":
+        return LogEmailSender()
+    raise ValueError(f"Unknown email_backend: {settings.email_backend!r}")
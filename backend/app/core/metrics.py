@@ -0,0 +1,74 @@
+from typing import Callable, Dict
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+# Own registry: only what this app records (no default process/GC collectors).
+# Values are per worker process; scrape each worker (or run a single worker).
+registry = CollectorRegistry(auto_describe=False)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status",
+    ["method", "route", "status"], registry=registry,
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template and status",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS, registry=registry,
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request",
+    ["route"], buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16, 32, 64), registry=registry,
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Time from sending a SQL statement to its result",
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+PASSWORD_HASH_LATENCY = Histogram(
+    "password_hash_duration_seconds", "Argon2 hash/verify time in the hashing pool",
+    ["op"], buckets=LATENCY_BUCKETS, registry=registry,
+)
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_queue_wait_seconds", "Time spent waiting for a hashing pool slot",
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+JWT_DECODE_LATENCY = Histogram(
+    "jwt_decode_duration_seconds", "decode_token time, split by verified-token cache result",
+    ["cache"], buckets=FAST_BUCKETS, registry=registry,
+)
+AUTH_THROTTLED = Counter(
+    "auth_throttled_total", "Auth requests rejected by the rate limiter",
+    ["scope", "bucket"], registry=registry,
+)
+
+
+class _StatsCollector:
+    """Expose a stats() -> {name: number} function as a set of gauges, read at scrape time."""
+
+    def __init__(self, prefix: str, doc: str, stats: Callable[[], Dict[str, float]]):
+        self.prefix = prefix
+        self.doc = doc
+        self.stats = stats
+
+    def collect(self):
+        for name, value in self.stats().items():
+            yield GaugeMetricFamily(f"{self.prefix}_{name}", f"{self.doc} ({name})", value=value)
+
+
+_stats_collectors: Dict[str, _StatsCollector] = {}
+
+
+def register_stats(prefix: str, doc: str, stats: Callable[[], Dict[str, float]]) -> None:
+    """Expose `stats` under `prefix`; registering a prefix again replaces it (one per app instance)."""
+    old = _stats_collectors.pop(prefix, None)
+    if old is not None:
+        registry.unregister(old)
+    collector = _stats_collectors[prefix] = _StatsCollector(prefix, doc, stats)
+    registry.register(collector)
+
+
+def render() -> tuple[bytes, str]:
+    """Current metrics in Prometheus text format, plus its content type."""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
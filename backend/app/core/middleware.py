@@ -0,0 +1,46 @@
+import time
+
+from app.core import metrics
+from app.core.settings import get_settings
+from app.db.session import count_queries
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (cheaper than BaseHTTPMiddleware on every request):
+    records count + latency per (method, route template, status) and SQL
+    statements per request, and optionally adds X-DB-Query-Count to responses.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        t0 = time.perf_counter()
+
+        with count_queries() as queries:
+            async def send_wrapper(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    if get_settings().expose_query_count:
+                        headers = list(message.get("headers", []))
+                        headers.append((b"x-db-query-count", str(queries.count).encode("ascii")))
+                        message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # the router puts the matched route in scope; use its template, not the raw path
+                route = scope.get("route")
+                template = getattr(route, "path", None) or "unmatched"
+                labels = (scope["method"], template, str(status))
+                metrics.HTTP_REQUESTS.labels(*labels).inc()
+                metrics.HTTP_LATENCY.labels(*labels).observe(time.perf_counter() - t0)
+                metrics.DB_QUERIES_PER_REQUEST.labels(template).observe(queries.count)
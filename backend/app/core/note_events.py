@@ -0,0 +1,241 @@
+"""
+Note change events, pushed to clients over Server-Sent Events.
+
+Statement-level triggers on notes (migration d4b8f2a6c1e7) pg_notify every
+insert, real update and delete, so writers do nothing and no write path can
+forget; Postgres delivers the notification only if the transaction commits.
+Each worker holds ONE dedicated LISTEN connection, outside the pool (and, via
+note_events_dsn, outside pgbouncer if the pool goes through one), and fans
+events out to its local subscribers by user id, so an idle client costs a
+queue, not a DB connection or a stream of polls.
+
+Events only say which notes changed; GET /notes/changes stays the source of
+truth. That is what makes dropping cheap: every subscriber has a bounded queue,
+and one that falls behind is disconnected instead of buffered for. It
+reconnects, gets a `resync` event and catches up from its watermark.
+"""
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, Optional, Set
+
+import asyncpg
+
+from app.core.settings import get_settings
+
+log = logging.getLogger(__name__)
+
+CHANNEL = "note_changes"  # the triggers' channel
+
+_RESYNC = b'event: note\ndata: {"op": "resync"}\n\n'
+_KEEPALIVE = b": keepalive\n\n"
+
+
+class Subscriber:
+    """One open event stream. The queue holds encoded SSE frames; None means "dropped"."""
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(queue_size)
+
+
+class NoteEvents:
+    """
+    This worker's LISTEN connection and the subscribers it feeds. The connection
+    is checked every note_events_ping_seconds and re-opened when it fails; since
+    notifications sent meanwhile are lost, every subscriber is then told to resync.
+    """
+
+    def __init__(self, queue_size: int, max_subscribers: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self._count = 0
+        self._task: Optional[asyncio.Task] = None
+        self._connected = False
+        self.delivered = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+    # --- subscribers ---
+
+    def has_room(self) -> bool:
+        return self._count < self.max_subscribers
+
+    def subscribe(self, user_id: int) -> Optional[Subscriber]:
+        """A new subscriber for `user_id`'s events, or None if this worker is at max_subscribers."""
+        if self._count >= self.max_subscribers:
+            return None
+        sub = Subscriber(user_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(sub)
+        self._count += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        subs = self._subscribers.get(sub.user_id)
+        if subs is None or sub not in subs:
+            return
+        subs.discard(sub)
+        if not subs:
+            del self._subscribers[sub.user_id]
+        self._count -= 1
+
+    def _offer(self, sub: Subscriber, frame: bytes) -> None:
+        try:
+            sub.queue.put_nowait(frame)
+            self.delivered += 1
+        except asyncio.QueueFull:
+            # too slow: cut it loose rather than buffer without bound
+            self._end(sub)
+            self.dropped += 1
+
+    def _end(self, sub: Subscriber) -> None:
+        """Unsubscribe and make its stream finish (pending events are discarded)."""
+        self.unsubscribe(sub)
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
+
+    def _broadcast(self, frame: bytes) -> None:
+        for subs in list(self._subscribers.values()):
+            for sub in list(subs):
+                self._offer(sub, frame)
+
+    async def stream(self, user_id: int) -> AsyncIterator[bytes]:
+        """
+        SSE body for `user_id`'s events. Subscribes only once the body starts, so
+        a client that is gone before then never holds a slot (with no subscriber,
+        e.g. the worker filled up meanwhile, it ends at once and the client
+        reconnects). Starts with a resync (anything before the subscription is the
+        client's to fetch), sends keepalive comments while idle and ends when the
+        subscriber is dropped or after note_events_stream_seconds, so a graceful
+        shutdown never waits on it for long and the client re-authenticates when
+        it reconnects. Unsubscribes when the client goes away.
+        """
+        settings = get_settings()
+        sub = self.subscribe(user_id)
+        if sub is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.note_events_stream_seconds
+        try:
+            yield _RESYNC
+            while (left := deadline - loop.time()) > 0:
+                try:
+                    frame = await asyncio.wait_for(
+                        sub.queue.get(), min(left, settings.note_events_keepalive_seconds)
+                    )
+                except asyncio.TimeoutError:
+                    yield _KEEPALIVE
+                    continue
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self.unsubscribe(sub)
+
+    # --- listening ---
+
+    def _on_notify(self, conn, pid: int, channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            subs = self._subscribers.get(event.pop("user_id"))
+        except (ValueError, KeyError):
+            log.warning("note events: bad payload %r", payload)
+            return
+        if not subs:
+            return
+        # encoded once, shared by all of the user's streams
+        frame = f"event: note\ndata: {json.dumps(event)}\n\n".encode()
+        for sub in list(subs):
+            self._offer(sub, frame)
+
+    async def _connect(self) -> asyncpg.Connection:
+        settings = get_settings()
+        if settings.note_events_dsn:
+            return await asyncpg.connect(settings.note_events_dsn)
+        return await asyncpg.connect(
+            host=settings.db_host, port=settings.db_port, user=settings.db_user,
+            password=settings.db_password, database=settings.db_name,
+        )
+
+    async def _listen_once(self, resync: bool) -> None:
+        conn = await self._connect()
+        try:
+            lost = asyncio.Event()
+            conn.add_termination_listener(lambda _: lost.set())
+            await conn.add_listener(CHANNEL, self._on_notify)
+            self._connected = True
+            if resync:
+                # notifications sent while no connection was listening are lost
+                self.reconnects += 1
+                self._broadcast(_RESYNC)
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), get_settings().note_events_ping_seconds)
+                except asyncio.TimeoutError:
+                    # a silently dead connection would otherwise never deliver again
+                    await asyncio.wait_for(conn.fetchval("SELECT 1"), get_settings().note_events_ping_seconds)
+        finally:
+            self._connected = False
+            conn.terminate()
+
+    async def _run(self) -> None:
+        resync = False
+        while True:
+            try:
+                await self._listen_once(resync)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.warning("note events: LISTEN connection lost, retrying", exc_info=True)
+            resync = True
+            await asyncio.sleep(5)
+
+    async def start(self) -> None:
+        """Start listening (called on app startup); connects in the background."""
+        settings = get_settings()
+        if settings.db_pgbouncer and not settings.note_events_dsn:
+            # a transaction-mode pooler accepts LISTEN but never delivers the notifications
+            log.warning("note events: db_pgbouncer is set without note_events_dsn; "
+                        "LISTEN goes through the pooler and clients will get no events")
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # end every open stream so the server can shut down
+        for subs in list(self._subscribers.values()):
+            for sub in list(subs):
+                self._end(sub)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "connected": int(self._connected),
+            "subscribers": self._count,
+            "users": len(self._subscribers),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+        }
+
+
+# this worker's single instance, created on first use and closed on shutdown
+_note_events: Optional[NoteEvents] = None
+
+
+def get_note_events() -> NoteEvents:
+    global _note_events
+    if _note_events is None:
+        settings = get_settings()
+        _note_events = NoteEvents(settings.note_events_queue_size, settings.note_events_max_subscribers)
+    return _note_events
+
+
+async def close_note_events() -> None:
+    global _note_events
+    if _note_events is not None:
+        await _note_events.close()
+        _note_events = None
@@ -0,0 +1,53 @@
+import base64
+import binascii
+
+
+def _b64encode(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode("ascii")).decode("ascii").rstrip("=")
+
+
+def _b64decode(cursor: str) -> str:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        return base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Opaque keyset cursor pointing just after the given note id.
+    """
+    return _b64encode(str(last_id))
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Reverse of encode_cursor. Raises ValueError on a malformed token.
+    """
+    try:
+        last_id = int(_b64decode(cursor))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if last_id < 0:
+        raise ValueError("Invalid cursor")
+    return last_id
+
+
+def encode_rank_cursor(rank: float, last_id: int) -> str:
+    """
+    Cursor for results ordered by (rank desc, id desc), e.g. search hits.
+    repr() round-trips the float exactly, so the next page starts at the same spot.
+    """
+    return _b64encode(f"{rank!r}:{last_id}")
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, int]:
+    """
+    Reverse of encode_rank_cursor. Raises ValueError on a malformed token.
+    """
+    try:
+        rank, last_id = _b64decode(cursor).split(":")
+        return float(rank), int(last_id)
+    except ValueError:
+        raise ValueError("Invalid cursor")
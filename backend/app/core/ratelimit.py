@@ -0,0 +1,179 @@
+import ipaddress
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Union
+
+from fastapi import HTTPException, Request
+
+from app.core.settings import get_settings
+from app.core.metrics import AUTH_THROTTLED
+
+log = logging.getLogger(__name__)
+
+# Token bucket in one atomic step: refill by elapsed time, take one token if
+# there is one, otherwise report how long until there will be. Uses the Redis
+# clock so every worker agrees on "now".
+_REDIS_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or burst
+local ts = tonumber(b[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(retry)
+"""
+
+
+def _is_trusted(addr: str, proxies: List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]) -> bool:
+    try:
+        ip = ipaddress.ip_address(addr)
+    except ValueError:
+        return False
+    return any(ip in net for net in proxies)
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """
+    The caller's address, for throttling. From a peer in trusted_proxies, the
+    right-most X-Forwarded-For entry that isn't one of our proxies (entries
+    further left are whatever the client sent); from anyone else the header is
+    ignored, so it can't be used to pick a fresh bucket per request.
+    """
+    if request.client is None:
+        return None
+    peer = request.client.host
+    proxies = [ipaddress.ip_network(p, strict=False) for p in get_settings().trusted_proxies]
+    if not proxies or not _is_trusted(peer, proxies):
+        return peer
+    hops = [h.strip() for h in ",".join(request.headers.getlist("x-forwarded-for")).split(",")]
+    for hop in reversed(hops):
+        if hop and not _is_trusted(hop, proxies):
+            return hop
+    return peer
+
+
+class MemoryBuckets:
+    """Per-process token buckets (LRU-bounded). Fallback when Redis is off or down."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        tokens, ts = self._buckets.get(key, (float(burst), now))
+        tokens = min(burst, tokens + (now - ts) * rate)
+        retry = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry
+
+
+class RedisBuckets:
+    """Token buckets shared by all workers, in the configured Redis."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # only needed when this backend is selected
+
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_BUCKET)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        return float(await self._script(keys=[key], args=[rate, burst]))
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class RateLimiter:
+    """
+    Throttles the auth endpoints before they spend CPU on Argon2: one bucket per
+    client IP (client_ip) and one per account (email / token subject; for login,
+    email and IP), per endpoint.
+    """
+
+    def __init__(self, backend: str):
+        if backend not in ("redis", "memory", "off"):
+            raise ValueError(f"Unknown rate_limit_backend: {backend!r}")
+        self.enabled = backend != "off"
+        self._memory = MemoryBuckets()
+        self._redis: Optional[RedisBuckets] = RedisBuckets(get_settings().redis_url) if backend == "redis" else None
+
+    async def _take(self, key: str, rate: float, burst: int) -> float:
+        if self._redis is not None:
+            try:
+                return await self._redis.take(key, rate, burst)
+            except Exception:
+                log.warning("rate limit: redis unavailable, using in-memory buckets", exc_info=True)
+        return await self._memory.take(key, rate, burst)
+
+    async def enforce(self, scope: str, ip: Optional[str], account: Optional[str] = None) -> None:
+        """
+        Take a token for this IP (and account, if given) under `scope`.
+        Raises 429 with Retry-After when either bucket is empty.
+        """
+        settings = get_settings()
+        if not self.enabled:
+            return
+        retry, bucket = 0.0, None
+        if ip:
+            retry = await self._take(
+                f"rl:{scope}:ip:{ip}",
+                settings.rate_limit_ip_per_minute / 60,
+                settings.rate_limit_ip_burst,
+            )
+            bucket = "ip"
+        if not retry and account:
+            retry = await self._take(
+                f"rl:{scope}:acct:{account.strip().lower()}",
+                settings.rate_limit_account_per_minute / 60,
+                settings.rate_limit_account_burst,
+            )
+            bucket = "account"
+        if retry:
+            AUTH_THROTTLED.labels(scope, bucket).inc()
+            raise HTTPException(
+                status_code=429,
+                detail="Too many attempts, try again later",
+                headers={"Retry-After": str(max(1, math.ceil(retry)))},
+            )
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.close()
+
+
+# the app's single limiter, created on first use and closed on shutdown
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(get_settings().rate_limit_backend)
+    return _rate_limiter
+
+
+async def close_rate_limiter() -> None:
+    global _rate_limiter
+    if _rate_limiter is not None:
+        await _rate_limiter.close()
+        _rate_limiter = None
@@ -0,0 +1,20 @@
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """
+    Serialize a response model straight to JSON bytes with pydantic-core.
+    Skips FastAPI's response_model round trip (re-validation + jsonable_encoder + json.dumps);
+    the route still declares response_model for the OpenAPI schema.
+    """
+    return Response(
+        content=model.model_dump_json(),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+def raw_json_response(body: str | bytes, status_code: int = 200) -> Response:
+    """JSON that is already rendered (e.g. by Postgres), passed through unchanged."""
+    return Response(content=body, status_code=status_code, media_type="application/json")
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+
+from app.core.settings import get_settings
+from app.db.session import new_session
+from app.models import RefreshRevocation
+
+log = logging.getLogger(__name__)
+
+_CHANNEL = "refresh-revocations"
+_MAX_LOCAL_USED = 200_000  # used-jti entries kept per process when Redis isn't doing it
+
+
+class RefreshRevocations:
+    """
+    Refresh-token revocation state, checked without any I/O.
+
+    Revocations (logout, logout-all, detected reuse) are rare: each one is written
+    to Postgres (durable) and published on Redis so every worker adds it to its
+    in-memory sets at once. Workers also re-read recent rows every
+    revocation_sync_seconds, which covers missed messages and Redis outages.
+    Entries are dropped once every token they cover has expired.
+
+    Marking a token as used (rotation) happens on every refresh and must be atomic
+    across workers, so it is a Redis SET NX; with the memory backend, or while
+    Redis is down, it falls back to a per-process set, which only catches a
+    replay that reaches the same worker (fine for a single process, not more).
+    """
+
+    def __init__(self, backend: str):
+        if backend not in ("redis", "memory"):
+            raise ValueError(f"Unknown revocation_backend: {backend!r}")
+        self._families: Dict[str, float] = {}                # family -> expires_at
+        self._cutoffs: Dict[int, Tuple[float, float]] = {}   # user_id -> (revoked_before, expires_at)
+        self._used: Dict[str, float] = {}                    # jti -> exp (local fallback)
+        self._synced_at: Optional[datetime] = None
+        self._tasks: List[asyncio.Task] = []
+        self.reuse_detected = 0
+        self.rejected = 0
+        self._redis = None
+        if backend == "redis":
+            import redis.asyncio as redis  # only needed when this backend is selected
+
+            self._redis = redis.from_url(get_settings().redis_url)
+
+    # --- checks (hot path) ---
+
+    def is_revoked(self, claims: Dict[str, Any]) -> bool:
+        """
+        True if the refresh token's family, or everything its user had before it, was revoked.
+        The user cutoff is compared with the token's millisecond `iat_ms`, so logging in
+        again right after logging out everywhere isn't caught by it; tokens issued
+        without that claim fall back to whole-second `iat`, where a same-second tie
+        counts as revoked.
+        """
+        revoked = claims.get("fam") in self._families
+        if not revoked:
+            cutoff = self._cutoffs.get(int(claims["sub"]))
+            if cutoff is not None:
+                issued = claims["iat_ms"] / 1000 if "iat_ms" in claims else claims.get("iat", 0)
+                revoked = issued <= cutoff[0]
+        if revoked:
+            self.rejected += 1
+        return revoked
+
+    async def claim(self, jti: str, exp: float) -> bool:
+        """
+        Mark a refresh token as used. False if it already was: the token is being
+        replayed, and the caller should revoke its family.
+        """
+        if self._redis is not None:
+            try:
+                ttl = max(1, int(exp - time.time()) + 1)
+                claimed = bool(await self._redis.set(f"rt:used:{jti}", b"1", nx=True, ex=ttl))
+            except Exception:
+                log.warning("revocation: redis unavailable, tracking used tokens locally", exc_info=True)
+            else:
+                if not claimed:
+                    self.reuse_detected += 1
+                return claimed
+        return self._claim_local(jti, exp)
+
+    def _claim_local(self, jti: str, exp: float) -> bool:
+        if jti in self._used:
+            self.reuse_detected += 1
+            return False
+        self._used[jti] = exp
+        while len(self._used) > _MAX_LOCAL_USED:
+            del self._used[next(iter(self._used))]  # oldest first
+        return True
+
+    # --- revoking (rare) ---
+
+    async def revoke_family(self, user_id: int, family: str) -> None:
+        await self._revoke(user_id, family)
+
+    async def revoke_user(self, user_id: int) -> None:
+        """Revoke every refresh token issued to the user up to now (logout everywhere)."""
+        await self._revoke(user_id, None)
+
+    async def _revoke(self, user_id: int, family: Optional[str]) -> None:
+        # app clock, like the tokens' iat; any token covered expires within refresh_token_days
+        now = datetime.now(timezone.utc)
+        expires = now + timedelta(days=get_settings().refresh_token_days)
+        async with new_session() as session:
+            await session.execute(insert(RefreshRevocation).values(
+                user_id=user_id, family=family, revoked_at=now, expires_at=expires,
+            ))
+            await session.commit()
+        entry = {
+            "user_id": user_id,
+            "family": family,
+            "revoked_at": now.timestamp(),
+            "expires_at": expires.timestamp(),
+        }
+        self._apply(entry)
+        if self._redis is not None:
+            try:
+                await self._redis.publish(_CHANNEL, json.dumps(entry))
+            except Exception:
+                log.warning("revocation: publish failed; other workers pick it up on the next sync",
+                            exc_info=True)
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        expires = entry["expires_at"]
+        if entry["family"]:
+            self._families[entry["family"]] = max(expires, self._families.get(entry["family"], 0.0))
+        else:
+            cutoff, old_expires = self._cutoffs.get(entry["user_id"], (0.0, 0.0))
+            self._cutoffs[entry["user_id"]] = (max(cutoff, entry["revoked_at"]), max(expires, old_expires))
+
+    def _prune(self) -> None:
+        now = time.time()
+        for fam in [f for f, exp in self._families.items() if exp <= now]:
+            del self._families[fam]
+        for uid in [u for u, (_, exp) in self._cutoffs.items() if exp <= now]:
+            del self._cutoffs[uid]
+        for jti in [j for j, exp in self._used.items() if exp <= now]:
+            del self._used[jti]
+
+    # --- syncing ---
+
+    async def _sync(self) -> None:
+        started = datetime.now(timezone.utc)
+        query = select(
+            RefreshRevocation.user_id,
+            RefreshRevocation.family,
+            RefreshRevocation.revoked_at,
+            RefreshRevocation.expires_at,
+        ).where(RefreshRevocation.expires_at > started)
+        if self._synced_at is not None:
+            # overlap by one interval so rows committed late by slow transactions aren't missed
+            since = self._synced_at - timedelta(seconds=get_settings().revocation_sync_seconds)
+            query = query.where(RefreshRevocation.revoked_at > since)
+        async with new_session() as session:
+            if self._synced_at is None:
+                await session.execute(delete(RefreshRevocation).where(RefreshRevocation.expires_at <= started))
+                await session.commit()
+            rows = (await session.execute(query)).all()
+        for user_id, family, revoked_at, expires_at in rows:
+            self._apply({
+                "user_id": user_id,
+                "family": family,
+                "revoked_at": revoked_at.timestamp(),
+                "expires_at": expires_at.timestamp(),
+            })
+        self._synced_at = started
+        self._prune()
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(get_settings().revocation_sync_seconds)
+            try:
+                await self._sync()
+            except Exception:
+                log.warning("revocation: DB sync failed", exc_info=True)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._apply(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.warning("revocation: pub/sub connection lost, retrying", exc_info=True)
+                await asyncio.sleep(5)
+            finally:
+                await pubsub.aclose()
+
+    async def start(self) -> None:
+        """Load live revocations and start following new ones (called on app startup)."""
+        try:
+            await self._sync()
+        except Exception:
+            log.error("revocation: initial DB sync failed; retrying in the background", exc_info=True)
+        self._tasks.append(asyncio.create_task(self._sync_loop()))
+        if self._redis is not None:
+            self._tasks.append(asyncio.create_task(self._listen()))
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "revoked_families": len(self._families),
+            "revoked_users": len(self._cutoffs),
+            "local_used": len(self._used),
+            "rejected": self.rejected,
+            "reuse_detected": self.reuse_detected,
+            "sync_age_seconds": (
+                (datetime.now(timezone.utc) - self._synced_at).total_seconds() if self._synced_at else -1
+            ),
+        }
+
+
+# the app's single instance, created on first use and closed on shutdown
+_revocations: Optional[RefreshRevocations] = None
+
+
+def get_revocations() -> RefreshRevocations:
+    global _revocations
+    if _revocations is None:
+        _revocations = RefreshRevocations(get_settings().revocation_backend)
+    return _revocations
+
+
+async def close_revocations() -> None:
+    global _revocations
+    if _revocations is not None:
+        await _revocations.close()
+        _revocations = None
@@ -1,5 +1,14 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
 from passlib.hash import argon2
 
+from app.core.settings import get_settings
+from app.core.metrics import PASSWORD_HASH_LATENCY, PASSWORD_HASH_WAIT
+
 
 def hash_password(password: str) -> str:
     """
@@ -13,3 +22,118 @@ def verify_password(plain_password: str, password_hash: str) -> bool:
     Check a plain password against the stored hash.
     """
     return argon2.verify(plain_password, password_hash)
+
+
+# --- off-loop hashing -------------------------------------------------------
+# Argon2 is deliberately CPU/memory heavy (tens of ms per call). Running it
+# inline in an async handler blocks the event loop for every other request,
+# so route handlers use the async wrappers below, which run the work in a
+# small process pool. A semaphore caps how many calls are handed to the pool
+# at once; anything beyond that waits here and shows up as queue depth.
+
+_pool: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_stats: Dict[str, int] = {
+    "waiting": 0,       # callers blocked on the concurrency cap
+    "in_flight": 0,     # calls currently running in the pool
+    "completed": 0,     # calls that returned a result
+    "failed": 0,        # calls that raised
+    "cancelled": 0,     # callers that went away while their call ran (the pool still finishes it)
+    "max_waiting": 0,   # high-water mark of `waiting`
+}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: never clone the server process with its loop and DB sockets
+        _pool = ProcessPoolExecutor(
+            max_workers=get_settings().hash_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(get_settings().hash_max_concurrency)
+    return _slots
+
+
+async def _run_in_pool(op: str, fn: Callable[..., Any], *args: Any) -> Any:
+    slots = _get_slots()
+    _stats["waiting"] += 1
+    _stats["max_waiting"] = max(_stats["max_waiting"], _stats["waiting"])
+    t0 = time.perf_counter()
+    try:
+        await slots.acquire()
+    finally:
+        _stats["waiting"] -= 1
+    t1 = time.perf_counter()
+    PASSWORD_HASH_WAIT.observe(t1 - t0)
+
+    _stats["in_flight"] += 1
+    outcome = "failed"
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(_get_pool(), fn, *args)
+        outcome = "completed"
+        return result
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        PASSWORD_HASH_LATENCY.labels(op).observe(time.perf_counter() - t1)
+        _stats["in_flight"] -= 1
+        _stats[outcome] += 1
+        slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    hash_password, run in the hashing pool so the event loop stays responsive.
+    """
+    return await _run_in_pool("hash", hash_password, password)
+
+
+async def verify_password_async(plain_password: str, password_hash: str) -> bool:
+    """
+    verify_password, run in the hashing pool so the event loop stays responsive.
+    """
+    return await _run_in_pool("verify", verify_password, plain_password, password_hash)
+
+
+async def warm_hash_pool() -> None:
+    """
+    Start every hashing worker and load argon2 in it, so the first logins after
+    startup don't pay for process spawn and imports (called from the app lifespan).
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    await asyncio.gather(*(
+        loop.run_in_executor(pool, hash_password, "warmup") for _ in range(get_settings().hash_workers)
+    ))
+
+
+def hash_pool_stats() -> Dict[str, int]:
+    """
+    Snapshot of the hashing pool: configured size plus live queue depth counters.
+    """
+    settings = get_settings()
+    return {
+        "workers": settings.hash_workers,
+        "max_concurrency": settings.hash_max_concurrency,
+        **_stats,
+    }
+
+
+def shutdown_hash_pool() -> None:
+    """
+    Stop the worker processes (called on app shutdown).
+    """
+    global _pool, _slots
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+    _slots = None
@@ -0,0 +1,113 @@
+"""
+Sleep analytics over sleep_daily columns, vectorized with NumPy.
+
+Input is one array per column (from app.db.sleep_queries), sparse over the
+requested range; it is scattered onto a dense day axis once and every
+statistic is a whole-array operation. Python only walks the result to build
+the response rows.
+"""
+import datetime as dt
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.models.sleep_daily import SLEEP_DAY_SHIFT_HOURS
+
+# bedtime spread at which the timing half of the consistency score reaches 0
+BEDTIME_STD_FLOOR_MINUTES = 120.0
+_UNIX_EPOCH_ORDINAL = dt.date(1970, 1, 1).toordinal()
+
+
+def sleep_day(ts: dt.datetime) -> dt.date:
+    """The sleep day `ts` belongs to (see SLEEP_DAY_SHIFT_HOURS)."""
+    return (ts.astimezone(dt.timezone.utc) + dt.timedelta(hours=SLEEP_DAY_SHIFT_HOURS)).date()
+
+
+def _rolling_mean(values: np.ndarray, have: np.ndarray, window: int) -> np.ndarray:
+    """Mean of the nights with data among the last `window` days (NaN where there are none)."""
+    kernel = np.ones(window)
+    sums = np.convolve(np.where(have, values, 0.0), kernel)[: len(values)]
+    counts = np.convolve(have.astype(float), kernel)[: len(values)]
+    return np.divide(sums, counts, out=np.full(len(values), np.nan), where=counts > 0)
+
+
+def _round(x: float, digits: int = 1) -> Optional[float]:
+    return None if x is None or np.isnan(x) else round(float(x), digits)
+
+
+def analyze(columns: Dict[str, List], start: dt.date, days: int, window: int, target_minutes: int) -> dict:
+    """
+    Daily rows (nights with data only), weekly totals (ISO weeks) and a summary
+    for the `days` sleep days from `start`. Minutes throughout.
+    """
+    idx = np.asarray(columns["day_idx"], dtype=np.int64)
+    have = np.zeros(days, dtype=bool)
+    have[idx] = True
+
+    def dense(name: str) -> np.ndarray:
+        out = np.zeros(days)
+        out[idx] = np.asarray(columns[name], dtype=float) / 60
+        return out
+
+    asleep, awake = dense("asleep_s"), dense("awake_s")
+    light, deep, rem = dense("light_s"), dense("deep_s"), dense("rem_s")
+    rolling = _rolling_mean(asleep, have, window)
+    vs_target = asleep - target_minutes
+
+    # ISO weeks: date.fromordinal(1) is a Monday, so (ordinal - 1) % 7 is the weekday
+    ordinals = start.toordinal() + np.arange(days)
+    week_starts = ordinals - (ordinals - 1) % 7
+    week_idx = (week_starts - week_starts[0]) // 7
+    week_total = np.bincount(week_idx, weights=asleep)
+    week_nights = np.bincount(week_idx, weights=have.astype(float))
+
+    # bedtime = first sample, in minutes after the sleep day's start (noon the day before)
+    day_start_epoch = (ordinals[idx] - _UNIX_EPOCH_ORDINAL) * 86400.0 - SLEEP_DAY_SHIFT_HOURS * 3600.0
+    bedtime = (np.asarray(columns["first_epoch"], dtype=float) - day_start_epoch) / 60
+
+    nights = asleep[have]
+    summary = {"nights": int(nights.size), "target_minutes": target_minutes}
+    if nights.size:
+        mean, std = nights.mean(), nights.std()
+        bedtime_std = bedtime.std()
+        duration_part = max(0.0, 1 - std / mean) if mean > 0 else 0.0
+        timing_part = max(0.0, 1 - bedtime_std / BEDTIME_STD_FLOOR_MINUTES)
+        summary.update({
+            "avg_minutes": _round(mean),
+            "median_minutes": _round(np.median(nights)),
+            "std_minutes": _round(std),
+            "bedtime_std_minutes": _round(bedtime_std),
+            "consistency": _round(100 * (duration_part + timing_part) / 2),
+            "avg_vs_target_minutes": _round(mean - target_minutes),
+            "target_hit_rate": _round((nights >= target_minutes).mean(), 3),
+        })
+
+    daily_days = np.flatnonzero(have)
+    return {
+        "start": start,
+        "end": start + dt.timedelta(days=days - 1),
+        "window": window,
+        "daily": [
+            {
+                "day": dt.date.fromordinal(int(ordinals[i])),
+                "asleep_minutes": _round(asleep[i]),
+                "light_minutes": _round(light[i]),
+                "deep_minutes": _round(deep[i]),
+                "rem_minutes": _round(rem[i]),
+                "awake_minutes": _round(awake[i]),
+                "rolling_avg_minutes": _round(rolling[i]),
+                "vs_target_minutes": _round(vs_target[i]),
+            }
+            for i in daily_days.tolist()
+        ],
+        "weekly": [
+            {
+                "week_start": dt.date.fromordinal(int(week_starts[0]) + 7 * w),
+                "asleep_minutes": _round(week_total[w]),
+                "nights": int(week_nights[w]),
+                "avg_minutes": _round(week_total[w] / week_nights[w]) if week_nights[w] else None,
+            }
+            for w in range(len(week_total))
+        ],
+        "summary": summary,
+    }
@@ -0,0 +1,257 @@
+import asyncio
+import contextlib
+import os
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import quote
+
+import jwt
+
+from app.core.settings import get_settings
+
+READ_CHUNK = 256 * 1024
+
+
+class Storage(ABC):
+    """
+    Interface for attachment blobs. Bodies are always streamed: `save` consumes
+    an async iterator of chunks and `open` yields chunks, so no backend ever
+    needs a whole file in memory.
+    """
+
+    @abstractmethod
+    async def save(self, key: str, chunks: AsyncIterator[bytes], content_type: Optional[str] = None) -> int:
+        """Store the stream under `key`; returns its size. Nothing is left behind if the stream fails."""
+
+    @abstractmethod
+    def open(self, key: str) -> AsyncIterator[bytes]:
+        """The blob's bytes, in chunks (an async generator)."""
+
+    @abstractmethod
+    async def size(self, key: str) -> Optional[int]:
+        """Size of a stored blob, or None if there is none (e.g. a pre-signed upload never happened)."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove the blob; a missing one is not an error."""
+
+    @abstractmethod
+    def presign_get(self, key: str, expires: int, filename: str) -> str:
+        """URL the client can download from directly, valid for `expires` seconds."""
+
+    @abstractmethod
+    def presign_put(self, key: str, expires: int, content_type: str) -> str:
+        """URL the client can PUT the body to directly (with this Content-Type)."""
+
+
+def _discard(f, path: str) -> None:
+    """Close and remove a partly written file; it may already be gone."""
+    f.close()
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+class LocalStorage(Storage):
+    """
+    Files under a local directory (dev / tests). Pre-signed URLs point back at
+    the API's /files/{token} endpoints, signed with the JWT secret.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return path
+
+    async def save(self, key: str, chunks: AsyncIterator[bytes], content_type: Optional[str] = None) -> int:
+        path = self._path(key)
+        tmp = path + ".part"
+        await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+        f = await asyncio.to_thread(open, tmp, "wb")
+        size = 0
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(f.write, chunk)
+                size += len(chunk)
+        except BaseException:
+            await asyncio.shield(asyncio.to_thread(_discard, f, tmp))  # runs to the end even if cancelled
+            raise
+        f.close()
+        await asyncio.to_thread(os.replace, tmp, path)  # readers never see a half-written file
+        return size
+
+    async def open(self, key: str) -> AsyncIterator[bytes]:
+        f = await asyncio.to_thread(open, self._path(key), "rb")
+        try:
+            while chunk := await asyncio.to_thread(f.read, READ_CHUNK):
+                yield chunk
+        finally:
+            f.close()
+
+    async def size(self, key: str) -> Optional[int]:
+        try:
+            return (await asyncio.to_thread(os.stat, self._path(key))).st_size
+        except FileNotFoundError:
+            return None
+
+    async def delete(self, key: str) -> None:
+        try:
+            await asyncio.to_thread(os.remove, self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _signed_url(self, key: str, method: str, expires: int, **extra: str) -> str:
+        settings = get_settings()
+        exp = datetime.now(timezone.utc) + timedelta(seconds=expires)
+        token = jwt.encode(
+            {"type": "file", "key": key, "method": method, "exp": exp, **extra},
+            settings.jwt_secret, algorithm=settings.jwt_alg,
+        )
+        return f"{settings.storage_local_url_base}/{token}"
+
+    def presign_get(self, key: str, expires: int, filename: str) -> str:
+        return self._signed_url(key, "GET", expires, filename=filename)
+
+    def presign_put(self, key: str, expires: int, content_type: str) -> str:
+        return self._signed_url(key, "PUT", expires)
+
+
+def decode_file_token(token: str, method: str) -> Dict[str, str]:
+    """Claims of a LocalStorage pre-signed URL token; raises jwt.InvalidTokenError if unusable for `method`."""
+    settings = get_settings()
+    claims = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_alg])
+    if claims.get("type") != "file" or claims.get("method") != method:
+        raise jwt.InvalidTokenError("Not a file token for this method")
+    return claims
+
+
+class S3Storage(Storage):
+    """
+    Amazon S3 (settings.s3_bucket). boto3 is blocking, so every call runs in a
+    thread. Uploads up to storage_part_size_bytes are a single PUT; larger ones
+    are sent as a multipart upload, holding at most one part in memory.
+    """
+
+    def __init__(self, bucket: str, region: Optional[str], part_size: int):
+        import boto3  # only needed when this backend is selected
+
+        self.bucket = bucket
+        self.part_size = max(part_size, 5 * 1024 * 1024)  # S3's minimum for all but the last part
+        self._s3 = boto3.client("s3", region_name=region)
+
+    async def save(self, key: str, chunks: AsyncIterator[bytes], content_type: Optional[str] = None) -> int:
+        extra = {"ContentType": content_type} if content_type else {}
+        buf = bytearray()
+        size = 0
+        upload_id: Optional[str] = None
+        parts = []
+
+        async def upload_part() -> None:
+            part_number = len(parts) + 1
+            resp = await asyncio.to_thread(
+                self._s3.upload_part, Bucket=self.bucket, Key=key,
+                UploadId=upload_id, PartNumber=part_number, Body=bytes(buf),
+            )
+            parts.append({"ETag": resp["ETag"], "PartNumber": part_number})
+            buf.clear()
+
+        try:
+            async for chunk in chunks:
+                buf += chunk
+                size += len(chunk)
+                if len(buf) >= self.part_size:
+                    if upload_id is None:
+                        resp = await asyncio.to_thread(
+                            self._s3.create_multipart_upload, Bucket=self.bucket, Key=key, **extra
+                        )
+                        upload_id = resp["UploadId"]
+                    await upload_part()
+
+            if upload_id is None:
+                await asyncio.to_thread(self._s3.put_object, Bucket=self.bucket, Key=key, Body=bytes(buf), **extra)
+            else:
+                if buf:
+                    await upload_part()
+                await asyncio.to_thread(
+                    self._s3.complete_multipart_upload, Bucket=self.bucket, Key=key,
+                    UploadId=upload_id, MultipartUpload={"Parts": parts},
+                )
+        except BaseException:
+            if upload_id is not None:
+                # don't leave billable orphan parts behind
+                await asyncio.shield(asyncio.to_thread(
+                    self._s3.abort_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id
+                ))
+            raise
+        return size
+
+    async def open(self, key: str) -> AsyncIterator[bytes]:
+        obj = await asyncio.to_thread(self._s3.get_object, Bucket=self.bucket, Key=key)
+        body = obj["Body"]
+        try:
+            while chunk := await asyncio.to_thread(body.read, READ_CHUNK):
+                yield chunk
+        finally:
+            body.close()
+
+    async def size(self, key: str) -> Optional[int]:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await asyncio.to_thread(self._s3.head_object, Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return head["ContentLength"]
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._s3.delete_object, Bucket=self.bucket, Key=key)
+
+    def presign_get(self, key: str, expires: int, filename: str) -> str:
+        return self._s3.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key, "ResponseContentDisposition": content_disposition(filename)},
+            ExpiresIn=expires,
+        )
+
+    def presign_put(self, key: str, expires: int, content_type: str) -> str:
+        return self._s3.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": self.bucket, "Key": key, "ContentType": content_type},
+            ExpiresIn=expires,
+        )
+
+
+def attachment_key(user_id: int, note_id: int) -> str:
+    """A fresh storage key; never derived from the client's filename."""
+    return f"{user_id}/{note_id}/{uuid.uuid4().hex}"
+
+
+def content_disposition(filename: str) -> str:
+    """Content-Disposition for downloading `filename` (any characters, RFC 5987 encoded)."""
+    return f"attachment; filename*=UTF-8''{quote(filename)}"
+
+
+_storage: Optional[Storage] = None
+
+
+def get_storage() -> Storage:
+    """The configured storage backend, created on first use (so startup never imports boto3)."""
+    global _storage
+    if _storage is None:
+        settings = get_settings()
+        if settings.storage_backend == "s3":
+            if not settings.s3_bucket:
+                raise ValueError("storage_backend 's3' needs s3_bucket")
+            _storage = S3Storage(settings.s3_bucket, settings.aws_region, settings.storage_part_size_bytes)
+        elif settings.storage_backend == "local":
+            _storage = LocalStorage(settings.storage_local_dir)
+        else:
+            raise ValueError(f"Unknown storage_backend: {settings.storage_backend!r}")
+    return _storage
@@ -0,0 +1,62 @@
+from typing import Optional, Tuple
+
+from sqlalchemy import Select, Text, cast, func, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Note
+
+
+def notes_after(user_id: int, after_id: int) -> Select:
+    """
+    Keyset query over the (user_id, id) index: rows strictly after `after_id`, in id order.
+    """
+    return (
+        select(Note.id, Note.title, Note.body, Note.done)
+        .where(Note.user_id == user_id, Note.id > after_id)
+        .order_by(Note.id)
+    )
+
+
+def _note_json(cols):
+    # same keys/order as NoteOut
+    return func.json_build_object(
+        text("'id'"), cols.id, text("'title'"), cols.title, text("'body'"), cols.body, text("'done'"), cols.done
+    )
+
+
+def notes_ndjson_after(user_id: int, after_id: int) -> Select:
+    """
+    notes_after, but each row is already a JSON text rendered by Postgres.
+    """
+    rows = notes_after(user_id, after_id).subquery()
+    return select(cast(_note_json(rows.c), Text)).order_by(rows.c.id)
+
+
+async def notes_page_json(
+    session: AsyncSession, user_id: int, after_id: int, limit: int
+) -> Tuple[str, Optional[int]]:
+    """
+    One page of notes as a JSON array built by Postgres (json_agg), in one round trip.
+    Returns (items_json, last_id) where last_id is set only if another page exists.
+    """
+    rows = (
+        notes_after(user_id, after_id)
+        .add_columns(func.row_number().over(order_by=Note.id).label("rn"))
+        .limit(limit + 1)  # one extra row tells us whether there is a next page
+        .subquery()
+    )
+    on_page = rows.c.rn <= limit
+    stmt = select(
+        cast(
+            func.coalesce(
+                func.json_agg(aggregate_order_by(_note_json(rows.c), rows.c.id)).filter(on_page),
+                text("'[]'::json"),
+            ),
+            Text,
+        ),
+        func.max(rows.c.id).filter(on_page),
+        func.count(),
+    )
+    items_json, last_id, n = (await session.execute(stmt)).one()
+    return items_json, (last_id if n > limit else None)
@@ -1,22 +1,340 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from app.core.settings import settings
-
-# Create a single async engine for the app
-engine = create_async_engine(
-    settings.db_dsn_async,
-    pool_pre_ping=True,   # checks connections before using them
-    echo=False,           # set True to see SQL in logs
-)
-
-# Factory that yields AsyncSession objects
-AsyncSessionLocal = async_sessionmaker(
-    bind=engine,
-    autoflush=False,
-    expire_on_commit=False,
-    class_=AsyncSession,
-)
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core.settings import get_settings
+from app.core.metrics import DB_QUERY_LATENCY
+from app.core.cache import CacheBackend, RedisCache
+
+log = logging.getLogger(__name__)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The default async queue pool, plus a record of how long each checkout
+    waited for a connection (time spent queued behind a full pool).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats: Dict[str, float] = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats["timeouts"] += 1
+            raise
+        finally:
+            waited = (time.perf_counter() - t0) * 1000
+            self.wait_stats["checkouts"] += 1
+            self.wait_stats["wait_ms_total"] += waited
+            self.wait_stats["wait_ms_max"] = max(self.wait_stats["wait_ms_max"], waited)
+
+
+# --- per-request query counting ---------------------------------------------
+# Every statement sent through any engine (primary or replica: _create_engine
+# attaches the hooks) bumps the counter of the current context (a request, a
+# test block, ...). SQLAlchemy carries contextvars into the greenlet that runs
+# the sync event hooks, so this works with AsyncSession.
+
+class QueryCounter:
+    def __init__(self, parent: Optional["QueryCounter"] = None) -> None:
+        self.count = 0
+        self.parent = parent  # enclosing block, counted too (a test around a request, ...)
+
+
+_current_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """
+    Count SQL statements executed inside the block (blocks nest: the
+    middleware's per-request count doesn't hide queries from a test's block):
+
+        with count_queries() as q:
+            ...
+        assert q.count == 1
+    """
+    counter = QueryCounter(_current_counter.get())
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    while counter is not None:
+        counter.count += 1
+        counter = counter.parent
+    context._query_started = time.perf_counter()
+
+
+def _time_query(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is not None:
+        DB_QUERY_LATENCY.observe(time.perf_counter() - started)
+
+
+def _connect_args() -> dict:
+    if get_settings().db_pgbouncer:
+        # a transaction-mode pooler hands each transaction a different server connection:
+        # statements prepared on one aren't there on the next, and names must not collide
+        return {
+            "prepared_statement_cache_size": 0,
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {"prepared_statement_cache_size": get_settings().db_statement_cache_size}
+
+
+def _create_engine(dsn: str) -> AsyncEngine:
+    settings = get_settings()
+    e = create_async_engine(
+        dsn,
+        poolclass=TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        # SELECT 1 on every checkout; off by default, since recycle plus SQLAlchemy's
+        # disconnect handling already cover dropped connections
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=_connect_args(),
+        echo=False,           # set True to see SQL in logs
+    )
+    event.listen(e.sync_engine, "before_cursor_execute", _count_query)
+    event.listen(e.sync_engine, "after_cursor_execute", _time_query)
+    return e
+
+
+# The app's engine on the primary and its session factory, created on first
+# use rather than at import (creating them opens no connection either)
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker[AsyncSession]] = None
+
+
+def get_engine() -> AsyncEngine:
+    global _engine, _sessionmaker
+    if _engine is None:
+        _engine = _create_engine(get_settings().db_dsn_async)
+        _sessionmaker = async_sessionmaker(
+            bind=_engine,
+            autoflush=False,
+            expire_on_commit=False,
+            class_=AsyncSession,
+        )
+    return _engine
+
+
+def new_session() -> AsyncSession:
+    """A session on the primary; the caller closes it (`async with new_session() as session:`)."""
+    get_engine()
+    return _sessionmaker()
+
+
+def pool_stats() -> dict:
+    """
+    Live pool state (checked out / idle / overflow) plus checkout wait times,
+    for sizing the pool against the number of workers.
+    """
+    pool = get_engine().pool
+    wait = pool.wait_stats
+    checkouts = wait["checkouts"]
+    return {
+        "size": pool.size(),
+        "max_overflow": get_settings().db_max_overflow,
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "checkouts": checkouts,
+        "timeouts": wait["timeouts"],
+        "wait_ms_avg": round(wait["wait_ms_total"] / checkouts, 3) if checkouts else 0.0,
+        "wait_ms_max": round(wait["wait_ms_max"], 3),
+    }
+
+
+async def warm_pool(prime: Optional[Callable[[AsyncSession], Awaitable[None]]] = None) -> int:
+    """
+    Open db_pool_size connections at once and hand them back to the pool idle,
+    so the first requests after startup don't wait on connection setup.
+    `prime` runs on each of them, e.g. to get hot statements into every
+    connection's prepared-statement cache. Returns the number of connections opened.
+    """
+    settings = get_settings()
+    sessions = [new_session() for _ in range(settings.db_pool_size)]
+    try:
+        await asyncio.gather(*(s.connection() for s in sessions))
+        if prime is not None:
+            await asyncio.gather(*(prime(s) for s in sessions))
+    finally:
+        await asyncio.gather(*(s.close() for s in sessions))
+    return len(sessions)
+
 
 # Dependency for FastAPI routes (we'll use this soon)
 async def get_session() -> AsyncSession:
-    async with AsyncSessionLocal() as session:
+    async with new_session() as session:
+        yield session
+
+
+# --- read replicas ----------------------------------------------------------
+# Optional. Reads that opt in (app.deps.db.get_read_session) go round-robin to
+# healthy replicas; a replica that fails to hand out a connection is skipped
+# for db_replica_retry_seconds, and with none available reads use the primary.
+
+class ReplicaSet:
+    def __init__(self, dsns: List[str], retry_after: float):
+        self.engines = [_create_engine(dsn) for dsn in dsns]
+        self.retry_after = retry_after
+        # read-your-writes markers (below) must reach every worker, so they live in
+        # Redis whatever cache_backend is; only needed at all with replicas
+        self.write_markers: Optional[CacheBackend] = RedisCache(get_settings().redis_url) if dsns else None
+        self._sessionmakers = [
+            async_sessionmaker(bind=e, autoflush=False, expire_on_commit=False, class_=AsyncSession)
+            for e in self.engines
+        ]
+        self._down_until = [0.0] * len(self.engines)
+        self._turn = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def _candidates(self) -> Iterator[int]:
+        """Healthy replica indexes, starting at the next one in round-robin order."""
+        n = len(self.engines)
+        start = next(self._turn) % n
+        now = time.monotonic()
+        for i in range(n):
+            idx = (start + i) % n
+            if self._down_until[idx] <= now:
+                yield idx
+
+    async def open_session(self) -> Optional[AsyncSession]:
+        """A session with a connection already checked out from a healthy replica, or None."""
+        for idx in self._candidates():
+            session = self._sessionmakers[idx]()
+            try:
+                await session.connection()
+            except (exc.DBAPIError, OSError):
+                await session.close()
+                self._down_until[idx] = time.monotonic() + self.retry_after
+                log.warning("read replica %d unavailable; using others for %ss", idx, self.retry_after)
+                continue
+            return session
+        return None
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {"replica": idx, "healthy": self._down_until[idx] <= now, "checked_out": e.pool.checkedout()}
+            for idx, e in enumerate(self.engines)
+        ]
+
+    async def dispose(self) -> None:
+        for e in self.engines:
+            await e.dispose()
+        if self.write_markers is not None:
+            await self.write_markers.close()
+
+
+_replicas: Optional[ReplicaSet] = None
+
+
+def get_replicas() -> ReplicaSet:
+    """The configured replicas (possibly none), created on first use."""
+    global _replicas
+    if _replicas is None:
+        settings = get_settings()
+        _replicas = ReplicaSet(settings.db_replica_dsns, settings.db_replica_retry_seconds)
+    return _replicas
+
+
+async def dispose_engines() -> None:
+    """Close the replica and primary engines (on shutdown); later use creates new ones."""
+    global _engine, _sessionmaker, _replicas
+    if _replicas is not None:
+        await _replicas.dispose()
+        _replicas = None
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = _sessionmaker = None
+
+
+@asynccontextmanager
+async def read_session(use_primary: bool = False) -> AsyncIterator[AsyncSession]:
+    """
+    Session for read-only work: a replica when one is configured and healthy, else the primary.
+    """
+    session = None
+    replicas = get_replicas()
+    if replicas and not use_primary:
+        session = await replicas.open_session()
+    if session is None:
+        session = new_session()
+    async with session:
         yield session
+
+
+# --- read-your-writes -------------------------------------------------------
+# After a user commits a write, their reads stay on the primary for
+# db_read_your_writes_seconds so replica lag can't hide their own change.
+# Kept per process and, for other workers, as a short-lived key in Redis
+# (ReplicaSet.write_markers); if Redis can't answer, reads stay on the primary.
+
+_recent_writes: Dict[int, float] = {}
+
+
+def _write_key(user_id: int) -> str:
+    return f"wrote:{user_id}"
+
+
+async def mark_user_write(user_id: int) -> None:
+    replicas = get_replicas()
+    if not replicas:
+        return
+    window = get_settings().db_read_your_writes_seconds
+    now = time.monotonic()
+    _recent_writes[user_id] = now + window
+    if len(_recent_writes) > 10_000:
+        for uid in [u for u, until in _recent_writes.items() if until <= now]:
+            del _recent_writes[uid]
+    try:
+        await replicas.write_markers.set(_write_key(user_id), b"1", max(1, int(window + 0.999)))
+    except Exception:
+        log.warning("could not share write marker for user %s", user_id, exc_info=True)
+
+
+async def wrote_recently(user_id: int) -> bool:
+    replicas = get_replicas()
+    if not replicas:
+        return False
+    if _recent_writes.get(user_id, 0.0) > time.monotonic():
+        return True
+    try:
+        return await replicas.write_markers.get(_write_key(user_id)) is not None
+    except Exception:
+        return True  # can't tell: stay safe on the primary
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_commit(session):
+    session.info["committed"] = True
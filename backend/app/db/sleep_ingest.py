@@ -0,0 +1,193 @@
+"""
+Bulk ingestion of device sleep samples.
+
+The upload is parsed line by line as it streams in and the rows are fed
+straight into COPY (binary protocol, via the session's asyncpg connection)
+into a temporary table; one INSERT ... SELECT ... ON CONFLICT DO NOTHING then
+moves them into sleep_samples, skipping any (user_id, ts) already stored, and
+adds the new ones to the sleep_daily rollup.
+Nothing holds more than a network chunk of the upload in memory.
+
+Formats (one sample per line):
+  ndjson  {"ts": "2026-10-01T23:00:00Z", "stage": "light", "duration_s": 30, "heart_rate": 54}
+  csv     header line naming the columns (ts,stage[,duration_s][,heart_rate]), then
+          plain comma-separated values (no quoting)
+`ts` must carry a timezone; `stage` is one of awake / light / deep / rem;
+duration_s defaults to 30 and heart_rate is optional. Rows that don't fit the
+columns are rejected here, never left for COPY to fail on; a line longer than
+MAX_LINE_BYTES rejects the whole upload.
+"""
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.sleep_daily import SLEEP_DAY_SHIFT_HOURS
+from app.models.sleep_sample import SLEEP_STAGES
+
+MAX_ERRORS = 10
+MAX_LINE_BYTES = 4096   # far above any real sample line; bounds what a newline-less upload can buffer
+SMALLINT_MAX = 32767    # sleep_samples_in / sleep_samples columns are smallint
+
+# Moves the COPYed rows into sleep_samples and adds exactly the rows that were
+# new (duplicates aren't RETURNed) to the sleep_daily rollup, in one statement.
+# Returns the number of samples inserted.
+STORE_AND_ROLL_UP = f"""
+WITH inserted AS (
+    INSERT INTO sleep_samples (user_id, ts, stage, duration_s, heart_rate)
+    SELECT :user_id, ts, stage, duration_s, heart_rate FROM sleep_samples_in
+    ON CONFLICT (user_id, ts) DO NOTHING
+    RETURNING ts, stage, duration_s
+), per_day AS (
+    INSERT INTO sleep_daily AS d (user_id, day, awake_s, light_s, deep_s, rem_s, samples, first_ts, last_ts)
+    SELECT :user_id,
+           ((ts AT TIME ZONE 'UTC') + interval '{SLEEP_DAY_SHIFT_HOURS} hours')::date,
+           coalesce(sum(duration_s) FILTER (WHERE stage = {SLEEP_STAGES["awake"]}), 0),
+           coalesce(sum(duration_s) FILTER (WHERE stage = {SLEEP_STAGES["light"]}), 0),
+           coalesce(sum(duration_s) FILTER (WHERE stage = {SLEEP_STAGES["deep"]}), 0),
+           coalesce(sum(duration_s) FILTER (WHERE stage = {SLEEP_STAGES["rem"]}), 0),
+           count(*), min(ts), max(ts)
+      FROM inserted
+     GROUP BY 2
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        awake_s = d.awake_s + EXCLUDED.awake_s,
+        light_s = d.light_s + EXCLUDED.light_s,
+        deep_s = d.deep_s + EXCLUDED.deep_s,
+        rem_s = d.rem_s + EXCLUDED.rem_s,
+        samples = d.samples + EXCLUDED.samples,
+        first_ts = least(d.first_ts, EXCLUDED.first_ts),
+        last_ts = greatest(d.last_ts, EXCLUDED.last_ts)
+)
+SELECT count(*) FROM inserted
+"""
+COLUMNS = ("ts", "stage", "duration_s", "heart_rate")
+
+Record = Tuple[datetime, int, int, Optional[int]]
+
+
+@dataclass
+class IngestStats:
+    received: int = 0
+    inserted: int = 0
+    rejected: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def duplicates(self) -> int:
+        return self.received - self.inserted
+
+    def reject(self, line_no: int, reason: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"line {line_no}: {reason}")
+
+
+async def lines(chunks: AsyncIterator[bytes], max_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[str]:
+    """
+    Split a byte stream into text lines without buffering more than one partial line.
+    Raises ValueError for a line longer than `max_bytes`.
+    """
+    pending = b""
+    line_no = 0
+    async for chunk in chunks:
+        pending += chunk
+        *complete, pending = pending.split(b"\n")
+        for line in complete:
+            line_no += 1
+            if len(line) > max_bytes:
+                raise ValueError(f"line {line_no}: longer than {max_bytes} bytes")
+            yield line.decode("utf-8").rstrip("\r")
+        if len(pending) > max_bytes:
+            raise ValueError(f"line {line_no + 1}: longer than {max_bytes} bytes")
+    if pending:
+        yield pending.decode("utf-8").rstrip("\r")
+
+
+def _record(ts: str, stage: str, duration_s, heart_rate) -> Record:
+    when = datetime.fromisoformat(ts)
+    if when.tzinfo is None:
+        raise ValueError("ts needs a timezone")
+    code = SLEEP_STAGES.get(stage)
+    if code is None:
+        raise ValueError(f"unknown stage {stage!r}")
+    duration = 30 if duration_s in (None, "") else int(duration_s)
+    if not 0 < duration <= 3600:
+        raise ValueError("duration_s out of range")
+    hr = None if heart_rate in (None, "") else int(heart_rate)
+    if hr is not None and not 0 < hr <= SMALLINT_MAX:
+        raise ValueError("heart_rate out of range")
+    return when, code, duration, hr
+
+
+def _ndjson_parser(first: str) -> Tuple[Callable[[str], Record], bool]:
+    def parse(line: str) -> Record:
+        obj = json.loads(line)
+        return _record(obj["ts"], obj["stage"], obj.get("duration_s"), obj.get("heart_rate"))
+    return parse, False  # first line is data
+
+
+def _csv_parser(header: str) -> Tuple[Callable[[str], Record], bool]:
+    names = [h.strip() for h in header.split(",")]
+    if "ts" not in names or "stage" not in names:
+        raise ValueError("CSV header must name at least ts and stage")
+    idx: Dict[str, Optional[int]] = {c: (names.index(c) if c in names else None) for c in COLUMNS}
+
+    def parse(line: str) -> Record:
+        values = line.split(",")
+        if len(values) != len(names):
+            raise ValueError(f"expected {len(names)} fields, got {len(values)}")
+        get = lambda c: values[idx[c]].strip() if idx[c] is not None else None  # noqa: E731
+        return _record(get("ts"), get("stage"), get("duration_s"), get("heart_rate"))
+    return parse, True  # first line was the header
+
+
+PARSERS = {"ndjson": _ndjson_parser, "csv": _csv_parser}
+
+
+async def _records(source: AsyncIterator[str], fmt: str, stats: IngestStats) -> AsyncIterator[Record]:
+    parse = None
+    line_no = 0
+    async for line in source:
+        line_no += 1
+        if not line.strip():
+            continue
+        if parse is None:
+            parse, was_header = PARSERS[fmt](line)
+            if was_header:
+                continue
+        try:
+            record = parse(line)
+        except KeyError as e:
+            stats.reject(line_no, f"missing field {e}")
+            continue
+        except (ValueError, TypeError) as e:  # json.JSONDecodeError is a ValueError
+            stats.reject(line_no, str(e) or type(e).__name__)
+            continue
+        stats.received += 1
+        yield record
+
+
+async def ingest_sleep_samples(
+    session: AsyncSession, user_id: int, source: AsyncIterator[str], fmt: str,
+) -> IngestStats:
+    """
+    COPY the parsed rows of `source` into sleep_samples for `user_id`, deduplicated
+    on (user_id, ts). Runs in the session's transaction; the caller commits.
+    Raises ValueError if the CSV header is unusable.
+    """
+    stats = IngestStats()
+    await session.execute(text(
+        "CREATE TEMP TABLE sleep_samples_in "
+        "(ts timestamptz, stage smallint, duration_s smallint, heart_rate smallint) ON COMMIT DROP"
+    ))
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "sleep_samples_in", records=_records(source, fmt, stats), columns=list(COLUMNS),
+    )
+    result = await session.execute(text(STORE_AND_ROLL_UP), {"user_id": user_id})
+    stats.inserted = result.scalar_one()
+    return stats
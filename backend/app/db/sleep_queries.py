@@ -0,0 +1,35 @@
+import datetime as dt
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# One row for the whole range: every column comes back as a Postgres array
+# (index-aligned, in day order), ready to be wrapped as NumPy arrays, plus
+# the user's target from user_prefs. A single round trip whatever the range.
+DAILY_COLUMNS = text("""
+SELECT array_agg(day - CAST(:start AS date) ORDER BY day)          AS day_idx,
+       array_agg(light_s + deep_s + rem_s ORDER BY day)             AS asleep_s,
+       array_agg(awake_s ORDER BY day)                               AS awake_s,
+       array_agg(light_s ORDER BY day)                               AS light_s,
+       array_agg(deep_s ORDER BY day)                                AS deep_s,
+       array_agg(rem_s ORDER BY day)                                 AS rem_s,
+       array_agg(extract(epoch FROM first_ts)::float8 ORDER BY day) AS first_epoch,
+       (SELECT sleep_minutes FROM user_prefs WHERE user_id = :user_id) AS target_minutes
+  FROM sleep_daily
+ WHERE user_id = :user_id AND day BETWEEN CAST(:start AS date) AND CAST(:end AS date)
+""")
+
+COLUMN_NAMES = ("day_idx", "asleep_s", "awake_s", "light_s", "deep_s", "rem_s", "first_epoch")
+
+
+async def sleep_daily_columns(
+    session: AsyncSession, user_id: int, start: dt.date, end: dt.date,
+) -> Tuple[Dict[str, List], Optional[int]]:
+    """
+    The user's sleep_daily rows from `start` to `end` as columns
+    (day_idx = days since `start`), and their sleep_minutes target (None if unset).
+    """
+    row = (await session.execute(DAILY_COLUMNS, {"user_id": user_id, "start": start, "end": end})).one()
+    columns = {name: getattr(row, name) or [] for name in COLUMN_NAMES}
+    return columns, row.target_minutes
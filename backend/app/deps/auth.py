@@ -0,0 +1,32 @@
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jwt import InvalidTokenError
+
+from app.core.jwt import decode_token
+
+# auto_error=False so a missing header gets our 401 instead of FastAPI's 403
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_current_user_claims(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+) -> dict:
+    """
+    Read `Authorization: Bearer <access_token>` and return {"user_id", "email"}.
+    Raises 401 if the header is missing or the token is invalid, expired or not an access token.
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        data = decode_token(credentials.credentials, expected_type="access")
+    except InvalidTokenError:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return {"user_id": int(data["sub"]), "email": data.get("email")}
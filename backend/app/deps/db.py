@@ -0,0 +1,26 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import mark_user_write, new_session, read_session, wrote_recently
+from app.deps.auth import get_current_user_claims
+
+
+async def get_read_session(claims: dict = Depends(get_current_user_claims)) -> AsyncSession:
+    """
+    Session for read-only handlers: served by a replica when configured,
+    or by the primary if this user wrote something in the last few seconds.
+    """
+    use_primary = await wrote_recently(claims["user_id"])
+    async with read_session(use_primary=use_primary) as session:
+        yield session
+
+
+async def get_write_session(claims: dict = Depends(get_current_user_claims)) -> AsyncSession:
+    """
+    Primary session for handlers that write on behalf of the user; a commit
+    routes that user's next reads to the primary (read-your-writes).
+    """
+    async with new_session() as session:
+        yield session
+        if session.info.get("committed"):
+            await mark_user_write(claims["user_id"])
@@ -0,0 +1,97 @@
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import get_settings
+from app.models import Job
+
+
+@dataclass
+class ClaimedJob:
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int   # including the current one
+
+
+async def enqueue(session: AsyncSession, kind: str, payload: Dict[str, Any], delay: float = 0) -> None:
+    """
+    Queue a job in the caller's transaction: workers only see it once the caller
+    commits, and never if it rolls back.
+    """
+    values: Dict[str, Any] = {"kind": kind, "payload": payload}
+    if delay:
+        values["run_at"] = func.now() + timedelta(seconds=delay)
+    await session.execute(insert(Job).values(**values))
+
+
+async def claim_due(session: AsyncSession, limit: int) -> List[ClaimedJob]:
+    """
+    Mark up to `limit` due jobs as running and return them. SKIP LOCKED lets any
+    number of workers poll at once without handing out the same job twice.
+    Commit right after, so the claim is visible before the jobs run.
+    """
+    due = (
+        select(Job.id)
+        .where(Job.status == "pending", Job.run_at <= func.now())
+        .order_by(Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        update(Job)
+        .where(Job.id.in_(due.scalar_subquery()))
+        .values(status="running", locked_at=func.now(), attempts=Job.attempts + 1)
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts)
+    )
+    return [ClaimedJob(*row) for row in result.all()]
+
+
+async def complete(session: AsyncSession, job_id: int) -> None:
+    await session.execute(delete(Job).where(Job.id == job_id))
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff after the n-th failed attempt, capped, with jitter (50-100%)."""
+    settings = get_settings()
+    delay = min(settings.job_backoff_max_seconds, settings.job_backoff_base_seconds * 2 ** (attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+async def fail(session: AsyncSession, job: ClaimedJob, error: str, retry: bool = True) -> None:
+    """Schedule the next attempt, or give up for good after job_max_attempts (or if not `retry`)."""
+    if retry and job.attempts < get_settings().job_max_attempts:
+        values: Dict[str, Any] = {
+            "status": "pending",
+            "run_at": func.now() + timedelta(seconds=backoff_seconds(job.attempts)),
+        }
+    else:
+        values = {"status": "failed"}
+    await session.execute(
+        update(Job).where(Job.id == job.id).values(locked_at=None, last_error=error[:2000], **values)
+    )
+
+
+async def requeue_stale(session: AsyncSession) -> int:
+    """
+    Jobs left 'running' longer than job_lock_timeout_seconds belong to a worker
+    that died mid-job: put them back (or fail them if out of attempts).
+    """
+    settings = get_settings()
+    result = await session.execute(
+        update(Job)
+        .where(
+            Job.status == "running",
+            Job.locked_at < func.now() - timedelta(seconds=settings.job_lock_timeout_seconds),
+        )
+        .values(
+            status=case((Job.attempts >= settings.job_max_attempts, "failed"), else_="pending"),
+            locked_at=None,
+            last_error="lock timeout",
+        )
+    )
+    return result.rowcount
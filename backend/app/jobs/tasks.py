@@ -0,0 +1,121 @@
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.jwt import create_verify_token
+from app.core.mailer import EmailSender, make_email_sender
+from app.core.settings import get_settings
+from app.core.storage import get_storage
+from app.db.session import new_session
+from app.jobs.queue import enqueue
+from app.models import Attachment, NoteSyncHorizon, NoteTombstone, User
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# job kind -> handler; a handler raising means "retry later"
+HANDLERS: Dict[str, Handler] = {}
+
+SEND_VERIFICATION_EMAIL = "send_verification_email"
+DELETE_BLOBS = "delete_blobs"
+
+
+def task(kind: str) -> Callable[[Handler], Handler]:
+    def register(fn: Handler) -> Handler:
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+_mailer: Optional[EmailSender] = None
+
+
+def get_mailer() -> EmailSender:
+    global _mailer
+    if _mailer is None:
+        _mailer = make_email_sender()
+    return _mailer
+
+
+@task(SEND_VERIFICATION_EMAIL)
+async def send_verification_email(payload: Dict[str, Any]) -> None:
+    settings = get_settings()
+    async with new_session() as session:
+        row = (await session.execute(
+            select(User.email, User.verified).where(User.id == payload["user_id"])
+        )).one_or_none()
+    if row is None or row.verified:
+        return  # user deleted or already verified: nothing to send
+
+    token = create_verify_token(payload["user_id"], row.email)
+    await get_mailer().send(
+        row.email,
+        f"Verify your {settings.app_name} account",
+        "Confirm your email address by opening this link:\n\n"
+        f"{settings.verify_url_base}?token={token}\n\n"
+        f"The link expires in {settings.verify_token_hours} hours.\n",
+    )
+
+
+@task(DELETE_BLOBS)
+async def delete_blobs(payload: Dict[str, Any]) -> None:
+    """Remove attachment bytes whose rows are gone. Safe to retry: deleting a missing blob is a no-op."""
+    storage = get_storage()
+    for key in payload["keys"]:
+        await storage.delete(key)
+
+
+async def sweep_attachments(session: AsyncSession) -> int:
+    """
+    Delete up to attachment_sweep_batch attachment rows whose note (or user) is gone, or
+    whose pre-signed upload was never completed in time, and queue their blobs
+    for removal in the same transaction. Returns how many rows went.
+    """
+    settings = get_settings()
+    abandoned = func.now() - timedelta(
+        seconds=settings.storage_presign_seconds + settings.attachment_pending_grace_seconds
+    )
+    doomed = (
+        select(Attachment.id)
+        .where(or_(
+            Attachment.note_id.is_(None),
+            (Attachment.status == "pending") & (Attachment.created_at < abandoned),
+        ))
+        .limit(get_settings().attachment_sweep_batch)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        delete(Attachment).where(Attachment.id.in_(doomed.scalar_subquery())).returning(Attachment.storage_key)
+    )
+    keys = list(result.scalars())
+    if keys:
+        await enqueue(session, DELETE_BLOBS, {"keys": keys})
+    return len(keys)
+
+
+async def prune_note_tombstones(session: AsyncSession) -> int:
+    """
+    Delete up to note_tombstone_prune_batch tombstones older than
+    note_tombstone_retention_days and raise the sync horizon past them in the
+    same transaction, so /notes/changes tells a client that slept through them
+    to start over instead of silently keeping the deleted notes. Returns how many went.
+    """
+    settings = get_settings()
+    expired = (
+        select(NoteTombstone.id)
+        .where(NoteTombstone.deleted_at < func.now() - timedelta(days=settings.note_tombstone_retention_days))
+        .limit(settings.note_tombstone_prune_batch)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        delete(NoteTombstone).where(NoteTombstone.id.in_(expired.scalar_subquery())).returning(NoteTombstone.version)
+    )
+    versions = list(result.scalars())
+    if versions:
+        await session.execute(
+            update(NoteSyncHorizon)
+            .where(NoteSyncHorizon.id == 1)
+            .values(version=func.greatest(NoteSyncHorizon.version, max(versions)))
+        )
+    return len(versions)
@@ -0,0 +1,107 @@
+"""
+Job worker: runs queued side effects (verification email, ...) outside the API,
+and the periodic upkeep (requeueing lost jobs, sweeping detached attachments,
+pruning old note tombstones).
+
+    python -m app.jobs.worker            # poll forever
+    python -m app.jobs.worker --drain    # run everything due, then exit
+
+Any number of workers can run side by side. SIGTERM / SIGINT finish the
+current batch and exit.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+import time
+
+from app.core.settings import get_settings
+from app.db.session import dispose_engines, new_session
+from app.jobs.queue import ClaimedJob, claim_due, complete, fail, requeue_stale
+from app.jobs.tasks import HANDLERS, prune_note_tombstones, sweep_attachments
+
+log = logging.getLogger("app.jobs.worker")
+
+
+async def _run(job: ClaimedJob) -> None:
+    handler = HANDLERS.get(job.kind)
+    t0 = time.perf_counter()
+    async with new_session() as session:
+        if handler is None:
+            log.error("job %s: unknown kind %r", job.id, job.kind)
+            await fail(session, job, f"unknown job kind {job.kind!r}", retry=False)
+        else:
+            try:
+                await handler(job.payload)
+            except Exception as e:
+                log.warning("job %s (%s) attempt %d failed", job.id, job.kind, job.attempts, exc_info=True)
+                await fail(session, job, repr(e))
+            else:
+                log.info("job %s (%s) done in %.0fms", job.id, job.kind, (time.perf_counter() - t0) * 1000)
+                await complete(session, job.id)
+        await session.commit()
+
+
+async def run_batch() -> int:
+    """Claim and run one batch of due jobs concurrently. Returns how many ran."""
+    async with new_session() as session:
+        jobs = await claim_due(session, get_settings().job_batch_size)
+        await session.commit()
+    for job, outcome in zip(jobs, await asyncio.gather(*(_run(job) for job in jobs), return_exceptions=True)):
+        if isinstance(outcome, Exception):
+            # couldn't even record the outcome; requeue_stale picks the job up after the lock timeout
+            log.error("job %s: bookkeeping failed", job.id, exc_info=outcome)
+    return len(jobs)
+
+
+async def main(drain: bool = False) -> None:
+    settings = get_settings()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopping.set)
+
+    next_requeue = next_sweep = next_prune = 0.0
+    try:
+        while not stopping.is_set():
+            if time.monotonic() >= next_requeue:
+                async with new_session() as session:
+                    if n := await requeue_stale(session):
+                        log.warning("requeued %d stale job(s)", n)
+                    await session.commit()
+                next_requeue = time.monotonic() + settings.job_lock_timeout_seconds / 2
+
+            if time.monotonic() >= next_sweep:
+                async with new_session() as session:
+                    while n := await sweep_attachments(session):
+                        await session.commit()
+                        log.info("swept %d detached or abandoned attachment(s)", n)
+                    await session.commit()
+                next_sweep = time.monotonic() + settings.attachment_sweep_seconds
+
+            if time.monotonic() >= next_prune:
+                async with new_session() as session:
+                    while n := await prune_note_tombstones(session):
+                        await session.commit()
+                        log.info("pruned %d note tombstone(s)", n)
+                    await session.commit()
+                next_prune = time.monotonic() + settings.note_tombstone_prune_seconds
+
+            if await run_batch():
+                continue  # more may be due right away
+            if drain:
+                break
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=settings.job_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--drain", action="store_true", help="exit once no job is due")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main(drain=args.drain))
@@ -1,40 +1,116 @@
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy import text, select
+import json
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from jwt import InvalidTokenError
+from sqlalchemy import (
+    BigInteger, Boolean, Float, Integer, String, Text,
+    cast, column, delete, func, insert, literal, select, text, true, tuple_, update, values,
+)
+from sqlalchemy.dialects.postgresql import REGCONFIG, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.settings import settings
-from app.db.session import get_session
-from app.core.security import hash_password, verify_password 
-from app.core.jwt import create_access_token, create_refresh_token     # <-- add
-from app.schemas.auth import SignupIn, UserOut, LoginIn, TokenPair
-from app.schemas.auth import SignupIn, UserOut
-from app.models import User
-from app.deps.auth import get_current_user_claims 
-from app.core.jwt import create_access_token, create_refresh_token, decode_token
-from app.schemas.auth import SignupIn, UserOut, LoginIn, TokenPair, RefreshIn, AccessTokenOut
-from app.schemas.note import NoteCreate, NoteOut, NoteUpdate
-from app.models import Note
+from app.core.settings import get_settings
+from app.db.session import (
+    dispose_engines, get_replicas, get_session, read_session, wrote_recently, pool_stats, warm_pool,
+)
+from app.db.note_queries import notes_ndjson_after, notes_page_json
+from app.db.sleep_ingest import ingest_sleep_samples, lines as sleep_lines
+from app.db.sleep_queries import sleep_daily_columns
+from app.core.metrics import register_stats, render as render_metrics
+from app.core.middleware import MetricsMiddleware
+from app.core.note_events import close_note_events, get_note_events
+from app.core.security import (
+    hash_password_async,
+    verify_password_async,
+    hash_pool_stats,
+    shutdown_hash_pool,
+    warm_hash_pool,
+)
+from app.core.pagination import encode_cursor, decode_cursor, encode_rank_cursor, decode_rank_cursor
+from app.core.cache import close_cache, get_cache, note_key, prefs_key
+from app.core.ratelimit import client_ip, close_rate_limiter, get_rate_limiter
+from app.core.revocation import close_revocations, get_revocations
+from app.core.sleep_analytics import analyze as analyze_sleep, sleep_day
+from app.core.responses import model_response, raw_json_response
+from app.core.storage import LocalStorage, attachment_key, content_disposition, decode_file_token, get_storage
+from app.core.jwt import create_access_token, create_refresh_token, decode_token, token_cache_stats
+from app.deps.auth import get_current_user_claims
+from app.deps.db import get_read_session, get_write_session
+from app.jobs.queue import enqueue
+from app.jobs.tasks import DELETE_BLOBS, SEND_VERIFICATION_EMAIL
+from app.models import Attachment, Note, NoteSyncHorizon, NoteTombstone, User, UserPref
+from app.models.note import SEARCH_CONFIG
+from app.schemas.attachment import (
+    AttachmentOut, AttachmentList, AttachmentPresignIn, AttachmentPresignOut, AttachmentUrlOut,
+)
+from app.schemas.auth import SignupIn, UserOut, LoginIn, TokenPair, RefreshIn
+from app.schemas.note import (
+    NoteCreate, NoteOut, NoteUpdate, NotePage,
+    NoteBatchCreate, NoteBatchUpdate, NoteBatchDelete, NoteBatchResult, NoteBatchOut,
+    NoteSearchHit, NoteSearchPage,
+    NoteChange, NoteDeleted, NoteChanges,
+)
 from app.schemas.prefs import PrefsOut, PrefsUpdate
-from app.models import UserPref
+from app.schemas.sleep import SleepAnalyticsOut, SleepIngestOut
 
+log = logging.getLogger(__name__)
 
+router = APIRouter()
 
 
+@router.get("/healthz")
+async def healthz():
+    return {"status": "ok", "env": get_settings().app_env}
 
-app = FastAPI(title=settings.app_name)
 
-@app.get("/healthz")
-async def healthz():
-    return {"status": "ok", "env": settings.app_env}
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Everything above plus per-route / per-query histograms, in Prometheus text format.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@router.get("/metrics/hashing")
+async def hashing_metrics():
+    """
+    Argon2 pool size, queue depth (waiting / in flight) and outcomes (completed / failed / cancelled).
+    """
+    return hash_pool_stats()
 
-@app.get("/db/ping")
+
+@router.get("/metrics/token-cache")
+async def token_cache_metrics():
+    """
+    Verified-token cache size and hit/miss counters.
+    """
+    return token_cache_stats()
+
+
+@router.get("/metrics/db-pool")
+async def db_pool_metrics():
+    """
+    DB pool usage: checked out / idle / overflow connections and checkout wait times.
+    """
+    return {**pool_stats(), "replicas": get_replicas().stats()}
+
+@router.get("/db/ping")
 async def db_ping(session: AsyncSession = Depends(get_session)):
     result = await session.execute(text("SELECT 1"))
     value = result.scalar_one()
     return {"db": "ok" if value == 1 else "fail"}
 
-@app.post("/auth/signup", response_model=UserOut, status_code=201)
-async def auth_signup(payload: SignupIn, session: AsyncSession = Depends(get_session)):
+@router.post("/auth/signup", response_model=UserOut, status_code=201)
+async def auth_signup(payload: SignupIn, request: Request, session: AsyncSession = Depends(get_session)):
+    # 0) Throttle before any DB or Argon2 work
+    await get_rate_limiter().enforce("signup", client_ip(request), payload.email)
+
     # 1) Email already taken?
     exists = await session.execute(select(User).where(User.email == payload.email))
     if exists.scalar_one_or_none():
@@ -44,14 +120,18 @@ async def auth_signup(payload: SignupIn, session: AsyncSession = Depends(get_ses
     user = User(
         name=payload.name,
         email=payload.email,
-        password_hash=hash_password(payload.password),
+        password_hash=await hash_password_async(payload.password),
     )
     session.add(user)
     await session.flush()     # get DB-generated values (id, created_at server_default)
+
+    # 3) Queue the verification email in the same transaction: it is sent (by the
+    #    job worker, off the request path) if and only if the user row commits
+    await enqueue(session, SEND_VERIFICATION_EMAIL, {"user_id": user.id})
     await session.commit()
     await session.refresh(user)
 
-    # 3) Return safe shape
+    # 4) Return safe shape
     return UserOut(
         id=user.id,
         name=user.name,
@@ -61,11 +141,17 @@ async def auth_signup(payload: SignupIn, session: AsyncSession = Depends(get_ses
     )
 
 
-@app.post("/auth/login", response_model=TokenPair)
-async def auth_login(payload: LoginIn, session: AsyncSession = Depends(get_session)):
+@router.post("/auth/login", response_model=TokenPair)
+async def auth_login(payload: LoginIn, request: Request, session: AsyncSession = Depends(get_session)):
+    # throttled per IP, and per email (known or not) from that IP, before the Argon2
+    # verify: an account bucket keyed on the email alone would let anyone lock its
+    # owner out by failing on purpose
+    ip = client_ip(request)
+    await get_rate_limiter().enforce("login", ip, f"{payload.email.strip().lower()}|{ip}")
+
     result = await session.execute(select(User).where(User.email == payload.email))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(payload.password, user.password_hash):
+    if not user or not await verify_password_async(payload.password, user.password_hash):
         # same message for both cases to avoid leaking which part failed
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
@@ -74,7 +160,7 @@ async def auth_login(payload: LoginIn, session: AsyncSession = Depends(get_sessi
     return TokenPair(access_token=access, refresh_token=refresh)
 
 
-@app.get("/me")
+@router.get("/me")
 async def read_me(claims: dict = Depends(get_current_user_claims)):
     """
     Example protected route. Requires Authorization: Bearer <access_token>
@@ -83,139 +169,948 @@ async def read_me(claims: dict = Depends(get_current_user_claims)):
 
 
 
-@app.post("/auth/refresh", response_model=AccessTokenOut)
-async def auth_refresh(payload: RefreshIn, session: AsyncSession = Depends(get_session)):
-    # 1) Verify the refresh token and read its subject (user id)
+@router.post("/auth/refresh", response_model=TokenPair)
+async def auth_refresh(payload: RefreshIn, request: Request, session: AsyncSession = Depends(get_session)):
+    # 1) Verify the refresh token and read its subject (user id); throttled per IP
+    #    first, so a stream of garbage tokens is rejected as cheaply as possible
+    await get_rate_limiter().enforce("refresh", client_ip(request))
     try:
         data = decode_token(payload.refresh_token, expected_type="refresh")
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+    if "jti" not in data or "fam" not in data:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")  # pre-rotation token
 
     user_id = int(data["sub"])
+    await get_rate_limiter().enforce("refresh", None, f"user:{user_id}")
+
+    # 2) Revoked (logout, logout-all)? In-memory check, no DB round trip
+    revocations = get_revocations()
+    if revocations.is_revoked(data):
+        raise HTTPException(status_code=401, detail="Token revoked")
 
-    # 2) (Optional) fetch email so new access token includes it
+    # 3) Refresh tokens are single use. A second use means the token leaked:
+    #    revoke its whole family, so neither the thief nor the owner can continue
+    if not await revocations.claim(data["jti"], data["exp"]):
+        await revocations.revoke_family(user_id, data["fam"])
+        raise HTTPException(status_code=401, detail="Token reuse detected")
+
+    # 4) (Optional) fetch email so new access token includes it
     result = await session.execute(select(User.email).where(User.id == user_id))
     email = result.scalar_one_or_none()
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token subject")
 
-    # 3) Issue a fresh access token
+    # 5) Issue a fresh access token and the next refresh token of the same family
     new_access = create_access_token(user_id=user_id, email=email)
-    return AccessTokenOut(access_token=new_access)
+    new_refresh = create_refresh_token(user_id=user_id, family=data["fam"])
+    return TokenPair(access_token=new_access, refresh_token=new_refresh)
+
+
+@router.post("/auth/logout", status_code=204)
+async def auth_logout(payload: RefreshIn):
+    """
+    Revoke this session: the given refresh token and every token rotated from the same login.
+    """
+    try:
+        data = decode_token(payload.refresh_token, expected_type="refresh")
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    if "fam" in data:
+        await get_revocations().revoke_family(int(data["sub"]), data["fam"])
+    return  # 204 No Content
+
+
+@router.post("/auth/logout-all", status_code=204)
+async def auth_logout_all(claims: dict = Depends(get_current_user_claims)):
+    """
+    Revoke every refresh token issued to the caller so far (all devices).
+    Access tokens already issued stay valid until they expire (access_token_minutes).
+    """
+    await get_revocations().revoke_user(claims["user_id"])
+    return  # 204 No Content
 
 
-@app.post("/notes", response_model=NoteOut, status_code=201)
+@router.get("/auth/verify")
+async def auth_verify(token: str, session: AsyncSession = Depends(get_session)):
+    """
+    Target of the link in the verification email.
+    """
+    try:
+        data = decode_token(token, expected_type="verify")
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid or expired verification link")
+
+    # only valid for the address the link was sent to
+    result = await session.execute(
+        update(User)
+        .where(User.id == int(data["sub"]), User.email == data.get("email"))
+        .values(verified=True)
+        .returning(User.id)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=400, detail="Invalid or expired verification link")
+    await session.commit()
+    return {"verified": True}
+
+
+@router.post("/auth/verify/resend", status_code=202)
+async def auth_verify_resend(
+    request: Request,
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Queue another verification email for the caller (no-op if already verified).
+    """
+    await get_rate_limiter().enforce("verify", client_ip(request), claims["email"])
+    result = await session.execute(select(User.verified).where(User.id == claims["user_id"]))
+    if result.scalar_one_or_none() is False:
+        await enqueue(session, SEND_VERIFICATION_EMAIL, {"user_id": claims["user_id"]})
+        await session.commit()
+        return {"queued": True}
+    return {"queued": False}
+
+
+@router.post("/notes", response_model=NoteChange, status_code=201)
 async def create_note(
     payload: NoteCreate,
     claims: dict = Depends(get_current_user_claims),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
+):
+    # one INSERT ... RETURNING instead of INSERT + SELECT (refresh)
+    result = await session.execute(
+        insert(Note)
+        .values(
+            user_id=claims["user_id"],
+            title=payload.title,
+            body=payload.body,
+            done=payload.done,
+        )
+        .returning(Note.id, Note.title, Note.body, Note.done, Note.version)
+    )
+    note = result.one()
+    await session.commit()
+    # with its version, so a client mirroring /notes/changes can store it as-is
+    return model_response(
+        NoteChange(id=note.id, title=note.title, body=note.body, done=note.done, version=note.version), 201
+    )
+
+
+NOTES_PAGE_MAX = 500
+NOTES_STREAM_BATCH = 1000
+
+
+async def _stream_notes_ndjson(user_id: int, after_id: int, use_primary: bool):
+    # The request-scoped session is closed before a streaming body is sent,
+    # so the stream owns its own session for the lifetime of the cursor.
+    async with read_session(use_primary=use_primary) as session:
+        stmt = notes_ndjson_after(user_id, after_id).execution_options(yield_per=NOTES_STREAM_BATCH)
+        result = await session.stream(stmt)  # server-side cursor, fetched in batches
+        async for part in result.partitions():
+            # rows arrive as JSON text rendered by Postgres; just join them
+            yield "".join(row[0] + "\n" for row in part)
+
+
+@router.get("/notes", response_model=NotePage)
+async def list_notes(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=NOTES_PAGE_MAX),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    claims: dict = Depends(get_current_user_claims),
+):
+    """
+    List the caller's notes in id order.
+    - format=json (default): one page of `limit` notes plus `next_cursor` to fetch the next one.
+    - format=ndjson: every note after `cursor`, one JSON object per line, streamed.
+    """
+    try:
+        after_id = decode_cursor(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # sessions are opened per branch: the stream must own its session, and a
+    # request-scoped one would hold a second pooled connection for nothing
+    use_primary = await wrote_recently(claims["user_id"])
+    if format == "ndjson":
+        return StreamingResponse(
+            _stream_notes_ndjson(claims["user_id"], after_id, use_primary),
+            media_type="application/x-ndjson",
+        )
+
+    # Postgres renders the items array; we only wrap it, no per-row Python objects
+    async with read_session(use_primary=use_primary) as session:
+        items_json, last_id = await notes_page_json(session, claims["user_id"], after_id, limit)
+    next_cursor = json.dumps(encode_cursor(last_id)) if last_id is not None else "null"
+    return raw_json_response(f'{{"items":{items_json},"next_cursor":{next_cursor}}}')
+
+
+def _check_batch_size(n: int) -> None:
+    settings = get_settings()
+    if n > settings.notes_batch_max:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large ({n} items, max {settings.notes_batch_max})",
+        )
+
+
+@router.post("/notes/batch", response_model=NoteBatchOut, status_code=201)
+async def create_notes_batch(
+    payload: NoteBatchCreate,
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_write_session),
+):
+    """
+    Create many notes with one multi-row INSERT ... RETURNING in a single transaction.
+    """
+    _check_batch_size(len(payload.items))
+
+    rows = [
+        {"user_id": claims["user_id"], "title": i.title, "body": i.body, "done": i.done}
+        for i in payload.items
+    ]
+    stmt = insert(Note).returning(
+        Note.id, Note.title, Note.body, Note.done, Note.version, sort_by_parameter_order=True
+    )
+    result = await session.execute(stmt, rows)
+    created = result.all()
+    await session.commit()
+
+    return NoteBatchOut(results=[
+        NoteBatchResult(
+            index=idx,
+            id=r.id,
+            status=201,
+            note=NoteChange(id=r.id, title=r.title, body=r.body, done=r.done, version=r.version),
+        )
+        for idx, r in enumerate(created)
+    ])
+
+
+@router.patch("/notes/batch", response_model=NoteBatchOut)
+async def update_notes_batch(
+    payload: NoteBatchUpdate,
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_write_session),
+):
+    """
+    Update many notes with one UPDATE ... FROM (VALUES ...) RETURNING.
+    Fields left out (or null) keep their current value; unknown ids come back as 404.
+    """
+    _check_batch_size(len(payload.items))
+    ids = [i.id for i in payload.items]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=422, detail="Duplicate note id in batch")
+
+    changes = values(
+        column("id", Integer),
+        column("title", String),
+        column("body", Text),
+        column("done", Boolean),
+        name="changes",
+    ).data([(i.id, i.title, i.body, i.done) for i in payload.items])
+
+    stmt = (
+        update(Note)
+        .where(Note.id == changes.c.id, Note.user_id == claims["user_id"])
+        .values(
+            title=func.coalesce(changes.c.title, Note.title),
+            body=func.coalesce(changes.c.body, Note.body),
+            done=func.coalesce(changes.c.done, Note.done),
+        )
+        .returning(Note.id, Note.title, Note.body, Note.done, Note.version)
+    )
+    result = await session.execute(stmt)
+    updated = {r.id: r for r in result.all()}
+    await session.commit()
+    await get_cache().invalidate(*(note_key(claims["user_id"], nid) for nid in updated))
+
+    results = []
+    for idx, note_id in enumerate(ids):
+        r = updated.get(note_id)
+        if r is None:
+            results.append(NoteBatchResult(index=idx, id=note_id, status=404, detail="Note not found"))
+        else:
+            results.append(NoteBatchResult(
+                index=idx,
+                id=note_id,
+                status=200,
+                note=NoteChange(id=r.id, title=r.title, body=r.body, done=r.done, version=r.version),
+            ))
+    return NoteBatchOut(results=results)
+
+
+@router.post("/notes/batch/delete", response_model=NoteBatchOut)
+async def delete_notes_batch(
+    payload: NoteBatchDelete,
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_write_session),
 ):
-    note = Note(
-        user_id=claims["user_id"],
-        title=payload.title,
-        body=payload.body,
-        done=payload.done,
+    """
+    Delete many notes with one DELETE ... WHERE id = ANY(...) RETURNING id.
+    (POST rather than DELETE because the ids travel in the body.)
+    """
+    _check_batch_size(len(payload.ids))
+    if len(set(payload.ids)) != len(payload.ids):
+        raise HTTPException(status_code=422, detail="Duplicate note id in batch")
+
+    stmt = (
+        delete(Note)
+        .where(Note.user_id == claims["user_id"], Note.id.in_(payload.ids))
+        .returning(Note.id)
     )
-    session.add(note)
-    await session.flush()
+    result = await session.execute(stmt)
+    deleted = set(result.scalars().all())
     await session.commit()
-    await session.refresh(note)
-    return NoteOut(id=note.id, title=note.title, body=note.body, done=note.done)
+    await get_cache().invalidate(*(note_key(claims["user_id"], nid) for nid in deleted))
+
+    return NoteBatchOut(results=[
+        NoteBatchResult(index=idx, id=note_id, status=204)
+        if note_id in deleted
+        else NoteBatchResult(index=idx, id=note_id, status=404, detail="Note not found")
+        for idx, note_id in enumerate(payload.ids)
+    ])
 
 
-@app.get("/notes/{note_id}", response_model=NoteOut)
+CHANGES_PAGE_MAX = 1000
+
+
+@router.get("/notes/changes", response_model=NoteChanges)
+async def note_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=CHANGES_PAGE_MAX),
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Incremental sync: notes created/updated and notes deleted after version `since`.
+    Start with since=0 for a full download, then keep passing the returned `version`.
+    Deletes are only remembered for note_tombstone_retention_days: for an older
+    `since` the answer is `reset` (drop local notes, continue from version 0).
+    """
+    user_id = claims["user_id"]
+    # tombstones joined onto the sync horizon, so both come back in one round trip
+    # (a single row of NULL tombstone columns when there are none)
+    tombstones = (
+        select(NoteTombstone.id, NoteTombstone.version)
+        .where(NoteTombstone.user_id == user_id, NoteTombstone.version > since)
+        .order_by(NoteTombstone.version)
+        .limit(limit + 1)
+        .lateral("t")
+    )
+    rows = (await session.execute(
+        select(NoteSyncHorizon.version.label("horizon"), tombstones.c.id, tombstones.c.version)
+        .select_from(NoteSyncHorizon)
+        .outerjoin(tombstones, true())
+        .where(NoteSyncHorizon.id == 1)
+    )).all()
+    horizon = rows[0].horizon if rows else 0
+    if since and since < horizon:
+        # deletes after `since` have been pruned: the client can't tell what is gone
+        return NoteChanges(changed=[], deleted=[], version=0, has_more=True, reset=True)
+    deleted_rows = [r for r in rows if r.id is not None]
+
+    changed_rows = (await session.execute(
+        select(Note.id, Note.title, Note.body, Note.done, Note.version)
+        .where(Note.user_id == user_id, Note.version > since)
+        .order_by(Note.version)
+        .limit(limit + 1)
+    )).all()
+
+    # merge both streams by version and cut at `limit` so the watermark has no gaps
+    merged = sorted(
+        [(r.version, False, r) for r in changed_rows] + [(r.version, True, r) for r in deleted_rows],
+        key=lambda t: t[0],
+    )
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    changed, deleted = [], []
+    for _, is_delete, r in merged:
+        if is_delete:
+            deleted.append(NoteDeleted(id=r.id, version=r.version))
+        else:
+            changed.append(NoteChange(id=r.id, title=r.title, body=r.body, done=r.done, version=r.version))
+
+    version = merged[-1][0] if merged else since
+    if not has_more:
+        # caught up: nothing of the caller's is left below the horizon, so move past it
+        # (a watermark stuck under it would be answered with `reset` on every sync)
+        version = max(version, horizon)
+    return NoteChanges(changed=changed, deleted=deleted, version=version, has_more=has_more)
+
+
+@router.get("/notes/events")
+async def note_event_stream(claims: dict = Depends(get_current_user_claims)):
+    """
+    Server-Sent Events announcing changes to the caller's notes, from any device:
+    `event: note` with data {"op": "upsert" | "delete", "ids": [...]}, or {"op": "resync"}
+    when events may have been missed (always sent first). Clients fetch the content
+    from GET /notes/changes. A client that falls behind is disconnected and should
+    reconnect. Holds no DB connection: the worker's single LISTEN connection feeds it.
+    """
+    events = get_note_events()
+    if not events.has_room():
+        raise HTTPException(status_code=503, detail="Too many event streams", headers={"Retry-After": "30"})
+    return StreamingResponse(
+        events.stream(claims["user_id"]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},  # no proxy buffering
+    )
+
+
+SEARCH_PAGE_MAX = 100
+SEARCH_HEADLINE_OPTS = "StartSel=<b>, StopSel=</b>, MaxWords=35, MinWords=15, MaxFragments=2"
+_HTML_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#39;"))
+
+
+def _html_escaped(text):
+    """SQL expression: `text` with HTML special characters escaped (& first)."""
+    for char, entity in _HTML_ESCAPES:
+        text = func.replace(text, char, entity)
+    return text
+
+
+@router.get("/notes/search", response_model=NoteSearchPage)
+async def search_notes(
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=SEARCH_PAGE_MAX),
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Full-text search over the caller's notes (title matches rank above body matches).
+    `q` uses web-search syntax: words, "quoted phrases", -excluded, or.
+    Results are ordered by relevance; pass `next_cursor` back as `cursor` for the next page.
+    """
+    try:
+        after = decode_rank_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    config = cast(SEARCH_CONFIG, REGCONFIG)
+    tsquery = func.websearch_to_tsquery(config, q)
+    rank = cast(func.ts_rank_cd(Note.search_vector, tsquery), Float).label("rank")
+
+    # 1) rank matches via the GIN index and cut the page (keyset on (rank, id))
+    ranked = (
+        select(Note.id, Note.title, Note.body, Note.done, rank)
+        .where(Note.user_id == claims["user_id"], Note.search_vector.op("@@")(tsquery))
+        .subquery()
+    )
+    page = select(ranked)
+    if after is not None:
+        page = page.where(tuple_(ranked.c.rank, ranked.c.id) < tuple_(*after))
+    page = page.order_by(ranked.c.rank.desc(), ranked.c.id.desc()).limit(limit + 1).subquery()
+
+    # 2) build highlighted snippets only for the rows on this page; the body is escaped
+    #    first, so the <b> tags ts_headline adds are the only markup a client can get
+    snippet = func.ts_headline(
+        config, _html_escaped(page.c.body), tsquery, SEARCH_HEADLINE_OPTS
+    ).label("snippet")
+    stmt = select(page, snippet).order_by(page.c.rank.desc(), page.c.id.desc())
+
+    rows = (await session.execute(stmt)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [
+        NoteSearchHit(id=r.id, title=r.title, body=r.body, done=r.done, rank=r.rank, snippet=r.snippet)
+        for r in rows
+    ]
+    next_cursor = encode_rank_cursor(rows[-1].rank, rows[-1].id) if has_more else None
+    return NoteSearchPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/notes/{note_id}", response_model=NoteOut)
 async def get_note(
     note_id: int,
     claims: dict = Depends(get_current_user_claims),
-    session: AsyncSession = Depends(get_session),
 ):
-    result = await session.execute(
-        select(Note).where(Note.id == note_id, Note.user_id == claims["user_id"])
-    )
-    note = result.scalar_one_or_none()
-    if not note:
+    # no request session: a cache hit needs no connection, and the loader runs
+    # as the cache's own task (shared by concurrent misses), so it opens its own
+    async def load():
+        use_primary = await wrote_recently(claims["user_id"])
+        async with read_session(use_primary=use_primary) as session:
+            result = await session.execute(
+                select(Note).where(Note.id == note_id, Note.user_id == claims["user_id"])
+            )
+            note = result.scalar_one_or_none()
+        if not note:
+            return None
+        return {"id": note.id, "title": note.title, "body": note.body, "done": note.done}
+
+    data = await get_cache().get_or_load(note_key(claims["user_id"], note_id), load)
+    if data is None:
         raise HTTPException(status_code=404, detail="Note not found")
-    return NoteOut(id=note.id, title=note.title, body=note.body, done=note.done)
+    return model_response(NoteOut(**data))
 
 
-@app.put("/notes/{note_id}", response_model=NoteOut)
+@router.put("/notes/{note_id}", response_model=NoteOut)
 async def update_note(
     note_id: int,
     payload: NoteUpdate,
     claims: dict = Depends(get_current_user_claims),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ):
-    result = await session.execute(
-        select(Note).where(Note.id == note_id, Note.user_id == claims["user_id"])
-    )
-    note = result.scalar_one_or_none()
+    # null fields are treated as "leave unchanged", same as the batch endpoint
+    data = {k: v for k, v in payload.model_dump(exclude_unset=True).items() if v is not None}
+    owned = (Note.id == note_id, Note.user_id == claims["user_id"])
+    columns = (Note.id, Note.title, Note.body, Note.done)
+
+    if data:
+        # one UPDATE ... RETURNING, scoped to the caller, instead of SELECT + UPDATE + SELECT
+        result = await session.execute(update(Note).where(*owned).values(**data).returning(*columns))
+    else:
+        result = await session.execute(select(*columns).where(*owned))
+    note = result.one_or_none()
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    data = payload.model_dump(exclude_unset=True)
-    for k, v in data.items():
-        setattr(note, k, v)
-
     await session.commit()
-    await session.refresh(note)
-    return NoteOut(id=note.id, title=note.title, body=note.body, done=note.done)
+    await get_cache().invalidate(note_key(claims["user_id"], note_id))
+    return model_response(NoteOut(id=note.id, title=note.title, body=note.body, done=note.done))
 
 
-@app.delete("/notes/{note_id}", status_code=204)
+@router.delete("/notes/{note_id}", status_code=204)
 async def delete_note(
     note_id: int,
     claims: dict = Depends(get_current_user_claims),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ):
     result = await session.execute(
-        select(Note).where(Note.id == note_id, Note.user_id == claims["user_id"])
+        delete(Note)
+        .where(Note.id == note_id, Note.user_id == claims["user_id"])
+        .returning(Note.id)
     )
-    note = result.scalar_one_or_none()
-    if not note:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    await session.delete(note)
     await session.commit()
+    await get_cache().invalidate(note_key(claims["user_id"], note_id))
     return  # 204 No Content
 
 
 
-@app.get("/me/prefs", response_model=PrefsOut)
-async def get_my_prefs(
-    claims: dict = Depends(get_current_user_claims),
-    session: AsyncSession = Depends(get_session),
+# --- attachments ----------------------------------------------------------------
+# Bytes never pass through memory whole: uploads stream from the request body
+# into the storage backend, downloads stream back out. Clients moving many or
+# large files can use pre-signed URLs and talk to the storage directly.
+# Deleting a note (or its user) only detaches its attachments (note_id -> NULL,
+# by the FK); the job worker's sweep removes those rows and their blobs later,
+# along with pre-signed uploads that were never completed.
+
+def _attachment_out(row) -> AttachmentOut:
+    return AttachmentOut(
+        id=row.id, note_id=row.note_id, filename=row.filename,
+        content_type=row.content_type, size=row.size, created_at=row.created_at,
+    )
+
+
+async def _capped(chunks: AsyncIterator[bytes], limit: int) -> AsyncIterator[bytes]:
+    total = 0
+    async for chunk in chunks:
+        total += len(chunk)
+        if total > limit:
+            raise HTTPException(status_code=413, detail=f"Attachment larger than {limit} bytes")
+        yield chunk
+
+
+def _check_declared_size(request: Request) -> None:
+    settings = get_settings()
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > settings.attachment_max_bytes:
+        raise HTTPException(status_code=413, detail=f"Attachment larger than {settings.attachment_max_bytes} bytes")
+
+
+async def _insert_attachment(
+    session: AsyncSession, user_id: int, note_id: int, key: str,
+    filename: str, content_type: str, size: Optional[int], status: str,
 ):
+    """
+    INSERT ... SELECT from the caller's own note, so ownership is checked in the
+    same statement. Returns the new row, or None if the note isn't theirs (any more).
+    """
+    source = select(
+        Note.id, Note.user_id, literal(key), literal(filename), literal(content_type),
+        literal(size, BigInteger), literal(status),
+    ).where(Note.id == note_id, Note.user_id == user_id)
+    result = await session.execute(
+        insert(Attachment)
+        .from_select(["note_id", "user_id", "storage_key", "filename", "content_type", "size", "status"], source)
+        .returning(
+            Attachment.id, Attachment.note_id, Attachment.filename,
+            Attachment.content_type, Attachment.size, Attachment.created_at,
+        )
+    )
+    return result.one_or_none()
+
+
+async def _owned_attachment(session: AsyncSession, user_id: int, attachment_id: int, status: str = "ready"):
     result = await session.execute(
-        select(UserPref).where(UserPref.user_id == claims["user_id"])
-    )
-    prefs = result.scalar_one_or_none()
-    if not prefs:
-        # auto-create with model default (20)
-        prefs = UserPref(user_id=claims["user_id"])
-        session.add(prefs)
-        await session.flush()
+        select(Attachment).where(
+            Attachment.id == attachment_id, Attachment.user_id == user_id, Attachment.status == status,
+            Attachment.note_id.is_not(None),  # its note was deleted: waiting for the sweep
+        )
+    )
+    attachment = result.scalar_one_or_none()
+    if attachment is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return attachment
+
+
+@router.post("/notes/{note_id}/attachments", response_model=AttachmentOut, status_code=201)
+async def upload_attachment(
+    note_id: int,
+    request: Request,
+    filename: str = Query(..., min_length=1, max_length=255),
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_write_session),
+):
+    """
+    Attach a file: the raw request body is the file, its Content-Type the file's type.
+    Streamed to storage in chunks (S3: multipart above storage_part_size_bytes).
+    """
+    _check_declared_size(request)
+    owned = await session.execute(select(Note.id).where(Note.id == note_id, Note.user_id == claims["user_id"]))
+    if owned.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Note not found")
+    await session.rollback()  # don't hold a pooled connection for the whole upload
+
+    storage = get_storage()
+    key = attachment_key(claims["user_id"], note_id)
+    content_type = request.headers.get("content-type") or "application/octet-stream"
+    size = await storage.save(key, _capped(request.stream(), get_settings().attachment_max_bytes), content_type)
+    try:
+        row = await _insert_attachment(session, claims["user_id"], note_id, key, filename, content_type, size, "ready")
+        if row is None:
+            raise HTTPException(status_code=404, detail="Note not found")  # deleted during the upload
         await session.commit()
-        await session.refresh(prefs)
-    return PrefsOut(sleep_minutes=prefs.sleep_minutes)
+    except BaseException:
+        await storage.delete(key)
+        raise
+    return model_response(_attachment_out(row), 201)
 
 
-@app.put("/me/prefs", response_model=PrefsOut)
-async def update_my_prefs(
-    payload: PrefsUpdate,
+@router.post("/notes/{note_id}/attachments/presign", response_model=AttachmentPresignOut, status_code=201)
+async def presign_attachment_upload(
+    note_id: int,
+    payload: AttachmentPresignIn,
     claims: dict = Depends(get_current_user_claims),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
+):
+    """
+    Start a direct upload: PUT the bytes to `upload_url` (with `headers`),
+    then POST /attachments/{id}/complete. Until then the attachment is hidden.
+    """
+    key = attachment_key(claims["user_id"], note_id)
+    row = await _insert_attachment(
+        session, claims["user_id"], note_id, key, payload.filename, payload.content_type, None, "pending",
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail="Note not found")
+    await session.commit()
+
+    expires = get_settings().storage_presign_seconds
+    return AttachmentPresignOut(
+        id=row.id,
+        upload_url=get_storage().presign_put(key, expires, payload.content_type),
+        headers={"Content-Type": payload.content_type},
+        expires_in=expires,
+    )
+
+
+@router.post("/attachments/{attachment_id}/complete", response_model=AttachmentOut)
+async def complete_attachment_upload(
+    attachment_id: int,
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_write_session),
+):
+    settings = get_settings()
+    attachment = await _owned_attachment(session, claims["user_id"], attachment_id, status="pending")
+    storage = get_storage()
+    size = await storage.size(attachment.storage_key)
+    if size is None:
+        raise HTTPException(status_code=409, detail="Nothing was uploaded yet")
+    if size > settings.attachment_max_bytes:
+        await session.delete(attachment)
+        await session.commit()
+        await storage.delete(attachment.storage_key)
+        raise HTTPException(status_code=413, detail=f"Attachment larger than {settings.attachment_max_bytes} bytes")
+
+    attachment.size = size
+    attachment.status = "ready"
+    await session.commit()
+    return model_response(_attachment_out(attachment))
+
+
+@router.get("/notes/{note_id}/attachments", response_model=AttachmentList)
+async def list_attachments(
+    note_id: int,
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_read_session),
 ):
     result = await session.execute(
-        select(UserPref).where(UserPref.user_id == claims["user_id"])
+        select(Attachment)
+        .where(Attachment.note_id == note_id, Attachment.user_id == claims["user_id"], Attachment.status == "ready")
+        .order_by(Attachment.id)
     )
-    prefs = result.scalar_one_or_none()
-    if not prefs:
-        prefs = UserPref(user_id=claims["user_id"], sleep_minutes=payload.sleep_minutes)
-        session.add(prefs)
-    else:
-        prefs.sleep_minutes = payload.sleep_minutes
+    return model_response(AttachmentList(items=[_attachment_out(a) for a in result.scalars()]))
+
 
+@router.get("/attachments/{attachment_id}")
+async def download_attachment(
+    attachment_id: int,
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    The file's bytes, streamed from storage.
+    """
+    attachment = await _owned_attachment(session, claims["user_id"], attachment_id)
+    return StreamingResponse(
+        get_storage().open(attachment.storage_key),
+        media_type=attachment.content_type,
+        headers={
+            "Content-Length": str(attachment.size),
+            "Content-Disposition": content_disposition(attachment.filename),
+        },
+    )
+
+
+@router.get("/attachments/{attachment_id}/url", response_model=AttachmentUrlOut)
+async def attachment_download_url(
+    attachment_id: int,
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    A pre-signed URL to download the file directly from storage.
+    """
+    attachment = await _owned_attachment(session, claims["user_id"], attachment_id)
+    expires = get_settings().storage_presign_seconds
+    url = get_storage().presign_get(attachment.storage_key, expires, attachment.filename)
+    return AttachmentUrlOut(url=url, expires_in=expires)
+
+
+@router.delete("/attachments/{attachment_id}", status_code=204)
+async def delete_attachment(
+    attachment_id: int,
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_write_session),
+):
+    result = await session.execute(
+        delete(Attachment)
+        .where(Attachment.id == attachment_id, Attachment.user_id == claims["user_id"])
+        .returning(Attachment.storage_key)
+    )
+    key = result.scalar_one_or_none()
+    if key is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    await enqueue(session, DELETE_BLOBS, {"keys": [key]})
+    await session.commit()
+    return  # 204 No Content
+
+
+# Pre-signed URL targets for the local storage backend (S3 URLs go to S3).
+# The token in the path is the authorization.
+
+def _local_storage_or_404() -> LocalStorage:
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=404, detail="Not found")
+    return storage
+
+
+@router.get("/files/{token}", include_in_schema=False)
+async def local_file_download(token: str):
+    storage = _local_storage_or_404()
+    try:
+        claims = decode_file_token(token, "GET")
+    except InvalidTokenError:
+        raise HTTPException(status_code=403, detail="Invalid or expired link")
+    size = await storage.size(claims["key"])
+    if size is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return StreamingResponse(
+        storage.open(claims["key"]),
+        media_type="application/octet-stream",
+        headers={"Content-Length": str(size), "Content-Disposition": content_disposition(claims["filename"])},
+    )
+
+
+@router.put("/files/{token}", status_code=204, include_in_schema=False)
+async def local_file_upload(token: str, request: Request, session: AsyncSession = Depends(get_session)):
+    storage = _local_storage_or_404()
+    try:
+        claims = decode_file_token(token, "PUT")
+    except InvalidTokenError:
+        raise HTTPException(status_code=403, detail="Invalid or expired link")
+    _check_declared_size(request)
+    # the link outlives the upload: once completed (or swept) the blob is no longer the client's to replace
+    pending = await session.execute(
+        select(Attachment.id).where(Attachment.storage_key == claims["key"], Attachment.status == "pending")
+    )
+    if pending.scalar_one_or_none() is None:
+        raise HTTPException(status_code=409, detail="Upload already completed or expired")
+    await session.rollback()  # don't hold a pooled connection for the whole upload
+    await storage.save(claims["key"], _capped(request.stream(), get_settings().attachment_max_bytes))
+    return  # 204 No Content
+
+
+@router.get("/me/prefs", response_model=PrefsOut)
+async def get_my_prefs(
+    claims: dict = Depends(get_current_user_claims),
+):
+    async def load():  # own session, as in get_note
+        use_primary = await wrote_recently(claims["user_id"])
+        async with read_session(use_primary=use_primary) as session:
+            result = await session.execute(
+                select(UserPref.sleep_minutes).where(UserPref.user_id == claims["user_id"])
+            )
+            sleep_minutes = result.scalar_one_or_none()
+        if sleep_minutes is None:
+            # no row yet: report the model default (20) without writing from a read
+            # (this may be a replica); PUT /me/prefs creates the row
+            sleep_minutes = UserPref.__table__.c.sleep_minutes.default.arg
+        return {"sleep_minutes": sleep_minutes}
+
+    data = await get_cache().get_or_load(prefs_key(claims["user_id"]), load)
+    return model_response(PrefsOut(**data))
+
+
+@router.put("/me/prefs", response_model=PrefsOut)
+async def update_my_prefs(
+    payload: PrefsUpdate,
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_write_session),
+):
+    # upsert on the unique user_id index: one statement whether or not the row exists
+    stmt = pg_insert(UserPref).values(user_id=claims["user_id"], sleep_minutes=payload.sleep_minutes)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserPref.user_id],
+        set_={"sleep_minutes": stmt.excluded.sleep_minutes},
+    ).returning(UserPref.sleep_minutes)
+    result = await session.execute(stmt)
+    sleep_minutes = result.scalar_one()
+
+    await session.commit()
+    await get_cache().invalidate(prefs_key(claims["user_id"]))
+    return model_response(PrefsOut(sleep_minutes=sleep_minutes))
+
+
+# --- sleep data -------------------------------------------------------------------
+
+SLEEP_UPLOAD_FORMATS = {"application/x-ndjson": "ndjson", "application/jsonl": "ndjson", "text/csv": "csv"}
+
+
+@router.post("/sleep/samples", response_model=SleepIngestOut)
+async def ingest_sleep(
+    request: Request,
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_write_session),
+):
+    """
+    Bulk upload of device sleep samples as NDJSON (Content-Type: application/x-ndjson)
+    or CSV (text/csv). Streamed into Postgres with COPY; samples already stored for
+    the same timestamp are skipped, unparseable lines are counted and reported.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = SLEEP_UPLOAD_FORMATS.get(media_type)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send application/x-ndjson or text/csv")
+
+    try:
+        stats = await ingest_sleep_samples(session, claims["user_id"], sleep_lines(request.stream()), fmt)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     await session.commit()
-    await session.refresh(prefs)
-    return PrefsOut(sleep_minutes=prefs.sleep_minutes)
-    
+
+    return SleepIngestOut(
+        received=stats.received,
+        inserted=stats.inserted,
+        duplicates=stats.duplicates,
+        rejected=stats.rejected,
+        errors=stats.errors,
+    )
+
+
+@router.get("/sleep/analytics", response_model=SleepAnalyticsOut)
+async def sleep_analytics(
+    days: int = Query(30, ge=1, le=730),
+    window: int = Query(7, ge=1, le=30),
+    claims: dict = Depends(get_current_user_claims),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Daily and weekly totals, rolling averages, consistency and comparison with the
+    sleep_minutes target over the last `days` sleep days (including the current one).
+    Reads the sleep_daily rollup only, so the cost grows with days, not samples.
+    """
+    end = sleep_day(datetime.now(timezone.utc))
+    start = end - timedelta(days=days - 1)
+    columns, target = await sleep_daily_columns(session, claims["user_id"], start, end)
+    if target is None:
+        target = UserPref.__table__.c.sleep_minutes.default.arg
+    return model_response(SleepAnalyticsOut(**analyze_sleep(columns, start, days, window, target)))
+
+
+# --- app factory --------------------------------------------------------------
+
+async def _prime_statements(session: AsyncSession) -> None:
+    """
+    Run the hottest read statements once (with ids that match nothing) so they
+    sit in this connection's prepared-statement cache before real traffic.
+    """
+    await session.execute(select(User).where(User.email == ""))
+    await session.execute(select(User.email).where(User.id == 0))
+    await session.execute(select(Note).where(Note.id == 0, Note.user_id == 0))
+    await session.execute(select(UserPref.sleep_minutes).where(UserPref.user_id == 0))
+    await notes_page_json(session, 0, 0, 100)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # startup: create the backends now, so a bad setting fails the start rather than
+    # a request, and do the slow first-time work instead of the first requests
+    get_replicas()
+    get_cache()
+    get_rate_limiter()
+    if get_settings().warmup_on_startup:
+        try:
+            await warm_pool(_prime_statements)
+        except Exception:
+            log.warning("DB warmup failed; connections will open on demand", exc_info=True)
+        await warm_hash_pool()
+    await get_revocations().start()
+    await get_note_events().start()
+
+    yield
+
+    # shutdown
+    await close_note_events()
+    await close_revocations()
+    await close_rate_limiter()
+    await close_cache()
+    shutdown_hash_pool()
+    await dispose_engines()
+
+
+def create_app() -> FastAPI:
+    """
+    Build the API app; serve it with `uvicorn --factory app.main:create_app`.
+    Importing this module reads no settings and creates nothing. Building the app
+    reads the settings but does no I/O: the engines, Redis clients and other
+    singletons are created by the lifespan or on first use, and closed on shutdown.
+    """
+    app = FastAPI(title=get_settings().app_name, lifespan=lifespan)
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(router)
+
+    register_stats("sleep_hash_pool", "Argon2 hashing pool", hash_pool_stats)
+    register_stats("sleep_token_cache", "Verified-token cache", token_cache_stats)
+    register_stats("sleep_db_pool", "DB connection pool", pool_stats)
+    register_stats("sleep_refresh_revocations", "Refresh-token revocations", lambda: get_revocations().stats())
+    register_stats("sleep_note_events", "Note change event streams", lambda: get_note_events().stats())
+    return app
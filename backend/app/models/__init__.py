@@ -9,4 +9,10 @@ class Base(DeclarativeBase):
 from .user import User  # noqa: F401
 from .note import Note  # noqa: F401
 from .user_pref import UserPref  # noqa: F401
+from .note_tombstone import NoteTombstone, NoteSyncHorizon  # noqa: F401
 
+from .refresh_revocation import RefreshRevocation  # noqa: F401
+from .job import Job  # noqa: F401
+from .attachment import Attachment  # noqa: F401
+from .sleep_sample import SleepSample  # noqa: F401
+from .sleep_daily import SleepDaily  # noqa: F401
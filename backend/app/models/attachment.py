@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, String, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from . import Base
+
+
+class Attachment(Base):
+    """
+    A file attached to a note. The bytes live in the storage backend under
+    storage_key; 'pending' rows are pre-signed uploads not yet confirmed.
+    note_id becomes NULL when the note is deleted, and user_id when the user is
+    (whose notes go with them); such rows, and pending ones past their upload
+    window, are removed with their blobs by the job worker's sweep
+    (app.jobs.tasks.sweep_attachments).
+    """
+    __tablename__ = "attachments"
+    __table_args__ = (
+        # the sweep's candidates only; stays tiny
+        Index("ix_attachments_sweep", "created_at", postgresql_where=text("note_id IS NULL OR status = 'pending'")),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    note_id: Mapped[Optional[int]] = mapped_column(ForeignKey("notes.id", ondelete="SET NULL"), index=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"))
+    storage_key: Mapped[str] = mapped_column(String(255), unique=True)
+    filename: Mapped[str] = mapped_column(String(255))
+    content_type: Mapped[str] = mapped_column(String(255))
+    size: Mapped[Optional[int]] = mapped_column(BigInteger, default=None)
+    status: Mapped[str] = mapped_column(String(16), server_default="ready")  # ready | pending
+    created_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
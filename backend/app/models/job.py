@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import Any, Dict, Optional
+
+from sqlalchemy import DateTime, Index, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from . import Base
+
+
+class Job(Base):
+    """
+    A queued side effect (e.g. a verification email), run by app.jobs.worker.
+    Inserted in the same transaction as the change that caused it, so a job
+    exists exactly when that change committed. Deleted once it succeeds;
+    rows left with status 'failed' ran out of attempts.
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # the worker's "what's due" scan only ever looks at pending rows
+        Index("ix_jobs_pending_run_at", "run_at", postgresql_where=text("status = 'pending'")),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    kind: Mapped[str] = mapped_column(String(64))
+    payload: Mapped[Dict[str, Any]] = mapped_column(JSONB)
+    status: Mapped[str] = mapped_column(String(16), server_default="pending")  # pending | running | failed
+    attempts: Mapped[int] = mapped_column(server_default="0")
+    run_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    locked_at: Mapped[Optional[dt.datetime]] = mapped_column(DateTime(timezone=True), default=None)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, default=None)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -1,21 +1,50 @@
 from __future__ import annotations
 
-from sqlalchemy import String, Text, Boolean, ForeignKey
+import datetime as dt
+from typing import Optional
+
+from sqlalchemy import BigInteger, String, Text, Boolean, DateTime, ForeignKey, Index, Computed, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from . import Base
 
+# text search configuration used both by the generated column and by queries
+SEARCH_CONFIG = "english"
+
+SEARCH_VECTOR_EXPR = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(body, '')), 'B')"
+)
+
 
 class Note(Base):
     __tablename__ = "notes"
+    __table_args__ = (
+        # keyset pagination walks (user_id, id) in order
+        Index("ix_notes_user_id_id", "user_id", "id"),
+        Index("ix_notes_search_vector", "search_vector", postgresql_using="gin"),
+        # change feed: "what changed for this user since version N"
+        Index("ix_notes_user_id_version", "user_id", "version"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    user_id: Mapped[int] = mapped_column(
-        ForeignKey("users.id", ondelete="CASCADE"), index=True
-    )
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     title: Mapped[str] = mapped_column(String(200))
     body: Mapped[str] = mapped_column(Text)
     done: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
+    # change version + timestamp, bumped by DB triggers on every insert and real update
+    # (see migration d7a2b9c4e6f1); never set from Python
+    version: Mapped[int] = mapped_column(
+        BigInteger, server_default=func.nextval("note_version_seq")
+    )
+    updated_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    # maintained by Postgres (title weighted above body); deferred so normal loads skip it
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR, Computed(SEARCH_VECTOR_EXPR, persisted=True), deferred=True
+    )
 
     # optional relationship for convenience (not required for this step)
     user = relationship("User", backref="notes")
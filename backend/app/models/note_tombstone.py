@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import datetime as dt
+
+from sqlalchemy import BigInteger, DateTime, Index, SmallInteger, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from . import Base
+
+
+class NoteTombstone(Base):
+    """
+    Marker left behind by a deleted note so sync clients learn about the delete.
+    Written by a DB trigger on notes; no FK to users so user deletion can cascade freely.
+    Pruned after note_tombstone_retention_days by the job worker (NoteSyncHorizon).
+    """
+    __tablename__ = "note_tombstones"
+    __table_args__ = (
+        Index("ix_note_tombstones_user_id_version", "user_id", "version"),
+        Index("ix_note_tombstones_deleted_at", "deleted_at"),  # the prune's scan
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)  # the deleted note's id
+    user_id: Mapped[int]
+    version: Mapped[int] = mapped_column(BigInteger)
+    deleted_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class NoteSyncHorizon(Base):
+    """
+    Single row (id 1): the highest version among pruned tombstones. A sync
+    watermark below it may have missed deletes, so that client must start over.
+    """
+    __tablename__ = "note_sync_horizon"
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True, autoincrement=False)
+    version: Mapped[int] = mapped_column(BigInteger, server_default="0")
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Index, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from . import Base
+
+
+class RefreshRevocation(Base):
+    """
+    A revoked refresh-token family (logout, reuse detected) or, with no family,
+    every refresh token the user was issued up to revoked_at (revoke-all).
+    Kept until expires_at, after which no token it covers can still be valid.
+    """
+    __tablename__ = "refresh_revocations"
+    __table_args__ = (
+        Index("ix_refresh_revocations_revoked_at", "revoked_at"),
+        Index("ix_refresh_revocations_expires_at", "expires_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    family: Mapped[Optional[str]] = mapped_column(String(32), default=None)
+    revoked_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    expires_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True))
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import datetime as dt
+
+from sqlalchemy import Date, DateTime, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from . import Base
+
+# A "sleep day" runs noon to noon UTC and is named after the morning it ends on,
+# so a night from 23:00 to 07:00 counts as one day: date(ts + 12h).
+SLEEP_DAY_SHIFT_HOURS = 12
+
+
+class SleepDaily(Base):
+    """
+    Per-user, per-sleep-day totals of sleep_samples, kept up to date by the
+    ingestion statement itself (only newly inserted samples are added), so
+    analytics read one row per day instead of thousands of samples.
+    """
+    __tablename__ = "sleep_daily"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[dt.date] = mapped_column(Date, primary_key=True)
+    awake_s: Mapped[int] = mapped_column(Integer)
+    light_s: Mapped[int] = mapped_column(Integer)
+    deep_s: Mapped[int] = mapped_column(Integer)
+    rem_s: Mapped[int] = mapped_column(Integer)
+    samples: Mapped[int] = mapped_column(Integer)
+    first_ts: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True))
+    last_ts: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True))
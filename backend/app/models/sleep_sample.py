@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, SmallInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from . import Base
+
+# stage codes stored in sleep_samples.stage
+SLEEP_STAGES = {"awake": 0, "light": 1, "deep": 2, "rem": 3}
+
+
+class SleepSample(Base):
+    """
+    One epoch of a sleep session as recorded by a device: the stage the user
+    was in from `ts` for `duration_s` seconds. A night is the run of samples.
+    (user_id, ts) is the primary key, so re-uploading the same data is a no-op.
+    """
+    __tablename__ = "sleep_samples"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    ts: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    stage: Mapped[int] = mapped_column(SmallInteger)
+    duration_s: Mapped[int] = mapped_column(SmallInteger, server_default="30")
+    heart_rate: Mapped[Optional[int]] = mapped_column(SmallInteger, default=None)
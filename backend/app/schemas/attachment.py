@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+# Outgoing attachment metadata (bytes are fetched separately)
+class AttachmentOut(BaseModel):
+    id: int
+    note_id: int
+    filename: str
+    content_type: str
+    size: Optional[int] = None
+    created_at: datetime
+
+
+class AttachmentList(BaseModel):
+    items: List[AttachmentOut]
+
+
+# Request for a direct (pre-signed) upload
+class AttachmentPresignIn(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    content_type: str = Field("application/octet-stream", max_length=255)
+
+
+# Where and how to PUT the bytes; then POST /attachments/{id}/complete
+class AttachmentPresignOut(BaseModel):
+    id: int
+    upload_url: str
+    method: str = "PUT"
+    headers: Dict[str, str]
+    expires_in: int
+
+
+class AttachmentUrlOut(BaseModel):
+    url: str
+    expires_in: int
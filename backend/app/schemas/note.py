@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 
 # Incoming payload to create a note
@@ -22,3 +22,78 @@ class NoteOut(BaseModel):
     title: str
     body: str
     done: bool
+
+
+# A created or modified note, with the change version it was written at
+# (what writes return, so a syncing client can advance its watermark)
+class NoteChange(NoteOut):
+    version: int
+
+
+# One page of notes plus the cursor for the next page (None on the last page)
+class NotePage(BaseModel):
+    items: List[NoteOut]
+    next_cursor: Optional[str] = None
+
+
+# --- batch writes ---
+
+class NoteBatchCreate(BaseModel):
+    items: List[NoteCreate] = Field(..., min_length=1)
+
+
+# One entry of a batch update: which note, plus the fields to change
+class NoteBatchUpdateItem(NoteUpdate):
+    id: int
+
+
+class NoteBatchUpdate(BaseModel):
+    items: List[NoteBatchUpdateItem] = Field(..., min_length=1)
+
+
+class NoteBatchDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+
+# Outcome for one input item, in input order (status mirrors the single-note endpoints)
+class NoteBatchResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: int
+    note: Optional[NoteChange] = None
+    detail: Optional[str] = None
+
+
+class NoteBatchOut(BaseModel):
+    results: List[NoteBatchResult]
+
+
+# --- search ---
+
+# A search hit: the note, its relevance and an HTML-escaped body excerpt with matches wrapped in <b>…</b>
+class NoteSearchHit(NoteOut):
+    rank: float
+    snippet: str
+
+
+class NoteSearchPage(BaseModel):
+    items: List[NoteSearchHit]
+    next_cursor: Optional[str] = None
+
+
+# --- incremental sync ---
+
+class NoteDeleted(BaseModel):
+    id: int
+    version: int
+
+
+# Changes after `since`, oldest first. Pass `version` back as `since` next time;
+# if `has_more` is set, call again right away to get the rest. `reset` means
+# `since` is too old (its deletes were pruned): drop local notes and go on from 0.
+class NoteChanges(BaseModel):
+    changed: List[NoteChange]
+    deleted: List[NoteDeleted]
+    version: int
+    has_more: bool
+    reset: bool = False
@@ -0,0 +1,55 @@
+import datetime as dt
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+# Result of one NDJSON/CSV upload
+class SleepIngestOut(BaseModel):
+    received: int       # data rows parsed successfully
+    inserted: int       # new samples stored
+    duplicates: int     # rows whose (user, ts) was already stored (or repeated in the upload)
+    rejected: int       # rows that could not be parsed
+    errors: List[str]   # the first few parse errors, with line numbers
+
+
+# One sleep day (noon to noon UTC, named after the morning) with data
+class SleepDay(BaseModel):
+    day: dt.date
+    asleep_minutes: float               # light + deep + rem
+    light_minutes: float
+    deep_minutes: float
+    rem_minutes: float
+    awake_minutes: float
+    rolling_avg_minutes: float          # mean over the nights with data in the trailing window
+    vs_target_minutes: float            # asleep - target (negative = short)
+
+
+# ISO week (Monday start); weeks in the range without data have nights = 0
+class SleepWeek(BaseModel):
+    week_start: dt.date
+    asleep_minutes: float
+    nights: int
+    avg_minutes: Optional[float]        # per night with data
+
+
+# Whole-range figures; the statistics are omitted when there are no nights
+class SleepSummary(BaseModel):
+    nights: int
+    target_minutes: int                 # the user's sleep_minutes pref
+    avg_minutes: Optional[float] = None
+    median_minutes: Optional[float] = None
+    std_minutes: Optional[float] = None
+    bedtime_std_minutes: Optional[float] = None
+    consistency: Optional[float] = None  # 0-100: steady durations and bedtimes
+    avg_vs_target_minutes: Optional[float] = None
+    target_hit_rate: Optional[float] = None  # share of nights at or above target
+
+
+class SleepAnalyticsOut(BaseModel):
+    start: dt.date
+    end: dt.date
+    window: int
+    daily: List[SleepDay]
+    weekly: List[SleepWeek]
+    summary: SleepSummary
@@ -0,0 +1,17 @@
+import statistics
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def report(label: str, samples: list[float]) -> None:
+    """Print n / p50 / p95 / p99 / max / mean of latencies given in seconds."""
+    ms = [s * 1000 for s in samples]
+    print(
+        f"{label:<14} n={len(ms):<5} p50={percentile(ms, 50):7.2f}ms "
+        f"p95={percentile(ms, 95):7.2f}ms p99={percentile(ms, 99):7.2f}ms max={max(ms):7.2f}ms "
+        f"mean={statistics.fmean(ms):7.2f}ms"
+    )
@@ -0,0 +1,161 @@
+"""
+Benchmark: credential-stuffing style abuse of /auth/login (and /auth/signup,
+/auth/refresh) to check that throttling keeps Argon2 CPU bounded.
+
+Start the API (uvicorn --factory app.main:create_app) and, from backend/:
+
+    python -m bench.auth_abuse --duration 30 --concurrency 64 --server-pid <uvicorn pid>
+
+Each worker hammers the auth endpoints with wrong passwords, mostly against
+random (unknown) emails and sometimes against one real account. Reported:
+  - statuses per endpoint (429s are the limiter working) and the Retry-After seen
+  - Argon2 calls actually run by the server (/metrics/hashing completed + failed
+    + cancelled delta: a cancelled caller's call still runs to the end in the pool)
+    next to the most the configured buckets should allow
+  - with --server-pid, CPU seconds used by the server and its hashing workers
+    (Linux /proc), as an average number of busy cores
+  - /healthz latency during the abuse, i.e. whether normal traffic still gets through
+
+Run once with RATE_LIMIT_BACKEND=off on the server to see the unthrottled baseline.
+Needs httpx.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+from bench._stats import report
+
+PASSWORD = "abuse-test-password"
+
+
+def _cpu_seconds(root_pid: int) -> float:
+    """utime + stime of root_pid and all its descendants (hashing pool workers)."""
+    tick = os.sysconf("SC_CLK_TCK")
+    parents, times = {}, {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # fields after the ")" that closes the command name: state ppid ... utime(12) stime(13)
+        fields = stat[stat.rindex(")") + 2:].split()
+        pid = int(entry)
+        parents[pid] = int(fields[1])
+        times[pid] = (int(fields[11]) + int(fields[12])) / tick
+
+    def under_root(pid: int) -> bool:
+        while pid > 1:
+            if pid == root_pid:
+                return True
+            pid = parents.get(pid, 0)
+        return False
+
+    return sum(t for pid, t in times.items() if under_root(pid))
+
+
+async def _hash_calls(client: httpx.AsyncClient) -> int:
+    r = await client.get("/metrics/hashing")
+    r.raise_for_status()
+    stats = r.json()
+    return stats["completed"] + stats["failed"] + stats["cancelled"]
+
+
+async def _attacker(client, rng, deadline, victim, refresh_token, statuses, retry_after):
+    while time.perf_counter() < deadline:
+        op = rng.random()
+        if op < 0.7:
+            email = victim if rng.random() < 0.3 else f"nobody-{rng.getrandbits(48):x}@example.com"
+            label, send = "POST /auth/login", client.post(
+                "/auth/login", json={"email": email, "password": "wrong-password"})
+        elif op < 0.85:
+            label, send = "POST /auth/signup", client.post(
+                "/auth/signup", json={"email": f"abuse-{uuid.uuid4().hex}@example.com", "password": PASSWORD})
+        else:
+            label, send = "POST /auth/refresh", client.post(
+                "/auth/refresh", json={"refresh_token": refresh_token})
+        try:
+            r = await send
+        except httpx.HTTPError:
+            statuses[(label, 0)] += 1
+            continue
+        statuses[(label, r.status_code)] += 1
+        if r.status_code == 429:
+            retry_after.append(int(r.headers.get("retry-after", "0")))
+
+
+async def _probe(client, deadline, samples):
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            await client.get("/healthz")
+        except httpx.HTTPError:
+            pass
+        samples.append(time.perf_counter() - t0)
+        await asyncio.sleep(0.05)
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--duration", type=float, default=30)
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--server-pid", type=int, help="uvicorn pid, to measure server CPU (Linux)")
+    ap.add_argument("--ip-per-minute", type=float, default=30, help="server's RATE_LIMIT_IP_PER_MINUTE")
+    ap.add_argument("--ip-burst", type=int, default=10, help="server's RATE_LIMIT_IP_BURST")
+    args = ap.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency + 4, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        # one real account to aim at, and a valid refresh token to replay
+        victim = f"abuse-victim-{args.seed}@example.com"
+        await client.post("/auth/signup", json={"email": victim, "password": PASSWORD})
+        r = await client.post("/auth/login", json={"email": victim, "password": PASSWORD})
+        r.raise_for_status()
+        refresh_token = r.json()["refresh_token"]
+
+        hashes_before = await _hash_calls(client)
+        cpu_before = _cpu_seconds(args.server_pid) if args.server_pid else None
+        statuses: Counter = Counter()
+        retry_after: list[int] = []
+        probe: list[float] = []
+
+        t0 = time.perf_counter()
+        deadline = t0 + args.duration
+        await asyncio.gather(
+            _probe(client, deadline, probe),
+            *(
+                _attacker(client, random.Random(f"{args.seed}:{wid}"), deadline, victim,
+                          refresh_token, statuses, retry_after)
+                for wid in range(args.concurrency)
+            ),
+        )
+        elapsed = time.perf_counter() - t0
+
+        hashes = await _hash_calls(client) - hashes_before
+        cpu = _cpu_seconds(args.server_pid) - cpu_before if args.server_pid else None
+
+    for (label, status), n in sorted(statuses.items()):
+        print(f"{label:<20} {status:>3}  {n:>7}  ({n / elapsed:8.1f}/s)")
+    if retry_after:
+        print(f"Retry-After: min={min(retry_after)}s max={max(retry_after)}s")
+    # login and signup are bucketed separately, each may hash up to burst + rate * duration
+    allowed = 2 * (args.ip_burst + args.ip_per_minute / 60 * elapsed)
+    print(f"argon2 calls: {hashes} in {elapsed:.1f}s ({hashes / elapsed:.2f}/s); "
+          f"throttle allows at most ~{allowed:.0f} from one IP")
+    if cpu is not None:
+        print(f"server cpu: {cpu:.1f}s ({cpu / elapsed:.2f} cores busy on average)")
+    report("healthz", probe)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
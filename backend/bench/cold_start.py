@@ -0,0 +1,127 @@
+"""
+Benchmark: cold start of the API with and without the startup warmup.
+
+For each mode, starts a fresh uvicorn process --runs times and measures
+  - ready:      process start until GET /healthz answers (uvicorn only starts
+                serving after the lifespan startup, so this includes the warmup)
+  - first login / first GET /notes / first GET /notes/{id}: the first request
+    of each kind the new process serves
+  - burst:      --burst concurrent GET /notes right after, which need a full pool
+
+Needs a reachable Postgres (and Redis, unless the .env turns it off) and httpx.
+From backend/:
+
+    python -m bench.cold_start --runs 5 --burst 16
+
+The warmup is toggled with WARMUP_ON_STARTUP; the child server uses in-memory
+rate limiting so repeated logins aren't throttled across runs.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench._stats import report
+
+EMAIL = "cold-start-bench@example.com"
+PASSWORD = "cold-start-password"
+
+
+async def _wait_ready(client: httpx.AsyncClient, proc: subprocess.Popen, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            if (await client.get("/healthz")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.01)
+    raise TimeoutError("server did not become ready")
+
+
+async def _timed(send) -> float:
+    t0 = time.perf_counter()
+    (await send).raise_for_status()
+    return time.perf_counter() - t0
+
+
+async def _one_run(args: argparse.Namespace, warmup: bool, samples: dict) -> None:
+    env = {**os.environ, "WARMUP_ON_STARTUP": str(warmup).lower(), "RATE_LIMIT_BACKEND": "memory"}
+    cmd = [
+        sys.executable, "-m", "uvicorn", "--factory", "app.main:create_app",
+        "--port", str(args.port), "--log-level", "warning",
+    ]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60) as client:
+            await _wait_ready(client, proc, timeout=60)
+            samples["ready"].append(time.perf_counter() - t0)
+
+            t1 = time.perf_counter()
+            r = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+            r.raise_for_status()
+            samples["first login"].append(time.perf_counter() - t1)
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+            samples["first list"].append(await _timed(client.get("/notes", headers=headers)))
+            samples["first get"].append(await _timed(client.get(f"/notes/{args.note_id}", headers=headers)))
+
+            t1 = time.perf_counter()
+            await asyncio.gather(*(
+                _timed(client.get("/notes", params={"limit": 50}, headers=headers)) for _ in range(args.burst)
+            ))
+            samples["burst"].append(time.perf_counter() - t1)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+async def _seed(args: argparse.Namespace) -> int:
+    """Start a server once to create the bench user and one note; returns the note id."""
+    env = {**os.environ, "RATE_LIMIT_BACKEND": "memory"}
+    cmd = [
+        sys.executable, "-m", "uvicorn", "--factory", "app.main:create_app",
+        "--port", str(args.port), "--log-level", "warning",
+    ]
+    proc = subprocess.Popen(cmd, env=env)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60) as client:
+            await _wait_ready(client, proc, timeout=60)
+            await client.post("/auth/signup", json={"email": EMAIL, "password": PASSWORD})
+            r = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+            r.raise_for_status()
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            r = await client.post("/notes", json={"title": "cold start", "body": "bench"}, headers=headers)
+            r.raise_for_status()
+            return r.json()["id"]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--burst", type=int, default=16)
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+
+    args.note_id = await _seed(args)
+    for warmup in (False, True):
+        samples = {k: [] for k in ("ready", "first login", "first list", "first get", "burst")}
+        for _ in range(args.runs):
+            await _one_run(args, warmup, samples)
+        print(f"--- warmup {'on' if warmup else 'off'} ---")
+        for label, values in samples.items():
+            report(label, values)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,268 @@
+"""
+Load generator for the API, with repeatable scenario profiles.
+
+Start the API against a local Postgres (uvicorn --factory app.main:create_app), then from backend/:
+
+    python -m bench.load --scenario crud --duration 30 --concurrency 32 --out results.json
+    python -m bench.load --scenario all
+
+Scenarios:
+  login_storm   signups followed by repeated logins (argon2-bound)
+  crud          create / read / update / delete / list mix on one's own notes
+  large_list    paging and NDJSON-streaming a user with --list-notes notes
+  refresh       token refresh churn interleaved with authorized reads
+
+Data is derived from --seed (emails, note contents, operation mix), so two
+runs with the same arguments send the same traffic. Users are reused across
+runs: a 409 on signup just means "already seeded". Results go to stdout and,
+with --out, to a JSON file tagged with the current git commit, for comparing
+commits. Needs httpx.
+
+Auth endpoints are rate limited per IP and per account; for capacity numbers
+on login_storm and refresh run the server with RATE_LIMIT_BACKEND=off.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+
+from bench._stats import percentile
+
+PASSWORD = "load-test-password"
+
+
+class Recorder:
+    """Latency samples and status counts per endpoint label (e.g. "GET /notes/{id}")."""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def call(self, label: str, send: Awaitable[httpx.Response]) -> httpx.Response | None:
+        t0 = time.perf_counter()
+        try:
+            resp = await send
+        except httpx.HTTPError:
+            self.latencies[label].append(time.perf_counter() - t0)
+            self.statuses[label][0] += 1  # 0 = transport error
+            return None
+        self.latencies[label].append(time.perf_counter() - t0)
+        self.statuses[label][resp.status_code] += 1
+        return resp
+
+    def summary(self, elapsed: float) -> Dict[str, dict]:
+        out = {}
+        for label in sorted(self.latencies):
+            ms = [s * 1000 for s in self.latencies[label]]
+            statuses = dict(self.statuses[label])
+            errors = sum(n for code, n in statuses.items() if code == 0 or code >= 500)
+            out[label] = {
+                "requests": len(ms),
+                "rps": round(len(ms) / elapsed, 2),
+                "p50_ms": round(percentile(ms, 50), 3),
+                "p95_ms": round(percentile(ms, 95), 3),
+                "p99_ms": round(percentile(ms, 99), 3),
+                "max_ms": round(max(ms), 3),
+                "errors": errors,
+                "statuses": {str(k): v for k, v in sorted(statuses.items())},
+            }
+        return out
+
+
+# --- helpers ---------------------------------------------------------------
+
+async def _login(client: httpx.AsyncClient, email: str) -> dict:
+    r = await client.post("/auth/signup", json={"email": email, "password": PASSWORD})
+    if r.status_code not in (201, 409):
+        r.raise_for_status()
+    r = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+    r.raise_for_status()
+    return r.json()
+
+
+def _auth(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _note(rng: random.Random) -> dict:
+    words = ["sleep", "dream", "nap", "alarm", "tea", "rest", "night", "walk", "quiet", "light"]
+    return {
+        "title": " ".join(rng.choices(words, k=3)),
+        "body": " ".join(rng.choices(words, k=rng.randint(10, 80))),
+        "done": rng.random() < 0.3,
+    }
+
+
+# --- scenarios -------------------------------------------------------------
+# Each scenario is (setup, worker): setup runs once and returns shared state;
+# each of --concurrency workers loops until the deadline.
+
+Worker = Callable[[httpx.AsyncClient, random.Random, Recorder, float, dict, int], Awaitable[None]]
+Setup = Callable[[httpx.AsyncClient, argparse.Namespace], Awaitable[dict]]
+
+
+async def _setup_none(client: httpx.AsyncClient, args: argparse.Namespace) -> dict:
+    return {}
+
+
+async def _login_storm(client, rng, rec, deadline, state, wid):
+    args = state["args"]
+    emails = [f"load-{args.seed}-storm-{wid}-{i}@example.com" for i in range(args.users_per_worker)]
+    for email in emails:
+        await rec.call("POST /auth/signup", client.post("/auth/signup", json={"email": email, "password": PASSWORD}))
+    while time.perf_counter() < deadline:
+        email = rng.choice(emails)
+        password = PASSWORD if rng.random() < 0.9 else "wrong-password"
+        await rec.call("POST /auth/login", client.post("/auth/login", json={"email": email, "password": password}))
+
+
+async def _crud(client, rng, rec, deadline, state, wid):
+    args = state["args"]
+    token = (await _login(client, f"load-{args.seed}-crud-{wid}@example.com"))["access_token"]
+    headers = _auth(token)
+    mine: List[int] = []
+    while time.perf_counter() < deadline:
+        op = rng.random()
+        if op < 0.25 or not mine:
+            r = await rec.call("POST /notes", client.post("/notes", json=_note(rng), headers=headers))
+            if r is not None and r.status_code == 201:
+                mine.append(r.json()["id"])
+        elif op < 0.65:
+            nid = rng.choice(mine)
+            await rec.call("GET /notes/{id}", client.get(f"/notes/{nid}", headers=headers))
+        elif op < 0.80:
+            nid = rng.choice(mine)
+            await rec.call("PUT /notes/{id}", client.put(f"/notes/{nid}", json={"done": rng.random() < 0.5},
+                                                          headers=headers))
+        elif op < 0.90:
+            await rec.call("GET /notes", client.get("/notes", params={"limit": 50}, headers=headers))
+        else:
+            nid = mine.pop(rng.randrange(len(mine)))
+            await rec.call("DELETE /notes/{id}", client.delete(f"/notes/{nid}", headers=headers))
+
+
+async def _setup_large_list(client: httpx.AsyncClient, args: argparse.Namespace) -> dict:
+    email = f"load-{args.seed}-list-{args.list_notes}@example.com"
+    r = await client.post("/auth/signup", json={"email": email, "password": PASSWORD})
+    fresh = r.status_code == 201
+    token = (await _login(client, email))["access_token"]
+    if fresh:
+        rng = random.Random(args.seed)
+        batch_size = 500
+        for start in range(0, args.list_notes, batch_size):
+            items = [_note(rng) for _ in range(min(batch_size, args.list_notes - start))]
+            (await client.post("/notes/batch", json={"items": items}, headers=_auth(token))).raise_for_status()
+    return {"token": token}
+
+
+async def _large_list(client, rng, rec, deadline, state, wid):
+    headers = _auth(state["token"])
+    while time.perf_counter() < deadline:
+        if rng.random() < 0.8:
+            # walk a few pages
+            cursor = None
+            for _ in range(rng.randint(1, 5)):
+                params = {"limit": 500}
+                if cursor:
+                    params["cursor"] = cursor
+                r = await rec.call("GET /notes", client.get("/notes", params=params, headers=headers))
+                if r is None or r.status_code != 200:
+                    break
+                cursor = r.json()["next_cursor"]
+                if not cursor:
+                    break
+        else:
+            async def stream() -> httpx.Response:
+                async with client.stream("GET", "/notes", params={"format": "ndjson"}, headers=headers) as r:
+                    async for _ in r.aiter_bytes():
+                        pass
+                return r
+            await rec.call("GET /notes?format=ndjson", stream())
+
+
+async def _refresh(client, rng, rec, deadline, state, wid):
+    args = state["args"]
+    tokens = await _login(client, f"load-{args.seed}-refresh-{wid}@example.com")
+    access, refresh = tokens["access_token"], tokens["refresh_token"]
+    while time.perf_counter() < deadline:
+        if rng.random() < 0.5:
+            r = await rec.call("POST /auth/refresh", client.post("/auth/refresh", json={"refresh_token": refresh}))
+            if r is not None and r.status_code == 200:
+                body = r.json()
+                access = body["access_token"]
+                refresh = body.get("refresh_token", refresh)  # rotation, if the server does it
+        else:
+            await rec.call("GET /me", client.get("/me", headers=_auth(access)))
+
+
+SCENARIOS: Dict[str, Tuple[Setup, Worker]] = {
+    "login_storm": (_setup_none, _login_storm),
+    "crud": (_setup_none, _crud),
+    "large_list": (_setup_large_list, _large_list),
+    "refresh": (_setup_none, _refresh),
+}
+
+
+async def run_scenario(name: str, args: argparse.Namespace) -> dict:
+    setup, worker = SCENARIOS[name]
+    limits = httpx.Limits(max_connections=args.concurrency + 4, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        state = await setup(client, args)
+        state["args"] = args
+        rec = Recorder()
+        t0 = time.perf_counter()
+        deadline = t0 + args.duration
+        await asyncio.gather(*(
+            worker(client, random.Random(f"{args.seed}:{name}:{wid}"), rec, deadline, state, wid)
+            for wid in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - t0
+    return {"elapsed_s": round(elapsed, 3), "endpoints": rec.summary(elapsed)}
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--scenario", choices=[*SCENARIOS, "all"], default="all")
+    ap.add_argument("--duration", type=float, default=20, help="seconds per scenario")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--users-per-worker", type=int, default=5, help="login_storm accounts per worker")
+    ap.add_argument("--list-notes", type=int, default=20_000, help="notes seeded for large_list")
+    ap.add_argument("--out", help="also write the JSON report to this file")
+    args = ap.parse_args()
+
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    report = {
+        "commit": _git_commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "scenarios": {},
+    }
+    for name in names:
+        print(f"running {name}…", file=sys.stderr)
+        report["scenarios"][name] = await run_scenario(name, args)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
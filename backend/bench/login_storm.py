@@ -0,0 +1,81 @@
+"""
+Benchmark: latency of GET /notes reads while a login storm is running.
+
+Start the API first (uvicorn --factory app.main:create_app), then from backend/:
+
+    python -m bench.login_storm --logins 200 --concurrency 32 --reads 500
+
+Needs httpx (pip install httpx). Prints p50/p95/p99 of the reads, measured
+once on an idle server and once while logins hammer argon2 verify.
+Run the server with RATE_LIMIT_BACKEND=off, or the logins are throttled.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from bench._stats import report
+
+
+async def _setup_user(client: httpx.AsyncClient) -> tuple[str, str, str]:
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    password = "bench-password"
+    r = await client.post("/auth/signup", json={"email": email, "password": password})
+    r.raise_for_status()
+    r = await client.post("/auth/login", json={"email": email, "password": password})
+    r.raise_for_status()
+    return email, password, r.json()["access_token"]
+
+
+async def _reads(client: httpx.AsyncClient, token: str, n: int) -> list[float]:
+    headers = {"Authorization": f"Bearer {token}"}
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        r = await client.get("/notes", params={"limit": 20}, headers=headers)
+        samples.append(time.perf_counter() - t0)
+        r.raise_for_status()
+    return samples
+
+
+async def _storm(client: httpx.AsyncClient, email: str, password: str, total: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            await client.post("/auth/login", json={"email": email, "password": password})
+
+    await asyncio.gather(*(one() for _ in range(total)))
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--logins", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--reads", type=int, default=500)
+    args = ap.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        email, password, token = await _setup_user(client)
+        for _ in range(3):
+            await client.post("/notes", json={"title": "bench", "body": "x"},
+                              headers={"Authorization": f"Bearer {token}"})
+
+        report("idle", await _reads(client, token, args.reads))
+
+        storm = asyncio.create_task(_storm(client, email, password, args.logins, args.concurrency))
+        samples = []
+        while not storm.done():
+            samples.extend(await _reads(client, token, 10))
+        await storm
+        report("login storm", samples)
+
+        print("hash pool:", (await client.get("/metrics/hashing")).json())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Benchmark: note change fan-out over GET /notes/events.
+
+Start the API (uvicorn --factory app.main:create_app), then from backend/:
+
+    python -m bench.note_events --streams 500 --writes 50
+
+Opens --streams idle event streams for one fresh user, then creates --writes
+notes one after another and measures, for every stream, the time from sending
+POST /notes until that stream receives the note's event. All streams share the
+worker's one LISTEN connection; compare sleep_note_events_* and sleep_db_pool_*
+on /metrics before and after. Needs httpx.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict, List
+
+import httpx
+
+from bench._stats import report
+
+PASSWORD = "note-events-password"
+
+
+async def _follow(client: httpx.AsyncClient, headers: dict, opened: List[int],
+                  arrived: Dict[int, List[float]]) -> None:
+    async with client.stream("GET", "/notes/events", headers=headers) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[5:])
+            if event["op"] == "resync":  # first event: the subscription is live
+                opened.append(1)
+                continue
+            now = time.perf_counter()
+            for note_id in event["ids"]:
+                arrived.setdefault(note_id, []).append(now)
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--streams", type=int, default=500)
+    ap.add_argument("--writes", type=int, default=50)
+    args = ap.parse_args()
+
+    limits = httpx.Limits(max_connections=args.streams + 10)
+    timeout = httpx.Timeout(30, read=None)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        email = f"bench-events-{uuid.uuid4().hex[:12]}@example.com"
+        (await client.post("/auth/signup", json={"email": email, "password": PASSWORD})).raise_for_status()
+        r = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        sent: Dict[int, float] = {}
+        arrived: Dict[int, List[float]] = {}
+        opened: List[int] = []
+        followers = [
+            asyncio.create_task(_follow(client, headers, opened, arrived))
+            for _ in range(args.streams)
+        ]
+        t0 = time.perf_counter()
+        while len(opened) < args.streams:
+            await asyncio.sleep(0.05)
+        print(f"{args.streams} streams open in {time.perf_counter() - t0:.2f}s")
+
+        for i in range(args.writes):
+            t1 = time.perf_counter()
+            r = await client.post("/notes", json={"title": f"event {i}", "body": "bench"}, headers=headers)
+            r.raise_for_status()
+            sent[r.json()["id"]] = t1
+        await asyncio.sleep(2)  # let the last events arrive
+
+        for task in followers:
+            task.cancel()
+        await asyncio.gather(*followers, return_exceptions=True)
+
+    # matched afterwards: an event can arrive before the POST's response does
+    latencies = [t - sent[note_id] for note_id, times in arrived.items() if note_id in sent for t in times]
+    expected = args.streams * args.writes
+    print(f"received {len(latencies)}/{expected} events")
+    if latencies:
+        report("write->event", latencies)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+Benchmark: GET /notes/search against a user with a large seeded note table.
+
+Start the API first (uvicorn --factory app.main:create_app), then from backend/:
+
+    python -m bench.search --rows 1000000 --runs 50
+
+Creates a fresh user over HTTP, seeds `--rows` notes for it straight in
+Postgres (deterministic: fixed setseed), runs ANALYZE, then times a set of
+queries (first page and a deeper cursor page). Needs httpx.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+from sqlalchemy import text
+
+from app.db.session import dispose_engines, get_engine
+from bench._stats import report
+
+WORDS = [
+    "sleep", "dream", "night", "nap", "alarm", "coffee", "insomnia", "pillow",
+    "melatonin", "snore", "bedtime", "routine", "morning", "tired", "rest",
+    "deep", "rem", "cycle", "journal", "meditation", "walk", "screen", "tea",
+    "weekend", "travel", "jetlag", "quiet", "noise", "dark", "light",
+]
+
+QUERIES = ["sleep", "dream journal", "\"deep sleep\"", "coffee -tea", "melatonin or insomnia"]
+
+SEED_SQL = text("""
+    INSERT INTO notes (user_id, title, body, done)
+    SELECT :user_id,
+           w[1 + (random() * (cardinality(w) - 1))::int] || ' ' || w[1 + (random() * (cardinality(w) - 1))::int],
+           (SELECT string_agg(w[1 + (random() * (cardinality(w) - 1))::int], ' ')
+              FROM generate_series(1, 40 + (g % 3)) ),
+           random() < 0.3
+      FROM generate_series(1, :rows) AS g, (SELECT CAST(:words AS text[]) AS w) AS words
+""")
+
+
+async def _seed(user_id: int, rows: int) -> float:
+    t0 = time.perf_counter()
+    engine = get_engine()
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT setseed(0.42)"))
+        await conn.execute(SEED_SQL, {"user_id": user_id, "rows": rows, "words": WORDS})
+    async with engine.connect() as conn:
+        await conn.execute(text("ANALYZE notes"))
+    await dispose_engines()
+    return time.perf_counter() - t0
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--runs", type=int, default=50)
+    args = ap.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+        email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+        (await client.post("/auth/signup", json={"email": email, "password": "bench-password"})).raise_for_status()
+        r = await client.post("/auth/login", json={"email": email, "password": "bench-password"})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        user_id = (await client.get("/me", headers=headers)).json()["user_id"]
+
+        print(f"seeding {args.rows} notes for user {user_id}…")
+        print(f"seeded in {await _seed(user_id, args.rows):.1f}s")
+
+        for q in QUERIES:
+            first, deeper = [], []
+            for _ in range(args.runs):
+                t0 = time.perf_counter()
+                r = await client.get("/notes/search", params={"q": q, "limit": 20}, headers=headers)
+                first.append(time.perf_counter() - t0)
+                r.raise_for_status()
+                cursor = r.json()["next_cursor"]
+                if cursor:
+                    t0 = time.perf_counter()
+                    r = await client.get("/notes/search", params={"q": q, "limit": 20, "cursor": cursor},
+                                         headers=headers)
+                    deeper.append(time.perf_counter() - t0)
+                    r.raise_for_status()
+            report(f"{q[:12]} p1", first)
+            if deeper:
+                report(f"{q[:12]} p2", deeper)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
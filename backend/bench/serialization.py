@@ -0,0 +1,108 @@
+"""
+Benchmark: list/single responses rendered the old way (ORM rows -> NoteOut ->
+response_model validation -> jsonable_encoder -> json.dumps) vs. the new way
+(Postgres json_agg passed through unchanged / pydantic-core model_dump_json),
+at 1, 100 and 10,000 rows.
+
+Runs in-process against the configured database (no API server needed).
+From backend/:
+
+    python -m bench.serialization --runs 30
+
+Seeds one throwaway user with 10,000 notes and deletes it at the end.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, insert, select, text
+
+from app.core.responses import model_response
+from app.db.note_queries import notes_page_json
+from app.db.session import dispose_engines, new_session
+from app.models import Note, User
+from app.schemas.note import NoteOut, NotePage
+from bench._stats import report
+
+SIZES = (1, 100, 10_000)
+
+
+async def _seed(rows: int) -> int:
+    async with new_session() as session:
+        user_id = (await session.execute(
+            insert(User).values(email=f"bench-{uuid.uuid4().hex[:12]}@example.com", password_hash="x")
+            .returning(User.id)
+        )).scalar_one()
+        await session.execute(text("""
+            INSERT INTO notes (user_id, title, body, done)
+            SELECT :uid, 'note ' || g, repeat('lorem ipsum dolor sit amet ', 1 + g % 8), g % 3 = 0
+              FROM generate_series(1, :rows) AS g
+        """), {"uid": user_id, "rows": rows})
+        await session.commit()
+    return user_id
+
+
+async def _orm_path(user_id: int, n: int) -> bytes:
+    async with new_session() as session:
+        notes = (await session.execute(
+            select(Note).where(Note.user_id == user_id).order_by(Note.id).limit(n)
+        )).scalars().all()
+    page = NotePage(items=[NoteOut(id=x.id, title=x.title, body=x.body, done=x.done) for x in notes])
+    # what FastAPI does with response_model=NotePage
+    validated = NotePage.model_validate(page.model_dump())
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+async def _db_json_path(user_id: int, n: int) -> bytes:
+    async with new_session() as session:
+        items_json, _ = await notes_page_json(session, user_id, 0, n)
+    return f'{{"items":{items_json},"next_cursor":null}}'.encode("utf-8")
+
+
+async def _time(fn, *args, runs: int) -> list[float]:
+    await fn(*args)  # warm up (connections, prepared statements)
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        await fn(*args)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def _time_single(runs: int) -> None:
+    note = NoteOut(id=1, title="note", body="lorem ipsum " * 20, done=False)
+    old, new = [], []
+    for _ in range(runs * 100):
+        t0 = time.perf_counter()
+        json.dumps(jsonable_encoder(NoteOut.model_validate(note.model_dump()))).encode("utf-8")
+        old.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        model_response(note)
+        new.append(time.perf_counter() - t0)
+    report("single old", old)
+    report("single new", new)
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=30)
+    args = ap.parse_args()
+
+    user_id = await _seed(max(SIZES))
+    try:
+        for n in SIZES:
+            report(f"list {n} orm", await _time(_orm_path, user_id, n, runs=args.runs))
+            report(f"list {n} db", await _time(_db_json_path, user_id, n, runs=args.runs))
+        _time_single(args.runs)
+    finally:
+        async with new_session() as session:
+            await session.execute(delete(User).where(User.id == user_id))
+            await session.commit()
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
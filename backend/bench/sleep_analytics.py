@@ -0,0 +1,76 @@
+"""
+Benchmark: GET /sleep/analytics latency over a year of history.
+
+Start the API (uvicorn --factory app.main:create_app), then from backend/:
+
+    python -m bench.sleep_analytics --nights 365 --requests 200
+
+Creates a fresh user, uploads --nights nights of 30 s samples (about 8 hours
+each, so ~350k rows for a year) through POST /sleep/samples, then times
+--requests analytics calls for 30, 90 and 365 days. The rollup is filled
+during the upload, so the upload time is reported separately. Needs httpx.
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+import httpx
+
+from bench._stats import report
+
+PASSWORD = "sleep-analytics-password"
+STAGES = ("light", "light", "deep", "rem", "awake")
+
+
+async def _nights(nights: int, seed: int) -> AsyncIterator[bytes]:
+    rng = random.Random(seed)
+    first = datetime.now(timezone.utc).replace(hour=22, minute=0, second=0, microsecond=0)
+    first -= timedelta(days=nights)
+    yield b"ts,stage,duration_s\n"
+    for n in range(nights):
+        bedtime = first + timedelta(days=n, minutes=rng.randint(-60, 60))
+        epochs = rng.randint(6 * 120, 9 * 120)
+        yield "".join(
+            f"{(bedtime + timedelta(seconds=30 * i)).isoformat()},{rng.choice(STAGES)},30\n"
+            for i in range(epochs)
+        ).encode()
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--nights", type=int, default=365)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=600) as client:
+        email = f"bench-analytics-{uuid.uuid4().hex[:12]}@example.com"
+        (await client.post("/auth/signup", json={"email": email, "password": PASSWORD})).raise_for_status()
+        r = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        t0 = time.perf_counter()
+        r = await client.post(
+            "/sleep/samples", content=_nights(args.nights, args.seed),
+            headers={**headers, "Content-Type": "text/csv"},
+        )
+        r.raise_for_status()
+        print(f"upload: {r.json()['inserted']} samples in {time.perf_counter() - t0:.2f}s")
+
+        for days in (30, 90, 365):
+            samples = []
+            for _ in range(args.requests):
+                t1 = time.perf_counter()
+                (await client.get("/sleep/analytics", params={"days": days}, headers=headers)).raise_for_status()
+                samples.append(time.perf_counter() - t1)
+            report(f"days={days}", samples)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Benchmark: sleep sample ingestion throughput (rows/s) through POST /sleep/samples.
+
+Start the API (uvicorn --factory app.main:create_app), then from backend/:
+
+    python -m bench.sleep_ingest --rows 1000000 --format csv
+
+Generates --rows samples (30 s epochs, deterministic from --seed) and streams
+them to the API for a fresh user, so the upload never sits in memory on either
+side. Runs the upload twice: the first stores every row, the second is all
+duplicates and measures the dedupe path. Needs httpx.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+import httpx
+
+PASSWORD = "sleep-ingest-password"
+STAGES = ("awake", "light", "deep", "rem")
+CONTENT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+async def _body(rows: int, fmt: str, seed: int, batch: int = 5000) -> AsyncIterator[bytes]:
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, 22, 0, tzinfo=timezone.utc)
+    step = timedelta(seconds=30)
+    if fmt == "csv":
+        yield b"ts,stage,duration_s,heart_rate\n"
+    lines = []
+    for i in range(rows):
+        ts = (start + i * step).isoformat()
+        stage = rng.choice(STAGES)
+        hr = rng.randint(45, 80)
+        if fmt == "csv":
+            lines.append(f"{ts},{stage},30,{hr}")
+        else:
+            lines.append(json.dumps({"ts": ts, "stage": stage, "duration_s": 30, "heart_rate": hr}))
+        if len(lines) == batch:
+            yield ("\n".join(lines) + "\n").encode()
+            lines.clear()
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--format", choices=list(CONTENT_TYPES), default="csv")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=600) as client:
+        email = f"bench-sleep-{uuid.uuid4().hex[:12]}@example.com"
+        (await client.post("/auth/signup", json={"email": email, "password": PASSWORD})).raise_for_status()
+        r = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        r.raise_for_status()
+        headers = {
+            "Authorization": f"Bearer {r.json()['access_token']}",
+            "Content-Type": CONTENT_TYPES[args.format],
+        }
+
+        for label in ("fresh", "duplicate"):
+            t0 = time.perf_counter()
+            r = await client.post("/sleep/samples", content=_body(args.rows, args.format, args.seed), headers=headers)
+            elapsed = time.perf_counter() - t0
+            r.raise_for_status()
+            result = r.json()
+            print(
+                f"{label:<10} {args.format:<6} rows={result['received']:<9} inserted={result['inserted']:<9} "
+                f"rejected={result['rejected']:<4} {elapsed:7.2f}s  {result['received'] / elapsed:10.0f} rows/s"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+"""
+Microbenchmark: the get_current_user_claims path with and without the
+verified-token cache. Runs in-process (no server or DB needed), but the
+settings still load from backend/.env, so run it from backend/:
+
+    python -m bench.token_cache --iterations 50000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.core.jwt import clear_token_cache, create_access_token, token_cache_stats
+from app.deps.auth import get_current_user_claims
+
+
+async def _run(creds: HTTPAuthorizationCredentials, n: int, cold: bool) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        if cold:
+            clear_token_cache()
+        await get_current_user_claims(creds)
+    return time.perf_counter() - t0
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--iterations", type=int, default=50_000)
+    args = ap.parse_args()
+
+    token = create_access_token(user_id=1, email="bench@example.com")
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    uncached = await _run(creds, args.iterations, cold=True)
+    clear_token_cache()
+    cached = await _run(creds, args.iterations, cold=False)
+
+    per = lambda total: total / args.iterations * 1e6  # noqa: E731
+    print(f"uncached: {per(uncached):8.2f} us/call")
+    print(f"cached:   {per(cached):8.2f} us/call  ({uncached / cached:.1f}x)")
+    print("cache:", token_cache_stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
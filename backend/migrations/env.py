@@ -7,7 +7,7 @@ from alembic import context
 from sqlalchemy import pool
 from sqlalchemy.ext.asyncio import create_async_engine
 
-from app.core.settings import settings
+from app.core.settings import get_settings
 from app.models import Base  # our models' metadata
 
 # Alembic Config object
@@ -22,7 +22,7 @@ target_metadata = Base.metadata
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode'."""
     context.configure(
-        url=settings.db_dsn_async,
+        url=get_settings().db_dsn_async,
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
@@ -47,7 +47,7 @@ def do_run_migrations(connection) -> None:
 
 async def run_migrations_online() -> None:
     """Run migrations in 'online' mode with async engine."""
-    connectable = create_async_engine(settings.db_dsn_async, poolclass=pool.NullPool)
+    connectable = create_async_engine(get_settings().db_dsn_async, poolclass=pool.NullPool)
     async with connectable.connect() as connection:
         await connection.run_sync(do_run_migrations)
     await connectable.dispose()
@@ -0,0 +1,30 @@
+"""notes (user_id, id) index for keyset pagination
+
+Revision ID: a41c7d2e9b10
+Revises: 2e63fe0509e3
+Create Date: 2026-10-05 09:12:41.208377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7d2e9b10'
+down_revision: Union[str, None] = '2e63fe0509e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # composite index serves both "WHERE user_id = ?" and "... AND id > ? ORDER BY id",
+    # so the single-column user_id index becomes redundant
+    op.create_index('ix_notes_user_id_id', 'notes', ['user_id', 'id'], unique=False)
+    op.drop_index(op.f('ix_notes_user_id'), table_name='notes')
+
+
+def downgrade() -> None:
+    op.create_index(op.f('ix_notes_user_id'), 'notes', ['user_id'], unique=False)
+    op.drop_index('ix_notes_user_id_id', table_name='notes')
@@ -0,0 +1,43 @@
+"""notes full-text search vector + GIN index
+
+Revision ID: c5e8f1a3d2b7
+Revises: a41c7d2e9b10
+Create Date: 2026-10-07 14:03:19.552014
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e8f1a3d2b7'
+down_revision: Union[str, None] = 'a41c7d2e9b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# must stay in sync with app.models.note.SEARCH_VECTOR_EXPR
+SEARCH_VECTOR_EXPR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(body, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    # stored generated column: Postgres keeps it current on every INSERT/UPDATE
+    # (adding it rewrites the table once)
+    op.add_column('notes', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(SEARCH_VECTOR_EXPR, persisted=True),
+        nullable=True,
+    ))
+    op.create_index('ix_notes_search_vector', 'notes', ['search_vector'],
+                    unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notes_search_vector', table_name='notes', postgresql_using='gin')
+    op.drop_column('notes', 'search_vector')
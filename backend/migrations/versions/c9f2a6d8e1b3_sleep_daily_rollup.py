@@ -0,0 +1,53 @@
+"""sleep_daily rollup table
+
+Revision ID: c9f2a6d8e1b3
+Revises: b5e1f7c3d9a4
+Create Date: 2026-10-13 10:22:48.860371
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f2a6d8e1b3'
+down_revision: Union[str, None] = 'b5e1f7c3d9a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# from here on the ingestion statement keeps it current; this covers samples stored before
+BACKFILL = """
+INSERT INTO sleep_daily (user_id, day, awake_s, light_s, deep_s, rem_s, samples, first_ts, last_ts)
+SELECT user_id,
+       ((ts AT TIME ZONE 'UTC') + interval '12 hours')::date,
+       coalesce(sum(duration_s) FILTER (WHERE stage = 0), 0),
+       coalesce(sum(duration_s) FILTER (WHERE stage = 1), 0),
+       coalesce(sum(duration_s) FILTER (WHERE stage = 2), 0),
+       coalesce(sum(duration_s) FILTER (WHERE stage = 3), 0),
+       count(*), min(ts), max(ts)
+  FROM sleep_samples
+ GROUP BY 1, 2
+"""
+
+
+def upgrade() -> None:
+    op.create_table('sleep_daily',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('awake_s', sa.Integer(), nullable=False),
+    sa.Column('light_s', sa.Integer(), nullable=False),
+    sa.Column('deep_s', sa.Integer(), nullable=False),
+    sa.Column('rem_s', sa.Integer(), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.Column('first_ts', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_ts', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    op.drop_table('sleep_daily')
@@ -0,0 +1,82 @@
+"""notify note changes from statement-level triggers
+
+Revision ID: d4b8f2a6c1e7
+Revises: c9f2a6d8e1b3
+Create Date: 2026-10-14 09:41:17.306592
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b8f2a6c1e7'
+down_revision: Union[str, None] = 'c9f2a6d8e1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# One NOTIFY per user (per 500 ids) per statement, on the note_changes channel
+# that app.core.note_events listens to. Postgres sends it only if the writing
+# transaction commits, and every write path is covered without the handlers
+# doing anything. Payload: {"user_id", "op": "upsert" | "delete", "ids": [...]};
+# 500 ids stay well under the 8000-byte payload limit. Updates only announce
+# rows whose version moved, i.e. whose content actually changed.
+FUNCTIONS = """
+CREATE FUNCTION notes_notify_changes() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('note_changes', json_build_object(
+                'user_id', user_id,
+                'op', CASE TG_OP WHEN 'DELETE' THEN 'delete' ELSE 'upsert' END,
+                'ids', json_agg(id ORDER BY id))::text)
+       FROM (SELECT user_id, id, (row_number() OVER (PARTITION BY user_id ORDER BY id) - 1) / 500 AS chunk
+               FROM changed) c
+      GROUP BY user_id, chunk;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION notes_notify_updates() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('note_changes', json_build_object(
+                'user_id', user_id,
+                'op', 'upsert',
+                'ids', json_agg(id ORDER BY id))::text)
+       FROM (SELECT n.user_id, n.id, (row_number() OVER (PARTITION BY n.user_id ORDER BY n.id) - 1) / 500 AS chunk
+               FROM changed n JOIN previous o ON o.id = n.id
+              WHERE n.version <> o.version) c
+      GROUP BY user_id, chunk;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGERS = """
+CREATE TRIGGER notes_notify_on_insert
+    AFTER INSERT ON notes
+    REFERENCING NEW TABLE AS changed
+    FOR EACH STATEMENT EXECUTE FUNCTION notes_notify_changes();
+
+CREATE TRIGGER notes_notify_on_update
+    AFTER UPDATE ON notes
+    REFERENCING OLD TABLE AS previous NEW TABLE AS changed
+    FOR EACH STATEMENT EXECUTE FUNCTION notes_notify_updates();
+
+CREATE TRIGGER notes_notify_on_delete
+    AFTER DELETE ON notes
+    REFERENCING OLD TABLE AS changed
+    FOR EACH STATEMENT EXECUTE FUNCTION notes_notify_changes();
+"""
+
+
+def upgrade() -> None:
+    op.execute(FUNCTIONS)
+    op.execute(TRIGGERS)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER notes_notify_on_delete ON notes")
+    op.execute("DROP TRIGGER notes_notify_on_update ON notes")
+    op.execute("DROP TRIGGER notes_notify_on_insert ON notes")
+    op.execute("DROP FUNCTION notes_notify_updates()")
+    op.execute("DROP FUNCTION notes_notify_changes()")
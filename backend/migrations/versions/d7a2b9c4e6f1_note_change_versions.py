@@ -0,0 +1,98 @@
+"""note change versions, updated_at and delete tombstones
+
+Revision ID: d7a2b9c4e6f1
+Revises: c5e8f1a3d2b7
+Create Date: 2026-10-08 11:27:05.914230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a2b9c4e6f1'
+down_revision: Union[str, None] = 'c5e8f1a3d2b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Every insert, real update and delete of a note takes a per-user advisory
+# lock (held until commit) before drawing the next version. That makes a
+# user's versions commit-ordered: a reader that has seen version N can never
+# later find a committed change for that user with a version below N.
+FUNCTIONS = """
+CREATE FUNCTION notes_bump_version() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(1852796005, NEW.user_id);
+    NEW.version := nextval('note_version_seq');
+    NEW.updated_at := now();
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION notes_write_tombstone() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(1852796005, OLD.user_id);
+    INSERT INTO note_tombstones (id, user_id, version)
+    VALUES (OLD.id, OLD.user_id, nextval('note_version_seq'))
+    ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version, deleted_at = now();
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGERS = """
+CREATE TRIGGER notes_version_on_insert
+    BEFORE INSERT ON notes
+    FOR EACH ROW EXECUTE FUNCTION notes_bump_version();
+
+CREATE TRIGGER notes_version_on_update
+    BEFORE UPDATE ON notes
+    FOR EACH ROW
+    WHEN ((OLD.title, OLD.body, OLD.done) IS DISTINCT FROM (NEW.title, NEW.body, NEW.done))
+    EXECUTE FUNCTION notes_bump_version();
+
+CREATE TRIGGER notes_tombstone_on_delete
+    AFTER DELETE ON notes
+    FOR EACH ROW EXECUTE FUNCTION notes_write_tombstone();
+"""
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE note_version_seq AS bigint")
+
+    # existing rows get versions from the default during the table rewrite
+    op.add_column('notes', sa.Column('version', sa.BigInteger(),
+                                     server_default=sa.text("nextval('note_version_seq')"),
+                                     nullable=False))
+    op.add_column('notes', sa.Column('updated_at', sa.DateTime(timezone=True),
+                                     server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_notes_user_id_version', 'notes', ['user_id', 'version'], unique=False)
+
+    op.create_table('note_tombstones',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_note_tombstones_user_id_version', 'note_tombstones', ['user_id', 'version'], unique=False)
+
+    op.execute(FUNCTIONS)
+    op.execute(TRIGGERS)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER notes_tombstone_on_delete ON notes")
+    op.execute("DROP TRIGGER notes_version_on_update ON notes")
+    op.execute("DROP TRIGGER notes_version_on_insert ON notes")
+    op.execute("DROP FUNCTION notes_write_tombstone()")
+    op.execute("DROP FUNCTION notes_bump_version()")
+
+    op.drop_index('ix_note_tombstones_user_id_version', table_name='note_tombstones')
+    op.drop_table('note_tombstones')
+    op.drop_index('ix_notes_user_id_version', table_name='notes')
+    op.drop_column('notes', 'updated_at')
+    op.drop_column('notes', 'version')
+    op.execute("DROP SEQUENCE note_version_seq")
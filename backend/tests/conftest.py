@@ -0,0 +1,55 @@
+"""
+Tests run the app in-process (httpx ASGITransport) against a real, migrated
+Postgres configured like the app (DB_* variables / .env). The app itself runs
+without Redis here; only tests of cross-worker state (REDIS_URL) use it.
+"""
+import os
+import tempfile
+import uuid
+
+# read when the settings are first loaded (by create_app below)
+os.environ["CACHE_BACKEND"] = "off"           # every read reaches the DB: counts are exact
+os.environ["RATE_LIMIT_BACKEND"] = "off"
+os.environ["REVOCATION_BACKEND"] = "memory"
+os.environ["WARMUP_ON_STARTUP"] = "false"
+os.environ["DB_REPLICA_DSNS"] = "[]"
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["STORAGE_LOCAL_DIR"] = tempfile.mkdtemp(prefix="sleep-attachments-")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+import httpx  # noqa: E402
+import pytest_asyncio  # noqa: E402
+
+from app.core.security import shutdown_hash_pool  # noqa: E402
+from app.db.session import dispose_engines  # noqa: E402
+from app.main import create_app  # noqa: E402
+
+
+@pytest_asyncio.fixture(scope="session")
+async def client():
+    app = create_app()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    shutdown_hash_pool()
+    await dispose_engines()
+
+
+async def _fresh_user(client: httpx.AsyncClient) -> dict:
+    email = f"test-{uuid.uuid4().hex[:12]}@example.com"
+    (await client.post("/auth/signup", json={"email": email, "password": "test-password"})).raise_for_status()
+    r = await client.post("/auth/login", json={"email": email, "password": "test-password"})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+@pytest_asyncio.fixture
+async def auth(client: httpx.AsyncClient) -> dict:
+    """Authorization headers for a fresh user."""
+    return await _fresh_user(client)
+
+
+@pytest_asyncio.fixture
+async def other_auth(client: httpx.AsyncClient) -> dict:
+    """Authorization headers for a second fresh user, to check one can't reach the other's data."""
+    return await _fresh_user(client)
@@ -0,0 +1,155 @@
+"""
+Attachments on the local storage backend: streamed upload and download, the
+size limit, owner checks, the pre-signed PUT / complete flow, and the worker's
+sweep removing the blobs of deleted notes and users.
+"""
+import os
+from urllib.parse import urlsplit
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.core.settings import get_settings
+from app.core.storage import get_storage
+from app.db.session import new_session
+from app.jobs.tasks import sweep_attachments
+from app.jobs.worker import run_batch
+from app.models import Attachment, User
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+BLOB = os.urandom(600 * 1024)  # a few storage read chunks
+
+
+async def _note(client, auth) -> int:
+    r = await client.post("/notes", json={"title": "with files", "body": "b"}, headers=auth)
+    r.raise_for_status()
+    return r.json()["id"]
+
+
+async def _upload(client, auth, note_id: int, content=BLOB):
+    return await client.post(
+        f"/notes/{note_id}/attachments", params={"filename": "scan ü.bin"}, content=content,
+        headers={**auth, "Content-Type": "application/octet-stream"},
+    )
+
+
+async def _storage_key(attachment_id: int) -> str:
+    async with new_session() as session:
+        return (await session.execute(
+            select(Attachment.storage_key).where(Attachment.id == attachment_id)
+        )).scalar_one()
+
+
+async def test_upload_download_round_trip(client, auth):
+    note_id = await _note(client, auth)
+    r = await _upload(client, auth, note_id)
+    assert r.status_code == 201
+    attachment = r.json()
+    assert attachment["size"] == len(BLOB) and attachment["note_id"] == note_id
+
+    r = await client.get(f"/attachments/{attachment['id']}", headers=auth)
+    assert r.status_code == 200
+    assert r.content == BLOB
+    assert r.headers["content-disposition"] == "attachment; filename*=UTF-8''scan%20%C3%BC.bin"
+
+    r = await client.get(f"/notes/{note_id}/attachments", headers=auth)
+    assert [a["id"] for a in r.json()["items"]] == [attachment["id"]]
+
+
+async def test_upload_over_the_limit_is_rejected(client, auth, monkeypatch):
+    monkeypatch.setattr(get_settings(), "attachment_max_bytes", 1000)
+    note_id = await _note(client, auth)
+
+    r = await _upload(client, auth, note_id, b"x" * 1001)  # declared by Content-Length
+    assert r.status_code == 413
+
+    async def chunked():  # no Content-Length: caught while streaming
+        for _ in range(4):
+            yield b"x" * 400
+
+    r = await _upload(client, auth, note_id, chunked())
+    assert r.status_code == 413
+    r = await client.get(f"/notes/{note_id}/attachments", headers=auth)
+    assert r.json()["items"] == []
+
+
+async def test_other_users_attachments_are_not_found(client, auth, other_auth):
+    note_id = await _note(client, auth)
+    attachment_id = (await _upload(client, auth, note_id, b"mine")).json()["id"]
+
+    assert (await client.get(f"/attachments/{attachment_id}", headers=other_auth)).status_code == 404
+    assert (await client.get(f"/attachments/{attachment_id}/url", headers=other_auth)).status_code == 404
+    assert (await client.delete(f"/attachments/{attachment_id}", headers=other_auth)).status_code == 404
+    assert (await _upload(client, other_auth, note_id, b"theirs")).status_code == 404
+    r = await client.post(
+        f"/notes/{note_id}/attachments/presign",
+        json={"filename": "x", "content_type": "text/plain"}, headers=other_auth,
+    )
+    assert r.status_code == 404
+    # and the owner still has it
+    assert (await client.get(f"/attachments/{attachment_id}", headers=auth)).content == b"mine"
+
+
+async def test_presigned_upload_and_complete(client, auth):
+    note_id = await _note(client, auth)
+    r = await client.post(
+        f"/notes/{note_id}/attachments/presign",
+        json={"filename": "direct.txt", "content_type": "text/plain"}, headers=auth,
+    )
+    assert r.status_code == 201
+    presigned = r.json()
+    upload_path = urlsplit(presigned["upload_url"]).path
+
+    assert (await client.get(f"/notes/{note_id}/attachments", headers=auth)).json()["items"] == []  # pending
+    r = await client.post(f"/attachments/{presigned['id']}/complete", headers=auth)
+    assert r.status_code == 409  # nothing uploaded yet
+
+    r = await client.put(upload_path, content=b"direct upload", headers=presigned["headers"])
+    assert r.status_code == 204
+    r = await client.post(f"/attachments/{presigned['id']}/complete", headers=auth)
+    assert r.status_code == 200
+    assert r.json()["size"] == len(b"direct upload")
+
+    # the link can't replace the finished blob
+    r = await client.put(upload_path, content=b"overwritten", headers=presigned["headers"])
+    assert r.status_code == 409
+    assert (await client.get(f"/attachments/{presigned['id']}", headers=auth)).content == b"direct upload"
+
+
+async def _sweep_and_run_jobs() -> None:
+    async with new_session() as session:
+        while await sweep_attachments(session):
+            await session.commit()
+        await session.commit()
+    while await run_batch():  # DELETE_BLOBS
+        pass
+
+
+async def _assert_swept(attachment_id: int, key: str) -> None:
+    await _sweep_and_run_jobs()
+    async with new_session() as session:
+        assert (await session.execute(select(Attachment.id).where(Attachment.id == attachment_id))).first() is None
+    assert await get_storage().size(key) is None
+
+
+async def test_deleting_the_note_sweeps_its_blobs(client, auth):
+    note_id = await _note(client, auth)
+    attachment_id = (await _upload(client, auth, note_id)).json()["id"]
+    key = await _storage_key(attachment_id)
+
+    assert (await client.delete(f"/notes/{note_id}", headers=auth)).status_code == 204
+    assert (await client.get(f"/attachments/{attachment_id}", headers=auth)).status_code == 404  # detached
+    assert await get_storage().size(key) == len(BLOB)  # until the sweep
+    await _assert_swept(attachment_id, key)
+
+
+async def test_deleting_the_user_sweeps_their_blobs(client, auth):
+    user_id = (await client.get("/me", headers=auth)).json()["user_id"]
+    attachment_id = (await _upload(client, auth, await _note(client, auth))).json()["id"]
+    key = await _storage_key(attachment_id)
+
+    async with new_session() as session:
+        await session.execute(delete(User).where(User.id == user_id))
+        await session.commit()
+    await _assert_swept(attachment_id, key)
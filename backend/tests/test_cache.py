@@ -0,0 +1,104 @@
+"""
+ReadThroughCache on a MemoryCache: concurrent misses share one load, a load
+that read before an invalidation can't store its stale value, and a caller
+going away doesn't cancel the load for the others.
+"""
+import asyncio
+
+import pytest
+
+from app.core.cache import MemoryCache, ReadThroughCache
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+KEY = "note:1:1"
+
+
+def _cache() -> ReadThroughCache:
+    return ReadThroughCache(MemoryCache(), ttl=60, tombstone_ttl=1)
+
+
+class Loader:
+    """Counts calls and returns `value` once released."""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return dict(self.value)
+
+
+async def test_concurrent_misses_share_one_load():
+    cache, load = _cache(), Loader({"v": 1})
+    readers = [asyncio.create_task(cache.get_or_load(KEY, load)) for _ in range(10)]
+    await asyncio.sleep(0)
+    load.release.set()
+    assert await asyncio.gather(*readers) == [{"v": 1}] * 10
+    assert load.calls == 1
+
+    assert await cache.get_or_load(KEY, load) == {"v": 1}  # now a hit
+    assert load.calls == 1
+
+
+async def test_invalidation_during_a_load_keeps_the_stale_value_out():
+    cache = _cache()
+    stale = Loader({"v": "old"})
+    reader = asyncio.create_task(cache.get_or_load(KEY, stale))
+    for _ in range(3):
+        await asyncio.sleep(0)
+    assert stale.calls == 1  # the load has read the old row...
+
+    await cache.invalidate(KEY)  # ...then a write commits and invalidates
+    stale.release.set()
+    assert await reader == {"v": "old"}  # that caller gets what it read
+
+    fresh = Loader({"v": "new"})
+    fresh.release.set()
+    assert await cache.get_or_load(KEY, fresh) == {"v": "new"}  # not the stale fill
+    assert fresh.calls == 1
+
+
+async def test_tombstone_expires_and_caching_resumes():
+    cache = _cache()
+    await cache.invalidate(KEY)
+    first = Loader({"v": 1})
+    first.release.set()
+    assert await cache.get_or_load(KEY, first) == {"v": 1}  # loads can't fill during the tombstone...
+    assert await cache.get_or_load(KEY, first) == {"v": 1}
+    assert first.calls == 2
+
+    await asyncio.sleep(1.1)
+    assert await cache.get_or_load(KEY, first) == {"v": 1}  # ...and do once it has expired
+    assert await cache.get_or_load(KEY, first) == {"v": 1}
+    assert first.calls == 3
+
+
+async def test_missing_values_are_not_cached():
+    cache = _cache()
+    calls = 0
+
+    async def missing():
+        nonlocal calls
+        calls += 1
+        return None
+
+    assert await cache.get_or_load(KEY, missing) is None
+    assert await cache.get_or_load(KEY, missing) is None
+    assert calls == 2
+
+
+async def test_cancelled_caller_does_not_cancel_the_shared_load():
+    cache, load = _cache(), Loader({"v": 1})
+    gone = asyncio.create_task(cache.get_or_load(KEY, load))
+    waiting = asyncio.create_task(cache.get_or_load(KEY, load))
+    await asyncio.sleep(0)
+    gone.cancel()  # client disconnected
+    await asyncio.sleep(0)
+    load.release.set()
+    assert await waiting == {"v": 1}
+    assert gone.cancelled()
+    assert load.calls == 1
@@ -0,0 +1,175 @@
+"""
+The Postgres job queue, run for real: claiming under concurrency, retries with
+backoff, giving up, recovering jobs of a dead worker, and the signup ->
+verification email -> /auth/verify flow through the worker.
+"""
+import re
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, func, select, update
+
+from app.core.mailer import EmailSender
+from app.core.settings import get_settings
+from app.db.session import new_session
+from app.jobs import tasks
+from app.jobs.queue import claim_due, enqueue, fail, requeue_stale
+from app.jobs.worker import run_batch
+from app.models import Job, User
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+NOOP = "test_noop"
+
+
+@pytest_asyncio.fixture
+async def queue():
+    """An empty queue: jobs other tests queued (e.g. by signing up) would be claimed too."""
+    async with new_session() as session:
+        await session.execute(delete(Job))
+        await session.commit()
+    yield
+    async with new_session() as session:
+        await session.execute(delete(Job))
+        await session.commit()
+
+
+async def _enqueue(*payloads: Dict[str, Any], kind: str = NOOP) -> None:
+    async with new_session() as session:
+        for payload in payloads:
+            await enqueue(session, kind, payload)
+        await session.commit()
+
+
+async def _job(job_id: int) -> Tuple[str, int, str, float]:
+    """status, attempts, last_error and seconds until run_at."""
+    async with new_session() as session:
+        row = (await session.execute(
+            select(Job.status, Job.attempts, Job.last_error, Job.run_at - func.now()).where(Job.id == job_id)
+        )).one()
+    return row[0], row[1], row[2], row[3].total_seconds()
+
+
+async def test_concurrent_claims_never_share_a_job(queue):
+    await _enqueue({"n": 1}, {"n": 2})
+    async with new_session() as first, new_session() as second:
+        mine = await claim_due(first, 1)        # row locked until `first` commits
+        theirs = await claim_due(second, 10)    # skips it instead of waiting
+        await first.commit()
+        await second.commit()
+    assert len(mine) == 1 and len(theirs) == 1
+    assert mine[0].id != theirs[0].id
+    assert mine[0].attempts == theirs[0].attempts == 1
+
+    async with new_session() as session:
+        assert await claim_due(session, 10) == []  # both are running now
+
+
+async def test_failure_is_retried_with_backoff(queue):
+    await _enqueue({"n": 1})
+    async with new_session() as session:
+        [job] = await claim_due(session, 10)
+        await fail(session, job, "boom")
+        await session.commit()
+
+    status, attempts, error, wait = await _job(job.id)
+    assert (status, attempts, error) == ("pending", 1, "boom")
+    # first retry: base * 2**0, jittered to 50-100%
+    base = get_settings().job_backoff_base_seconds
+    assert base / 2 - 1 <= wait <= base
+    async with new_session() as session:
+        assert await claim_due(session, 10) == []  # not due yet
+
+
+async def test_last_attempt_fails_for_good(queue):
+    await _enqueue({"n": 1})
+    async with new_session() as session:
+        await session.execute(update(Job).values(attempts=get_settings().job_max_attempts - 1))
+        [job] = await claim_due(session, 10)
+        await fail(session, job, "boom")
+        await session.commit()
+    assert job.attempts == get_settings().job_max_attempts
+    assert (await _job(job.id))[:2] == ("failed", get_settings().job_max_attempts)
+
+
+async def test_not_retried_when_asked(queue):
+    await _enqueue({"n": 1})
+    async with new_session() as session:
+        [job] = await claim_due(session, 10)
+        await fail(session, job, "bad payload", retry=False)
+        await session.commit()
+    assert (await _job(job.id))[0] == "failed"
+
+
+async def test_stale_jobs_are_requeued_or_failed(queue):
+    await _enqueue({"n": 1}, {"n": 2})
+    async with new_session() as session:
+        lost, spent = await claim_due(session, 10)
+        # a worker died holding both; one of them was on its last attempt
+        await session.execute(update(Job).where(Job.id == spent.id).values(attempts=get_settings().job_max_attempts))
+        await session.execute(update(Job).values(
+            locked_at=func.now() - timedelta(seconds=get_settings().job_lock_timeout_seconds + 1)
+        ))
+        assert await requeue_stale(session) == 2
+        await session.commit()
+    assert (await _job(lost.id))[0] == "pending"
+    assert (await _job(spent.id))[0] == "failed"
+
+
+async def test_fresh_running_jobs_are_left_alone(queue):
+    await _enqueue({"n": 1})
+    async with new_session() as session:
+        [job] = await claim_due(session, 10)
+        assert await requeue_stale(session) == 0
+        await session.commit()
+    assert (await _job(job.id))[0] == "running"
+
+
+async def test_worker_records_handler_failure(queue, monkeypatch):
+    async def explode(payload: Dict[str, Any]) -> None:
+        raise RuntimeError("smtp down")
+
+    monkeypatch.setitem(tasks.HANDLERS, NOOP, explode)
+    await _enqueue({"n": 1})
+    assert await run_batch() == 1
+
+    async with new_session() as session:
+        job_id = (await session.execute(select(Job.id))).scalar_one()
+    status, attempts, error, _ = await _job(job_id)
+    assert (status, attempts) == ("pending", 1)
+    assert "smtp down" in error
+
+
+class _Outbox(EmailSender):
+    def __init__(self):
+        self.sent: List[Tuple[str, str, str]] = []
+
+    async def send(self, to: str, subject: str, body: str) -> None:
+        self.sent.append((to, subject, body))
+
+
+async def test_signup_sends_verification_through_the_queue(queue, client, monkeypatch):
+    outbox = _Outbox()
+    monkeypatch.setattr(tasks, "_mailer", outbox)
+
+    email = f"verify-{uuid.uuid4().hex[:12]}@example.com"
+    r = await client.post("/auth/signup", json={"email": email, "password": "test-password"})
+    assert r.status_code == 201
+    user_id = r.json()["id"]
+    assert r.json()["verified"] is False
+    assert outbox.sent == []  # queued, not sent on the request path
+
+    assert await run_batch() == 1
+    [(to, _, body)] = outbox.sent
+    assert to == email
+    async with new_session() as session:
+        assert (await session.execute(select(func.count()).select_from(Job))).scalar_one() == 0  # done: deleted
+
+    token = re.search(r"token=(\S+)", body).group(1)
+    r = await client.get("/auth/verify", params={"token": token})
+    assert r.status_code == 200
+    async with new_session() as session:
+        assert (await session.execute(select(User.verified).where(User.id == user_id))).scalar_one() is True
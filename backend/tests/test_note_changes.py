@@ -0,0 +1,57 @@
+"""
+Tombstone retention and /notes/changes: once the deletes after a client's
+`since` have been pruned it is told to start over, while clients that are
+still inside the retained window (or starting from 0) sync as before.
+"""
+import pytest
+
+from app.core.settings import get_settings
+from app.db.session import new_session
+from app.jobs.tasks import prune_note_tombstones
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+async def _changes(client, auth, since: int) -> dict:
+    r = await client.get("/notes/changes", params={"since": since}, headers=auth)
+    assert r.status_code == 200
+    return r.json()
+
+
+async def _prune_everything(monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "note_tombstone_retention_days", 0)
+    async with new_session() as session:
+        while await prune_note_tombstones(session):
+            await session.commit()
+        await session.commit()
+
+
+async def test_since_before_pruned_deletes_resets(client, auth, monkeypatch):
+    kept = (await client.post("/notes", json={"title": "kept", "body": "b"}, headers=auth)).json()
+    gone = (await client.post("/notes", json={"title": "gone", "body": "b"}, headers=auth)).json()
+    since = (await _changes(client, auth, 0))["version"]  # a client synced both
+
+    assert (await client.delete(f"/notes/{gone['id']}", headers=auth)).status_code == 204
+    assert [d["id"] for d in (await _changes(client, auth, since))["deleted"]] == [gone["id"]]
+
+    await _prune_everything(monkeypatch)
+    page = await _changes(client, auth, since)
+    assert page == {"changed": [], "deleted": [], "version": 0, "has_more": True, "reset": True}
+
+    page = await _changes(client, auth, 0)  # starting over gets the current notes
+    assert [n["id"] for n in page["changed"]] == [kept["id"]]
+    assert page["reset"] is False and page["deleted"] == []
+    # ...and a watermark past the pruned deletes, so the next sync doesn't reset again
+    page = await _changes(client, auth, page["version"])
+    assert page["reset"] is False and page["changed"] == []
+
+
+async def test_since_after_the_horizon_is_not_reset(client, auth, monkeypatch):
+    await _prune_everything(monkeypatch)
+    await client.post("/notes", json={"title": "synced", "body": "b"}, headers=auth)
+    since = (await _changes(client, auth, 0))["version"]
+    note = (await client.post("/notes", json={"title": "new", "body": "b"}, headers=auth)).json()
+
+    page = await _changes(client, auth, since)
+    assert page["reset"] is False
+    assert [n["id"] for n in page["changed"]] == [note["id"]]
@@ -0,0 +1,67 @@
+"""
+Note event fan-out in one worker: notifications reach every stream of the
+notified user and nobody else, a stream that falls behind is dropped rather
+than buffered for, and slots are only held by streams that actually started.
+"""
+import json
+
+import pytest
+
+from app.core.note_events import CHANNEL, NoteEvents, get_note_events
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+def _notify(events: NoteEvents, user_id: int, ids) -> None:
+    events._on_notify(None, 0, CHANNEL, json.dumps({"user_id": user_id, "op": "upsert", "ids": ids}))
+
+
+async def test_fan_out_by_user():
+    events = NoteEvents(queue_size=8, max_subscribers=10)
+    phone, laptop, stranger = events.subscribe(1), events.subscribe(1), events.subscribe(2)
+
+    _notify(events, 1, [7, 8])
+    frame = b'event: note\ndata: {"op": "upsert", "ids": [7, 8]}\n\n'
+    assert phone.queue.get_nowait() == frame
+    assert laptop.queue.get_nowait() == frame
+    assert stranger.queue.empty()
+    assert events.stats()["delivered"] == 2
+
+
+async def test_slow_subscriber_is_dropped():
+    events = NoteEvents(queue_size=2, max_subscribers=10)
+    slow, fast = events.subscribe(1), events.subscribe(1)
+
+    for i in range(2):
+        _notify(events, 1, [i])
+        fast.queue.get_nowait()  # keeps up
+    _notify(events, 1, [2])  # slow's queue is full
+
+    assert slow.queue.get_nowait() is None  # its stream ends; the client reconnects and resyncs
+    assert fast.queue.get_nowait() is not None
+    assert events.stats()["dropped"] == 1
+    assert events.stats()["subscribers"] == 1
+
+
+async def test_stream_holds_a_slot_only_while_running():
+    events = NoteEvents(queue_size=8, max_subscribers=1)
+    body = events.stream(1)
+    assert events.stats()["subscribers"] == 0  # response created, body not started (client may be gone)
+
+    assert b'"op": "resync"' in await body.__anext__()
+    assert events.stats()["subscribers"] == 1
+    assert not events.has_room()
+    assert events.subscribe(2) is None
+
+    _notify(events, 1, [5])
+    assert b"[5]" in await body.__anext__()
+    await body.aclose()  # client went away
+    assert events.stats()["subscribers"] == 0
+    assert events.has_room()
+
+
+async def test_full_worker_refuses_streams(client, auth, monkeypatch):
+    monkeypatch.setattr(get_note_events(), "max_subscribers", 0)
+    r = await client.get("/notes/events", headers=auth)
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "30"
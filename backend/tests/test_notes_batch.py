@@ -0,0 +1,30 @@
+"""
+Batch writes report what a syncing client needs: created and updated notes
+carry their change version, and ambiguous input (a repeated id) is refused.
+"""
+import pytest
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+async def test_batch_writes_return_versions(client, auth):
+    items = [{"title": f"v{i}", "body": "b"} for i in range(3)]
+    r = await client.post("/notes/batch", json={"items": items}, headers=auth)
+    assert r.status_code == 201
+    created = [res["note"] for res in r.json()["results"]]
+    versions = [n["version"] for n in created]
+    assert versions == sorted(versions)
+
+    changes = (await client.get("/notes/changes", params={"since": 0}, headers=auth)).json()
+    assert {c["id"]: c["version"] for c in changes["changed"]} == {n["id"]: n["version"] for n in created}
+    assert changes["version"] == versions[-1]
+
+    r = await client.patch("/notes/batch", json={"items": [{"id": created[0]["id"], "done": True}]}, headers=auth)
+    assert r.json()["results"][0]["note"]["version"] > versions[-1]
+
+
+async def test_batch_delete_refuses_repeated_ids(client, auth):
+    note = (await client.post("/notes", json={"title": "t", "body": "b"}, headers=auth)).json()
+    r = await client.post("/notes/batch/delete", json={"ids": [note["id"], note["id"]]}, headers=auth)
+    assert r.status_code == 422
+    assert (await client.get(f"/notes/{note['id']}", headers=auth)).status_code == 200  # nothing deleted
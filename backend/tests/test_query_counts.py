@@ -0,0 +1,136 @@
+"""
+Round trips per endpoint, pinned. Each handler is written to need exactly this
+many SQL statements; a change that adds one (a lazy load, a SELECT before an
+UPDATE, a per-row query) fails here. Counted with app.db.session.count_queries,
+which sees every statement sent through any engine during the request.
+"""
+from typing import Awaitable, Tuple
+
+import httpx
+import pytest
+
+from app.db.session import count_queries
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+async def round_trips(send: Awaitable[httpx.Response]) -> Tuple[httpx.Response, int]:
+    with count_queries() as q:
+        resp = await send
+    return resp, q.count
+
+
+async def _create(client: httpx.AsyncClient, auth: dict, title: str = "note") -> dict:
+    r = await client.post("/notes", json={"title": title, "body": "body"}, headers=auth)
+    r.raise_for_status()
+    return r.json()
+
+
+async def test_create_note(client, auth):
+    resp, n = await round_trips(client.post("/notes", json={"title": "t", "body": "b"}, headers=auth))
+    assert resp.status_code == 201
+    assert n == 1  # INSERT ... RETURNING
+
+
+async def test_list_notes_page(client, auth):
+    for i in range(3):
+        await _create(client, auth, f"n{i}")
+    resp, n = await round_trips(client.get("/notes", params={"limit": 2}, headers=auth))
+    assert resp.status_code == 200
+    assert len(resp.json()["items"]) == 2
+    assert n == 1  # page + next-page probe in one json_agg query
+
+
+async def test_list_notes_ndjson(client, auth):
+    for i in range(3):
+        await _create(client, auth, f"n{i}")
+    resp, n = await round_trips(client.get("/notes", params={"format": "ndjson"}, headers=auth))
+    assert resp.status_code == 200
+    assert len(resp.text.splitlines()) == 3
+    assert n == 1  # one server-side cursor
+
+
+async def test_get_note(client, auth):
+    note = await _create(client, auth)
+    resp, n = await round_trips(client.get(f"/notes/{note['id']}", headers=auth))
+    assert resp.status_code == 200
+    assert n == 1
+
+
+async def test_get_missing_note(client, auth):
+    resp, n = await round_trips(client.get("/notes/0", headers=auth))
+    assert resp.status_code == 404
+    assert n == 1
+
+
+async def test_update_note(client, auth):
+    note = await _create(client, auth)
+    resp, n = await round_trips(client.put(f"/notes/{note['id']}", json={"done": True}, headers=auth))
+    assert resp.status_code == 200
+    assert resp.json()["done"] is True
+    assert n == 1  # UPDATE ... RETURNING, scoped to the owner
+
+
+async def test_update_note_without_changes(client, auth):
+    note = await _create(client, auth)
+    resp, n = await round_trips(client.put(f"/notes/{note['id']}", json={}, headers=auth))
+    assert resp.status_code == 200
+    assert n == 1
+
+
+async def test_delete_note(client, auth):
+    note = await _create(client, auth)
+    resp, n = await round_trips(client.delete(f"/notes/{note['id']}", headers=auth))
+    assert resp.status_code == 204
+    assert n == 1  # DELETE ... RETURNING; tombstone, event and attachments are done by the database
+
+
+async def test_delete_missing_note(client, auth):
+    resp, n = await round_trips(client.delete("/notes/0", headers=auth))
+    assert resp.status_code == 404
+    assert n == 1
+
+
+async def test_batch_create(client, auth):
+    items = [{"title": f"b{i}", "body": "b"} for i in range(50)]
+    resp, n = await round_trips(client.post("/notes/batch", json={"items": items}, headers=auth))
+    assert resp.status_code == 201
+    assert [r["status"] for r in resp.json()["results"]] == [201] * 50
+    assert n == 1  # one multi-row INSERT ... RETURNING
+
+
+async def test_batch_update(client, auth):
+    notes = [await _create(client, auth, f"u{i}") for i in range(5)]
+    items = [{"id": note["id"], "done": True} for note in notes] + [{"id": 0, "done": True}]
+    resp, n = await round_trips(client.patch("/notes/batch", json={"items": items}, headers=auth))
+    assert resp.status_code == 200
+    assert [r["status"] for r in resp.json()["results"]] == [200] * 5 + [404]
+    assert n == 1  # UPDATE ... FROM (VALUES ...) RETURNING
+
+
+async def test_batch_delete(client, auth):
+    notes = [await _create(client, auth, f"d{i}") for i in range(5)]
+    ids = [note["id"] for note in notes] + [0]
+    resp, n = await round_trips(client.post("/notes/batch/delete", json={"ids": ids}, headers=auth))
+    assert resp.status_code == 200
+    assert [r["status"] for r in resp.json()["results"]] == [204] * 5 + [404]
+    assert n == 1  # DELETE ... WHERE id = ANY(...) RETURNING
+
+
+async def test_note_changes(client, auth):
+    note = await _create(client, auth)
+    await client.delete(f"/notes/{note['id']}", headers=auth)
+    await _create(client, auth)
+    resp, n = await round_trips(client.get("/notes/changes", params={"since": 0}, headers=auth))
+    assert resp.status_code == 200
+    assert len(resp.json()["changed"]) == 1 and len(resp.json()["deleted"]) == 1
+    assert n == 2  # changed rows + tombstones (joined to the sync horizon)
+
+
+async def test_prefs(client, auth):
+    resp, n = await round_trips(client.put("/me/prefs", json={"sleep_minutes": 30}, headers=auth))
+    assert resp.status_code == 200
+    assert n == 1  # upsert ... RETURNING
+    resp, n = await round_trips(client.get("/me/prefs", headers=auth))
+    assert resp.json() == {"sleep_minutes": 30}
+    assert n == 1
@@ -0,0 +1,78 @@
+"""
+Auth throttling with the in-memory buckets: 429 with Retry-After once a bucket
+is empty, login's account bucket scoped to the client IP so an attacker can't
+lock the owner out, and X-Forwarded-For only believed from trusted proxies.
+"""
+import uuid
+
+import pytest
+import pytest_asyncio
+from starlette.requests import Request
+
+from app.core.ratelimit import MemoryBuckets, client_ip, get_rate_limiter
+from app.core.settings import get_settings
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+PASSWORD = "test-password"
+PROXY = "127.0.0.1"  # the test client's address
+
+
+@pytest_asyncio.fixture
+async def limited(client, monkeypatch):
+    """A signed-up email, then throttling switched on with fresh buckets behind a trusted proxy."""
+    email = f"test-{uuid.uuid4().hex[:12]}@example.com"
+    (await client.post("/auth/signup", json={"email": email, "password": PASSWORD})).raise_for_status()
+    rate_limiter = get_rate_limiter()
+    monkeypatch.setattr(rate_limiter, "enabled", True)
+    monkeypatch.setattr(rate_limiter, "_memory", MemoryBuckets())
+    settings = get_settings()
+    monkeypatch.setattr(settings, "trusted_proxies", [PROXY])
+    monkeypatch.setattr(settings, "rate_limit_account_burst", 2)
+    monkeypatch.setattr(settings, "rate_limit_account_per_minute", 1)
+    return email
+
+
+async def _login(client, email: str, password: str, ip: str):
+    return await client.post(
+        "/auth/login", json={"email": email, "password": password}, headers={"X-Forwarded-For": ip},
+    )
+
+
+async def test_exhausted_bucket_answers_429_with_retry_after(client, limited):
+    for _ in range(2):
+        assert (await _login(client, limited, "wrong", "203.0.113.9")).status_code == 401
+    r = await _login(client, limited, PASSWORD, "203.0.113.9")
+    assert r.status_code == 429
+    assert int(r.headers["retry-after"]) >= 1
+
+
+async def test_failed_logins_elsewhere_dont_lock_the_owner_out(client, limited):
+    for _ in range(5):
+        await _login(client, limited, "wrong", "203.0.113.9")
+    assert (await _login(client, limited, PASSWORD, "198.51.100.7")).status_code == 200
+
+
+async def test_ip_bucket(client, limited, monkeypatch):
+    monkeypatch.setattr(get_settings(), "rate_limit_ip_burst", 2)
+    monkeypatch.setattr(get_settings(), "rate_limit_ip_per_minute", 1)
+    for i in range(2):
+        assert (await _login(client, f"nobody{i}@example.com", "x", "203.0.113.9")).status_code == 401
+    assert (await _login(client, "nobody2@example.com", "x", "203.0.113.9")).status_code == 429
+    assert (await _login(client, "nobody2@example.com", "x", "198.51.100.7")).status_code == 401
+
+
+def _request(peer: str, forwarded: str = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (peer, 40000), "headers": headers})
+
+
+async def test_client_ip(monkeypatch):
+    monkeypatch.setattr(get_settings(), "trusted_proxies", ["10.0.0.0/8"])
+    # through our proxies: the right-most address they didn't add
+    assert client_ip(_request("10.0.0.2", "1.2.3.4, 198.51.100.7, 10.0.0.3")) == "198.51.100.7"
+    assert client_ip(_request("10.0.0.2")) == "10.0.0.2"
+    # straight from the internet: the header is the client's own claim
+    assert client_ip(_request("198.51.100.7", "1.2.3.4")) == "198.51.100.7"
+    monkeypatch.setattr(get_settings(), "trusted_proxies", [])
+    assert client_ip(_request("10.0.0.2", "1.2.3.4")) == "10.0.0.2"
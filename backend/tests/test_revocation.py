@@ -0,0 +1,71 @@
+"""
+Refresh-token revocation: rotation is single use and a replay revokes the whole
+family, logout revokes one session, and logout-all revokes by issue time
+(tokens from before it are rejected, a login right after it keeps working).
+"""
+import uuid
+
+import pytest
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+PASSWORD = "test-password"
+
+
+async def _login(client, email: str) -> dict:
+    r = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+    r.raise_for_status()
+    return r.json()
+
+
+async def _signup(client) -> str:
+    email = f"test-{uuid.uuid4().hex[:12]}@example.com"
+    (await client.post("/auth/signup", json={"email": email, "password": PASSWORD})).raise_for_status()
+    return email
+
+
+async def _refresh(client, token: str):
+    return await client.post("/auth/refresh", json={"refresh_token": token})
+
+
+async def test_replayed_refresh_token_revokes_the_family(client):
+    email = await _signup(client)
+    first = (await _login(client, email))["refresh_token"]
+    elsewhere = (await _login(client, email))["refresh_token"]  # another device: another family
+
+    r = await _refresh(client, first)
+    assert r.status_code == 200
+    second = r.json()["refresh_token"]
+
+    r = await _refresh(client, first)  # replay, e.g. by whoever stole it
+    assert r.status_code == 401
+    assert r.json()["detail"] == "Token reuse detected"
+    assert (await _refresh(client, second)).status_code == 401  # the rightful chain is cut too
+    assert (await _refresh(client, elsewhere)).status_code == 200
+
+
+async def test_logout_revokes_the_session(client):
+    email = await _signup(client)
+    session = await _login(client, email)
+    other = await _login(client, email)
+
+    r = await client.post("/auth/logout", json={"refresh_token": session["refresh_token"]})
+    assert r.status_code == 204
+    r = await _refresh(client, session["refresh_token"])
+    assert r.status_code == 401
+    assert r.json()["detail"] == "Token revoked"
+    assert (await _refresh(client, other["refresh_token"])).status_code == 200
+
+
+async def test_login_right_after_logout_all_survives(client):
+    email = await _signup(client)
+    before = await _login(client, email)
+
+    r = await client.post("/auth/logout-all", headers={"Authorization": f"Bearer {before['access_token']}"})
+    assert r.status_code == 204
+    after = await _login(client, email)
+
+    r = await client.post("/auth/refresh", json={"refresh_token": before["refresh_token"]})
+    assert r.status_code == 401
+    r = await client.post("/auth/refresh", json={"refresh_token": after["refresh_token"]})
+    assert r.status_code == 200
@@ -0,0 +1,19 @@
+"""
+Search snippets are HTML: the note text in them must come back escaped, with
+<b>…</b> around matches the only markup.
+"""
+import pytest
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+async def test_snippet_escapes_note_markup(client, auth):
+    body = 'slept badly <img src=x onerror="alert(1)"> & woke at 3'
+    (await client.post("/notes", json={"title": "night", "body": body}, headers=auth)).raise_for_status()
+
+    r = await client.get("/notes/search", params={"q": "slept"}, headers=auth)
+    assert r.status_code == 200
+    snippet = r.json()["items"][0]["snippet"]
+    assert "<b>slept</b>" in snippet
+    assert "<img" not in snippet
+    assert "&lt;img" in snippet and "&amp;" in snippet
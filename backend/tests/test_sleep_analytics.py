@@ -0,0 +1,75 @@
+"""
+analyze() against a small fixture worked out by hand: four nights over ten
+days spanning two ISO weeks, and a range with no nights at all.
+"""
+import datetime as dt
+
+from app.core.sleep_analytics import analyze
+
+START = dt.date(2026, 1, 5)  # a Monday
+
+
+def _epoch(*args) -> float:
+    return dt.datetime(*args, tzinfo=dt.timezone.utc).timestamp()
+
+
+def _minutes(*values) -> list:
+    return [v * 60 for v in values]
+
+
+# nights ending Jan 5, 6, 8 and 12: 420, 480, 360 and 450 minutes asleep,
+# in bed at 22:00, 23:00, 22:00 and 21:00 (600, 660, 600, 540 minutes after noon)
+COLUMNS = {
+    "day_idx": [0, 1, 3, 7],
+    "asleep_s": _minutes(420, 480, 360, 450),
+    "awake_s": _minutes(20, 15, 30, 10),
+    "light_s": _minutes(240, 280, 200, 250),
+    "deep_s": _minutes(90, 100, 80, 100),
+    "rem_s": _minutes(90, 100, 80, 100),
+    "first_epoch": [
+        _epoch(2026, 1, 4, 22), _epoch(2026, 1, 5, 23), _epoch(2026, 1, 7, 22), _epoch(2026, 1, 11, 21),
+    ],
+}
+
+
+def test_averages_by_hand():
+    out = analyze(COLUMNS, START, days=10, window=3, target_minutes=450)
+    assert (out["start"], out["end"]) == (START, dt.date(2026, 1, 14))
+
+    assert out["daily"][0] == {
+        "day": dt.date(2026, 1, 5), "asleep_minutes": 420.0, "light_minutes": 240.0,
+        "deep_minutes": 90.0, "rem_minutes": 90.0, "awake_minutes": 20.0,
+        "rolling_avg_minutes": 420.0, "vs_target_minutes": -30.0,
+    }
+    assert [d["day"] for d in out["daily"]] == [dt.date(2026, 1, d) for d in (5, 6, 8, 12)]
+    # 3-day window over nights only: (420+480)/2, then Jan 6-8 = (480+360)/2, then Jan 10-12 = 450
+    assert [d["rolling_avg_minutes"] for d in out["daily"]] == [420.0, 450.0, 420.0, 450.0]
+    assert [d["vs_target_minutes"] for d in out["daily"]] == [-30.0, 30.0, -90.0, 0.0]
+
+    assert out["weekly"] == [
+        {"week_start": dt.date(2026, 1, 5), "asleep_minutes": 1260.0, "nights": 3, "avg_minutes": 420.0},
+        {"week_start": dt.date(2026, 1, 12), "asleep_minutes": 450.0, "nights": 1, "avg_minutes": 450.0},
+    ]
+
+    # mean 427.5; deviations -7.5, 52.5, -67.5, 22.5 -> variance 7875/4, std 44.37
+    # bedtimes 600, 660, 600, 540 -> variance 7200/4, std 42.43
+    # consistency = 100 * ((1 - 44.37/427.5) + (1 - 42.43/120)) / 2 = 77.13
+    assert out["summary"] == {
+        "nights": 4, "target_minutes": 450,
+        "avg_minutes": 427.5, "median_minutes": 435.0, "std_minutes": 44.4,
+        "bedtime_std_minutes": 42.4, "consistency": 77.1,
+        "avg_vs_target_minutes": -22.5, "target_hit_rate": 0.5,
+    }
+
+
+def test_empty_range():
+    empty = {name: [] for name in COLUMNS}
+    start = dt.date(2026, 1, 7)  # a Wednesday: the range still covers two ISO weeks
+    out = analyze(empty, start, days=7, window=7, target_minutes=480)
+
+    assert out["daily"] == []
+    assert out["weekly"] == [
+        {"week_start": dt.date(2026, 1, 5), "asleep_minutes": 0.0, "nights": 0, "avg_minutes": None},
+        {"week_start": dt.date(2026, 1, 12), "asleep_minutes": 0.0, "nights": 0, "avg_minutes": None},
+    ]
+    assert out["summary"] == {"nights": 0, "target_minutes": 480}
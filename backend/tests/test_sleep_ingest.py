@@ -0,0 +1,34 @@
+"""
+POST /sleep/samples input checks: a row that doesn't fit the smallint columns
+is rejected and reported, never a 500 from COPY; an overlong line fails the
+upload with 400 before it can be buffered.
+"""
+import pytest
+
+from app.db.sleep_ingest import MAX_LINE_BYTES
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+CSV = {"Content-Type": "text/csv"}
+
+
+async def test_out_of_range_rows_are_rejected(client, auth):
+    body = (
+        "ts,stage,duration_s,heart_rate\n"
+        "2026-01-01T00:00:00+00:00,light,30,60\n"
+        "2026-01-01T00:00:30+00:00,light,30,40000\n"
+        "2026-01-01T00:01:00+00:00,deep,70000,55\n"
+        "2026-01-01T00:01:30+00:00,rem,30,-1\n"
+    )
+    r = await client.post("/sleep/samples", content=body, headers={**auth, **CSV})
+    assert r.status_code == 200
+    out = r.json()
+    assert out["inserted"] == 1
+    assert out["rejected"] == 3
+    assert out["errors"][0] == "line 3: heart_rate out of range"
+
+
+async def test_overlong_line_fails_the_upload(client, auth):
+    body = "ts,stage,duration_s\n" + "x" * (MAX_LINE_BYTES + 1)
+    r = await client.post("/sleep/samples", content=body, headers={**auth, **CSV})
+    assert r.status_code == 400
@@ -0,0 +1,84 @@
+import logging
+import os
+from typing import Optional
+
+import httpx
+
+log = logging.getLogger(__name__)
+
+API_BASE = os.environ.get("SLEEP_API_BASE", "http://127.0.0.1:8000")
+
+
+class ApiSession:
+    """
+    One long-lived httpx.AsyncClient for the whole app, so requests reuse
+    keep-alive connections instead of paying a new TCP/TLS handshake per click.
+
+    Settings come from the constructor or SLEEP_HTTP_* environment variables:
+      - timeout: seconds for connect/read/write/pool
+      - retries: connection-level retries (only failed connects are retried,
+        so it is safe for POSTs too)
+      - http2: use HTTP/2 when the h2 package is installed (httpx[http2])
+    """
+
+    def __init__(
+        self,
+        base_url: str = API_BASE,
+        timeout: float = float(os.environ.get("SLEEP_HTTP_TIMEOUT", "20")),
+        retries: int = int(os.environ.get("SLEEP_HTTP_RETRIES", "2")),
+        http2: bool = os.environ.get("SLEEP_HTTP2", "0") == "1",
+        max_connections: int = 10,
+        max_keepalive: int = 5,
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.retries = retries
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=60,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    log.warning("HTTP/2 requested but h2 is not installed; using HTTP/1.1")
+                    http2 = False
+            transport = httpx.AsyncHTTPTransport(
+                retries=self.retries, http2=http2, limits=self.limits
+            )
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout, transport=transport
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_session: Optional[ApiSession] = None
+
+
+def api() -> ApiSession:
+    """The application-wide API session (created on first use)."""
+    global _session
+    if _session is None:
+        _session = ApiSession()
+    return _session
+
+
+async def close_api() -> None:
+    """Close pooled connections; call once when the Qt event loop is done."""
+    global _session
+    if _session is not None:
+        await _session.aclose()
+        _session = None
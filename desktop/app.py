@@ -1,22 +1,29 @@
 import sys, asyncio
+import logging
 from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QHBoxLayout
 from qasync import QEventLoop, asyncSlot
-import httpx
-import keyring
 
 from auth_ui import LoginDialog
 from auth_client import get_me
-from notes_client import list_notes
+from notes_client import fetch_changes, watch_changes
 from note_ui import NoteDialog  # <-- new
+from local_store import store_for
+from api_session import API_BASE, api, close_api
+from token_manager import forget, tokens_for
+from token_vault import vault
+
+log = logging.getLogger(__name__)
+WATCH_RETRY_MAX_SECONDS = 60
 
-API_BASE = "http://127.0.0.1:8000"
-KEYRING_SERVICE = "SLEEP"
 
 class Main(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("SLEEP")
         self.current_email: str | None = None
+        self._sync_task: asyncio.Task | None = None
+        self._sync_again = False
+        self._watch_task: asyncio.Task | None = None
 
         self.lbl_status = QLabel("Not logged in")
         self.btn_login  = QPushButton("Login…")
@@ -24,9 +31,10 @@ class Main(QWidget):
         self.btn_me     = QPushButton("Who am I?")
         self.btn_notes  = QPushButton("List Notes")
         self.btn_new    = QPushButton("New Note…")  # <-- new
+        self.btn_logout = QPushButton("Logout")
 
         row = QHBoxLayout()
-        for b in (self.btn_login, self.btn_ping, self.btn_me, self.btn_notes, self.btn_new):
+        for b in (self.btn_login, self.btn_ping, self.btn_me, self.btn_notes, self.btn_new, self.btn_logout):
             row.addWidget(b)
         lay = QVBoxLayout(self)
         lay.addWidget(self.lbl_status)
@@ -37,13 +45,13 @@ class Main(QWidget):
         self.btn_me.clicked.connect(self.on_me_clicked)
         self.btn_notes.clicked.connect(self.on_notes_clicked)
         self.btn_new.clicked.connect(self.on_new_clicked)  # <-- new
+        self.btn_logout.clicked.connect(self.on_logout_clicked)
 
     @asyncSlot()
     async def on_ping_clicked(self):
         try:
             self.lbl_status.setText("Pinging /healthz…")
-            async with httpx.AsyncClient(base_url=API_BASE, timeout=10) as client:
-                r = await client.get("/healthz")
+            r = await api().client.get("/healthz")
             self.lbl_status.setText(r.text)
         except Exception as e:
             self.lbl_status.setText(f"Error: {e}")
@@ -54,11 +62,34 @@ class Main(QWidget):
         if dlg.exec():
             email = dlg.ed_email.text().strip()
             self.current_email = email
-            has_access = bool(keyring.get_password(KEYRING_SERVICE, f"{email}:access"))
+            # the dialog just wrote fresh tokens to keyring: reload them once, off the UI thread,
+            # and restart the manager so it arms its refresh timer
+            vault.invalidate(email)
+            await vault.load(email)
+            has_access = bool(vault.get(email, "access"))
+            forget(email)
+            if has_access:
+                await tokens_for(email).access_token()
+                self._start_watch()
             self.lbl_status.setText(f"Logged in as {email} (token: {'ok' if has_access else 'missing'})")
         else:
             self.lbl_status.setText("Login canceled")
 
+    @asyncSlot()
+    async def on_logout_clicked(self):
+        if not self.current_email:
+            self.lbl_status.setText("Not logged in")
+            return
+        email = self.current_email
+        self.current_email = None
+        for task in (self._sync_task, self._watch_task):
+            if task and not task.done():
+                task.cancel()
+        await tokens_for(email).revoke()  # revoke the refresh token server-side
+        forget(email)       # stop the refresh timer
+        vault.clear(email)  # drop tokens from memory now, from keyring in the background
+        self.lbl_status.setText(f"Logged out {email}")
+
     @asyncSlot()
     async def on_me_clicked(self):
         if not self.current_email:
@@ -72,19 +103,77 @@ class Main(QWidget):
         except Exception as e:
             self.lbl_status.setText(f"/me error: {e}")
 
+    def _show_notes(self, prefix: str = "") -> None:
+        store = store_for(self.current_email)
+        notes = store.list_notes()
+        titles = [n.get("title", "(no title)") for n in notes]
+        summary = ", ".join(titles[:3]) + ("…" if len(titles) > 3 else "")
+        scope = " (most recent only)" if store.is_partial() else ""
+        self.lbl_status.setText(f"{prefix}{len(notes)} note(s){scope}: {summary or '(none)'}")
+
+    async def _sync_notes(self) -> None:
+        """
+        Pull changes since the store's watermark into the local store, off the UI thread.
+        """
+        email = self.current_email
+        store = store_for(email)
+        changes = await fetch_changes(email, store.sync_version())
+        await asyncio.to_thread(store.apply_changes, changes)
+
+    def _start_sync(self, prefix: str = "") -> None:
+        # one background sync at a time; a request during a sync runs one more after it,
+        # since the running one may have fetched before the change that asked for it
+        if self._sync_task and not self._sync_task.done():
+            self._sync_again = True
+            return
+        email = self.current_email
+
+        def done(task: asyncio.Task) -> None:
+            if task.cancelled() or email != self.current_email:
+                return  # app shutting down, or user switched meanwhile
+            if task.exception():
+                self.lbl_status.setText(f"{self.lbl_status.text()} (sync failed: {task.exception()})")
+            else:
+                self._show_notes(prefix)
+            if self._sync_again:
+                self._sync_again = False
+                self._start_sync(prefix)
+
+        self._sync_task = asyncio.ensure_future(self._sync_notes())
+        self._sync_task.add_done_callback(done)
+
+    async def _watch_notes(self, email: str) -> None:
+        """
+        Sync whenever the server announces a change (made here or on another device),
+        instead of polling. Reconnects when the stream ends, backing off while it fails.
+        """
+        delay = 1
+        while email == self.current_email:
+            try:
+                async for _event in watch_changes(email):
+                    delay = 1
+                    self._start_sync()  # every event, including the first (resync), means "pull"
+                continue  # the server ended the stream: reconnect now
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.warning("note event stream failed; retrying in %ss", delay, exc_info=True)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WATCH_RETRY_MAX_SECONDS)
+
+    def _start_watch(self) -> None:
+        if self._watch_task and not self._watch_task.done():
+            self._watch_task.cancel()  # previous user's stream
+        self._watch_task = asyncio.ensure_future(self._watch_notes(self.current_email))
+
     @asyncSlot()
     async def on_notes_clicked(self):
         if not self.current_email:
             self.lbl_status.setText("Please login first.")
             return
-        try:
-            self.lbl_status.setText("Loading notes…")
-            notes = await list_notes(self.current_email)
-            titles = [n.get("title", "(no title)") for n in notes]
-            summary = ", ".join(titles[:3]) + ("…" if len(titles) > 3 else "")
-            self.lbl_status.setText(f"{len(notes)} note(s): {summary or '(none)'}")
-        except Exception as e:
-            self.lbl_status.setText(f"/notes error: {e}")
+        # render the local copy right away, then refresh it in the background
+        self._show_notes()
+        self._start_sync()
 
     @asyncSlot()
     async def on_new_clicked(self):
@@ -93,12 +182,10 @@ class Main(QWidget):
             return
         dlg = NoteDialog(self, current_email=self.current_email)
         if dlg.exec():
-            # After creating, refresh the summary
-            try:
-                notes = await list_notes(self.current_email)
-                self.lbl_status.setText(f"Created. You now have {len(notes)} note(s).")
-            except Exception as e:
-                self.lbl_status.setText(f"Created, but list failed: {e}")
+            # the server already returned the new note: store it, no need to re-list
+            store_for(self.current_email).upsert([dlg.created_note])
+            self._show_notes("Created. ")
+            self._start_sync("Created. ")
         else:
             self.lbl_status.setText("Create note canceled")
 
@@ -110,6 +197,9 @@ def main():
     w.show()
     with loop:
         loop.run_forever()
+        # window closed: drain pooled connections before the loop goes away
+        loop.run_until_complete(close_api())
+        vault.flush()  # finish pending keyring writes
 
 if __name__ == "__main__":
     main()
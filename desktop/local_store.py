@@ -0,0 +1,172 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+CACHE_DIR = Path(os.environ.get("SLEEP_CACHE_DIR", Path.home() / ".cache" / "sleep"))
+MAX_CACHE_BYTES = 64 * 1024 * 1024  # per user; oldest-changed notes are evicted past this
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id      INTEGER PRIMARY KEY,
+    title   TEXT NOT NULL,
+    body    TEXT NOT NULL,
+    done    INTEGER NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_notes_version ON notes (version);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class NoteStore:
+    """
+    Local SQLite mirror of one user's notes, kept current from GET /notes/changes.
+    Reads are local and instant; the UI refreshes it in the background.
+    The file is capped at max_bytes: past that, the least recently changed notes
+    are dropped, so a very large account keeps only its most recent notes locally.
+    The watermark stays where it is (lowering it would fetch the dropped notes
+    again, and drop them again); instead the store remembers the newest version it
+    evicted and is_partial() says the local list is incomplete.
+
+    One file per user (named by a hash of the email). Safe to call from a worker
+    thread (asyncio.to_thread) since all access goes through one lock.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        # auto_vacuum only takes effect on a fresh file; lets eviction give space back
+        self._db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+
+    @classmethod
+    def for_user(cls, email: str) -> "NoteStore":
+        digest = hashlib.sha256(email.strip().lower().encode("utf-8")).hexdigest()[:32]
+        return cls(CACHE_DIR / f"notes-{digest}.sqlite3")
+
+    # --- reads ---
+
+    def list_notes(self) -> List[dict]:
+        with self._lock:
+            rows = self._db.execute("SELECT id, title, body, done FROM notes ORDER BY id").fetchall()
+        return [{"id": r["id"], "title": r["title"], "body": r["body"], "done": bool(r["done"])} for r in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM notes").fetchone()[0]
+
+    def sync_version(self) -> int:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'sync_version'").fetchone()
+        return int(row["value"]) if row else 0
+
+    def is_partial(self) -> bool:
+        """True once notes have been evicted: the local list then holds only the most recent ones."""
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM meta WHERE key = 'evicted_through'").fetchone()
+        return row is not None
+
+    # --- writes ---
+
+    def upsert(self, notes: List[dict]) -> None:
+        """
+        Put notes we already know about (e.g. one just created, as POST /notes returned
+        it with its version) without waiting for a sync.
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO notes (id, title, body, done, version) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET title = excluded.title, body = excluded.body, "
+                "done = excluded.done, version = max(notes.version, excluded.version)",
+                [(n["id"], n["title"], n["body"], int(n["done"]), n["version"]) for n in notes],
+            )
+
+    def apply_changes(self, changes: dict) -> None:
+        """
+        Apply one GET /notes/changes response in a single transaction and advance the watermark.
+        A `reset` response replaces everything held locally.
+        """
+        with self._lock, self._db:
+            if changes.get("reset"):
+                self._db.execute("DELETE FROM notes")
+                self._db.execute("DELETE FROM meta WHERE key = 'evicted_through'")
+            self._db.executemany(
+                "INSERT INTO notes (id, title, body, done, version) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET title = excluded.title, body = excluded.body, "
+                "done = excluded.done, version = excluded.version",
+                [(n["id"], n["title"], n["body"], int(n["done"]), n["version"]) for n in changes["changed"]],
+            )
+            self._db.executemany("DELETE FROM notes WHERE id = ?", [(d["id"],) for d in changes["deleted"]])
+            self._db.execute(
+                "INSERT INTO meta (key, value) VALUES ('sync_version', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (str(changes["version"]),),
+            )
+        self._enforce_size()
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM notes")
+            self._db.execute("DELETE FROM meta")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # --- size bound ---
+
+    def _size_bytes(self) -> int:
+        page_count = self._db.execute("PRAGMA page_count").fetchone()[0]
+        free = self._db.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = self._db.execute("PRAGMA page_size").fetchone()[0]
+        return (page_count - free) * page_size
+
+    def _enforce_size(self) -> None:
+        with self._lock:
+            if self._size_bytes() <= self.max_bytes:
+                return
+            with self._db:
+                # drop the least recently changed tenth at a time until we fit
+                while self._size_bytes() > self.max_bytes:
+                    total = self._db.execute("SELECT count(*) FROM notes").fetchone()[0]
+                    if total == 0:
+                        break
+                    # versions are unique and only grow, so each pass evicts newer ones than the last
+                    through = self._db.execute(
+                        "SELECT max(version) FROM (SELECT version FROM notes ORDER BY version LIMIT ?)",
+                        (max(1, total // 10),),
+                    ).fetchone()[0]
+                    self._db.execute("DELETE FROM notes WHERE version <= ?", (through,))
+                    self._db.execute(
+                        "INSERT INTO meta (key, value) VALUES ('evicted_through', ?) "
+                        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                        (str(through),),
+                    )
+            self._db.execute("PRAGMA incremental_vacuum").fetchall()  # runs one page per row fetched
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+_stores: dict = {}
+
+
+def store_for(email: str) -> Optional[NoteStore]:
+    """
+    Open (once) and return the store for `email`; None if no user is logged in.
+    """
+    if not email:
+        return None
+    store = _stores.get(email)
+    if store is None:
+        store = _stores[email] = NoteStore.for_user(email)
+    return store
@@ -17,6 +17,7 @@ class NoteDialog(QDialog):
         super().__init__(parent)
         self.setWindowTitle("New Note")
         self.current_email = current_email
+        self.created_note: Optional[dict] = None  # set on successful save
 
         self.lbl_status = QLabel("Enter note details")
         self.ed_title = QLineEdit()
@@ -65,6 +66,7 @@ class NoteDialog(QDialog):
         self.lbl_status.setText("Saving…")
         try:
             note = await create_note(self.current_email, title, body, done)
+            self.created_note = note
             self.lbl_status.setText(f"Saved (id={note.get('id')})")
             self.accept()
         except Exception as e:
@@ -1,56 +1,92 @@
+import json
+from typing import AsyncIterator, List, Optional
+
 import httpx
-import keyring
-from typing import Any, List, Optional
 
-from auth_client import _refresh_access_token  # reuse our refresh helper
+from api_session import api
+from token_manager import tokens_for
 
-API_BASE = "http://127.0.0.1:8000"
-KEYRING_SERVICE = "SLEEP"
+PAGE_SIZE = 500  # server max for GET /notes
+CHANGES_PAGE_SIZE = 1000  # server max for GET /notes/changes
+EVENTS_READ_TIMEOUT = 60  # the server sends a keepalive every 15 s; silence this long means a dead link
 
 
 async def list_notes(email: str) -> List[dict]:
-    access = keyring.get_password(KEYRING_SERVICE, f"{email}:access")
-    if not access:
-        raise RuntimeError("No access token found. Please login first.")
-
-    async with httpx.AsyncClient(base_url=API_BASE, timeout=20) as client:
-        resp = await client.get("/notes", headers={"Authorization": f"Bearer {access}"})
-        if resp.status_code == 200:
-            return resp.json()
-        if resp.status_code == 401:
-            new_access: Optional[str] = await _refresh_access_token(email)
-            if not new_access:
-                resp.raise_for_status()
-            resp2 = await client.get("/notes", headers={"Authorization": f"Bearer {new_access}"})
-            if resp2.status_code == 200:
-                return resp2.json()
-            resp2.raise_for_status()
+    """
+    Fetch all notes via GET /notes, following next_cursor page by page.
+    """
+    tokens = tokens_for(email)
+    notes: List[dict] = []
+    cursor: Optional[str] = None
+
+    while True:
+        params = {"limit": PAGE_SIZE}
+        if cursor:
+            params["cursor"] = cursor
+        resp = await tokens.request("GET", "/notes", params=params)
         resp.raise_for_status()
 
+        page = resp.json()
+        notes.extend(page["items"])
+        cursor = page.get("next_cursor")
+        if not cursor:
+            return notes
+
 
 async def create_note(email: str, title: str, body: str, done: bool = False) -> dict:
     """
-    Create a note via POST /notes, using stored access token; refresh once on 401.
-    Returns the created note dict.
+    Create a note via POST /notes. Returns the created note dict, with its change version.
     """
-    access = keyring.get_password(KEYRING_SERVICE, f"{email}:access")
-    if not access:
-        raise RuntimeError("No access token found. Please login first.")
-
     payload = {"title": title, "body": body, "done": done}
+    resp = await tokens_for(email).request("POST", "/notes", json=payload)
+    resp.raise_for_status()
+    return resp.json()
+
 
-    async with httpx.AsyncClient(base_url=API_BASE, timeout=20) as client:
-        resp = await client.post("/notes", json=payload, headers={"Authorization": f"Bearer {access}"})
-        if resp.status_code in (200, 201):
-            return resp.json()
+async def fetch_changes(email: str, since: int) -> dict:
+    """
+    GET /notes/changes from `since`, following has_more.
+    Returns one merged {"changed", "deleted", "version"} dict, oldest change first.
+    If the server says `since` is too old to diff against, the result starts over from
+    version 0 and carries "reset": True.
+    """
+    tokens = tokens_for(email)
+    merged: dict = {"changed": [], "deleted": [], "version": since}
+
+    while True:
+        params = {"since": merged["version"], "limit": CHANGES_PAGE_SIZE}
+        resp = await tokens.request("GET", "/notes/changes", params=params)
+        resp.raise_for_status()
 
-        if resp.status_code == 401:
-            new_access: Optional[str] = await _refresh_access_token(email)
-            if not new_access:
-                resp.raise_for_status()
-            resp2 = await client.post("/notes", json=payload, headers={"Authorization": f"Bearer {new_access}"})
-            if resp2.status_code in (200, 201):
-                return resp2.json()
-            resp2.raise_for_status()
+        page = resp.json()
+        if page.get("reset"):
+            merged = {"changed": [], "deleted": [], "version": 0, "reset": True}
+            continue
+        merged["changed"].extend(page["changed"])
+        merged["deleted"].extend(page["deleted"])
+        merged["version"] = page["version"]
+        if not page["has_more"]:
+            return merged
 
+
+async def watch_changes(email: str) -> AsyncIterator[dict]:
+    """
+    Follow GET /notes/events and yield each event's data: {"op": "upsert" | "delete", "ids"}
+    or {"op": "resync"}. Returns when the server ends the stream; the caller reconnects.
+    Raises httpx errors (including for a non-200 answer).
+    """
+    token = await tokens_for(email).access_token()
+    session = api()
+    async with session.client.stream(
+        "GET", "/notes/events",
+        headers={"Authorization": f"Bearer {token}", "Accept": "text/event-stream"},
+        timeout=httpx.Timeout(session.timeout, read=EVENTS_READ_TIMEOUT),
+    ) as resp:
         resp.raise_for_status()
+        data: List[str] = []
+        async for line in resp.aiter_lines():
+            if line.startswith("data:"):
+                data.append(line[5:].strip())
+            elif not line and data:  # blank line ends an event
+                yield json.loads("\n".join(data))
+                data = []
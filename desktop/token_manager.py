@@ -0,0 +1,189 @@
+import asyncio
+import base64
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from api_session import api
+from token_vault import vault
+
+log = logging.getLogger(__name__)
+
+REFRESH_MARGIN_SECONDS = 60  # refresh this long before the access token expires
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """
+    Read `exp` from a JWT without verifying it (the server does that);
+    we only need it to know when to refresh. None if it can't be read.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def _log_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        log.warning("background token refresh failed", exc_info=task.exception())
+
+
+class TokenManager:
+    """
+    Owns one user's access token:
+      - refreshes it in the background shortly before it expires,
+      - coalesces concurrent refreshes into one in-flight POST /auth/refresh
+        that every caller awaits,
+      - retries a request once after a 401 with the refreshed token.
+    """
+
+    def __init__(self, email: str, margin: float = REFRESH_MARGIN_SECONDS):
+        self.email = email
+        self.margin = margin
+        self._access: Optional[str] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    # --- token state ---
+
+    def _load(self) -> Optional[str]:
+        if self._access is None:
+            self._access = vault.get(self.email, "access")
+            if self._access:
+                self._schedule(self._access)
+        return self._access
+
+    def _schedule(self, token: str) -> None:
+        """Arm a timer that refreshes `token` `margin` seconds before its exp."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        exp = token_expiry(token)
+        if exp is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop yet; access_token() will refresh on demand
+        delay = max(0.0, exp - self.margin - time.time())
+        self._timer = loop.call_later(delay, self._refresh_in_background, token)
+
+    def _refresh_in_background(self, token: str) -> None:
+        task = asyncio.ensure_future(self.refresh(stale=token))
+        task.add_done_callback(_log_failure)
+
+    def _expiring(self, token: str) -> bool:
+        exp = token_expiry(token)
+        return exp is not None and exp - time.time() <= self.margin
+
+    async def access_token(self) -> str:
+        """
+        A usable access token, refreshed first if it is about to expire.
+        Raises RuntimeError if the user never logged in.
+        """
+        token = self._load()
+        if not token:
+            raise RuntimeError("No access token found. Please login first.")
+        if self._expiring(token):
+            token = await self.refresh(stale=token) or token
+        return token
+
+    # --- refresh ---
+
+    async def refresh(self, stale: Optional[str] = None) -> Optional[str]:
+        """
+        Get a new access token; concurrent callers share one request.
+        With `stale`, a token that has already been replaced is not refreshed again.
+        Returns the new token, or None if the refresh token was rejected.
+        """
+        if stale is not None and self._access and self._access != stale:
+            return self._access  # someone else already refreshed it
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._do_refresh())
+            self._inflight.add_done_callback(self._clear_inflight)
+        return await asyncio.shield(self._inflight)
+
+    def _clear_inflight(self, task: asyncio.Task) -> None:
+        if self._inflight is task:
+            self._inflight = None
+
+    async def _do_refresh(self) -> Optional[str]:
+        refresh = vault.get(self.email, "refresh")
+        if not refresh:
+            return None
+        try:
+            resp = await api().client.post("/auth/refresh", json={"refresh_token": refresh})
+        except httpx.HTTPError:
+            log.warning("token refresh failed", exc_info=True)
+            return None
+        if resp.status_code != 200:
+            return None
+        body = resp.json()
+        new_access = body.get("access_token")
+        if not new_access:
+            return None
+
+        vault.set(self.email, "access", new_access)  # keyring write happens off-thread
+        if body.get("refresh_token"):
+            # refresh tokens are single use: the old one is dead now, keep the rotated one
+            vault.set(self.email, "refresh", body["refresh_token"])
+        self._access = new_access
+        self._schedule(new_access)
+        return new_access
+
+    # --- requests ---
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send an authorized request through the shared API session.
+        On 401, refresh (coalesced) and retry once. The caller checks the status.
+        """
+        token = await self.access_token()
+        client = api().client
+        resp = await client.request(method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        if resp.status_code == 401:
+            new_access = await self.refresh(stale=token)
+            if new_access:
+                resp = await client.request(
+                    method, url, headers={"Authorization": f"Bearer {new_access}"}, **kwargs
+                )
+        return resp
+
+    async def revoke(self) -> None:
+        """Log this session out server-side (best effort; tokens are cleared locally anyway)."""
+        refresh = vault.get(self.email, "refresh")
+        if not refresh:
+            return
+        try:
+            await api().client.post("/auth/logout", json={"refresh_token": refresh})
+        except httpx.HTTPError:
+            log.warning("logout request failed", exc_info=True)
+
+    def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._access = None
+
+
+_managers: Dict[str, TokenManager] = {}
+
+
+def tokens_for(email: str) -> TokenManager:
+    """The token manager for `email` (one per user per process)."""
+    manager = _managers.get(email)
+    if manager is None:
+        manager = _managers[email] = TokenManager(email)
+    return manager
+
+
+def forget(email: str) -> None:
+    """Drop a user's manager (logout / user switch): stops its refresh timer."""
+    manager = _managers.pop(email, None)
+    if manager is not None:
+        manager.close()
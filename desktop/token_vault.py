@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import keyring
+from keyring.errors import PasswordDeleteError
+
+log = logging.getLogger(__name__)
+
+KEYRING_SERVICE = "SLEEP"
+
+
+class TokenVault:
+    """
+    Process-local cache in front of keyring.
+
+    keyring on Linux is a D-Bus round trip to the secret service per call, so
+    each (email, kind) entry is read from keyring once and then served from
+    memory. Writes update memory immediately and are written through to keyring
+    on a single background thread (one thread keeps writes in order and off the
+    Qt thread). `clear` drops a user's tokens from memory and keyring on logout.
+    """
+
+    def __init__(self, service: str = KEYRING_SERVICE):
+        self.service = service
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, str], Optional[str]] = {}
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="token-vault")
+        self._pending: Optional[Future] = None
+
+    def _key(self, email: str, kind: str) -> str:
+        return f"{email}:{kind}"
+
+    # --- reads ---
+
+    def get(self, email: str, kind: str) -> Optional[str]:
+        """Token of `kind` ("access" / "refresh") for `email`; keyring is hit only on first use."""
+        with self._lock:
+            if (email, kind) in self._values:
+                return self._values[(email, kind)]
+        value = keyring.get_password(self.service, self._key(email, kind))
+        with self._lock:
+            # a set() that raced with our read wins
+            return self._values.setdefault((email, kind), value)
+
+    async def load(self, email: str) -> None:
+        """Warm both tokens for `email` off the event loop thread."""
+        await asyncio.to_thread(self.get, email, "access")
+        await asyncio.to_thread(self.get, email, "refresh")
+
+    def invalidate(self, email: str) -> None:
+        """Forget cached values so the next get() re-reads keyring (e.g. after login wrote it)."""
+        with self._lock:
+            for kind in ("access", "refresh"):
+                self._values.pop((email, kind), None)
+
+    # --- writes ---
+
+    def set(self, email: str, kind: str, value: str) -> None:
+        with self._lock:
+            self._values[(email, kind)] = value
+            self._pending = self._writer.submit(self._write, self._key(email, kind), value)
+
+    def clear(self, email: str) -> None:
+        """Logout: drop `email`'s tokens from memory now and from keyring in the background."""
+        with self._lock:
+            for kind in ("access", "refresh"):
+                self._values[(email, kind)] = None
+                self._pending = self._writer.submit(self._delete, self._key(email, kind))
+
+    def _write(self, username: str, value: str) -> None:
+        try:
+            keyring.set_password(self.service, username, value)
+        except Exception:
+            log.warning("keyring write failed for %s", username, exc_info=True)
+
+    def _delete(self, username: str) -> None:
+        try:
+            keyring.delete_password(self.service, username)
+        except PasswordDeleteError:
+            pass  # nothing stored
+        except Exception:
+            log.warning("keyring delete failed for %s", username, exc_info=True)
+
+    def flush(self) -> None:
+        """Block until queued keyring writes are done (call on shutdown)."""
+        with self._lock:
+            pending = self._pending
+        if pending is not None:
+            pending.result()
+        self._writer.shutdown(wait=True)
+
+
+# single vault instance to import elsewhere
+vault = TokenVault()